@@ -0,0 +1,136 @@
+import arcpy
+import numpy as np
+
+from data_access import DataAccess
+from local_id_lookup import MISSING_VALUE, LocalIdLookupBuilder
+from national_map_logger import NationalMapLogger
+from national_map_utility import NationalMapUtility
+
+JOIN_CHUNK_SIZE = 500_000
+
+# arcpy Field.type: AddField field type
+FIELD_TYPES = {
+    'String': 'TEXT',
+    'SmallInteger': 'SHORT',
+    'Integer': 'LONG',
+    'BigInteger': 'BIGINTEGER',
+    'Single': 'FLOAT',
+    'Double': 'DOUBLE',
+    'Date': 'DATE',
+    'GUID': 'GUID'
+}
+
+
+class JoinIndex:
+    """
+    Join table key -> row, with the joined fields as codes of their distinct values.
+    The keys are kept in a LocalIdLookup, State and City have few distinct values, so a row costs a few integers.
+    """
+
+    def __init__(self, key_lookup, field_codes, field_values):
+        self.key_lookup = key_lookup
+        self.field_codes = field_codes
+        self.field_values = field_values
+
+    def __del__(self):
+        del self.key_lookup
+        del self.field_codes
+        del self.field_values
+
+    def __len__(self):
+        return len(self.key_lookup)
+
+    @staticmethod
+    def build(join_table, join_field, field_names):
+        """
+        Read the join table once, a duplicated key takes its first row, as JoinField does.
+        """
+        builder = LocalIdLookupBuilder(np.int64)
+        codes = [[] for _ in field_names]
+        value_codes = [{} for _ in field_names]
+        for row_index, row in enumerate(DataAccess.search_rows(join_table, [join_field] + list(field_names))):
+            builder.add(row[0], row_index)
+            for index, value in enumerate(row[1:]):
+                codes[index].append(value_codes[index].setdefault(value, len(value_codes[index])))
+
+        field_codes = [np.array(field_code, dtype=np.int32) for field_code in codes]
+        field_values = [list(value_code.keys()) for value_code in value_codes]
+        return JoinIndex(builder.build(keep_first=True), field_codes, field_values)
+
+    def get_rows(self, keys):
+        """
+        :return: numpy array of the join table rows of keys, MISSING_VALUE for the keys which are not found
+        """
+        return self.key_lookup.get_many(keys)
+
+    def get_values(self, row_index):
+        if row_index == MISSING_VALUE:
+            return [None] * len(self.field_codes)
+        return [values[codes[row_index]] for codes, values in zip(self.field_codes, self.field_values)]
+
+
+def _add_join_fields(in_data, join_table, field_names):
+    """
+    Add the fields which in_data does not have, with the type and length of the join table fields.
+    """
+    join_table_fields = {field.name.lower(): field for field in arcpy.ListFields(join_table)}
+    field_descriptions = []
+    for field_name in field_names:
+        if NationalMapUtility.is_field_exists(in_data, field_name):
+            continue
+
+        field = join_table_fields[field_name.lower()]
+        field_length = field.length if field.type == 'String' else None
+        field_descriptions.append([field.name, FIELD_TYPES[field.type], field.aliasName, field_length])
+
+    if field_descriptions:
+        arcpy.management.AddFields(in_data, field_descriptions)
+
+
+@NationalMapLogger.debug_decorator
+def hash_join_field(in_data, in_field, join_table, join_field, field_names):
+    """
+    JoinField through an in memory index: the join table is read once, in_data is updated in OBJECTID chunks.
+    A row of in_data without a match gets NULL values.
+    :return: join hit count, join miss count
+    """
+    join_index = JoinIndex.build(join_table, join_field, field_names)
+    _add_join_fields(in_data, join_table, field_names)
+
+    hit_count, miss_count = 0, 0
+    for where_clause in NationalMapUtility.get_object_id_where_clauses(in_data, JOIN_CHUNK_SIZE):
+        # resolve the keys of the whole chunk at once
+        rows = list(DataAccess.search_rows(in_data, ['OID@', in_field], where_clause))
+        join_rows = join_index.get_rows([row[1] for row in rows])
+        object_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        chunk_hit_count = int(np.count_nonzero(join_rows != MISSING_VALUE))
+        hit_count += chunk_hit_count
+        miss_count += len(rows) - chunk_hit_count
+        del rows
+
+        values = [join_index.get_values(join_row) for join_row in join_rows]
+        NationalMapUtility.update_rows_by_object_id(in_data, list(field_names), object_ids, values, where_clause)
+        del join_rows, object_ids, values
+
+    message = f'hash_join_field, {in_data}, {in_field} -> {join_field}: hits {hit_count}, misses {miss_count}'
+    NationalMapLogger.info(message)
+    NationalMapLogger.add_rows(read=len(join_index) + hit_count + miss_count, written=hit_count + miss_count)
+    return hit_count, miss_count
+
+
+def join_fields(in_data, in_field, join_table, join_field, field_names, is_hash_join):
+    """
+    :param field_names: List of the join table fields copied to in_data
+    :param is_hash_join: True for hash_join_field, False for arcpy JoinField
+    """
+    if is_hash_join:
+        hash_join_field(in_data, in_field, join_table, join_field, field_names)
+        return
+
+    arcpy.management.JoinField(
+        in_data=in_data,
+        in_field=in_field,
+        join_table=join_table,
+        join_field=join_field,
+        fields=';'.join(field_names)
+    )
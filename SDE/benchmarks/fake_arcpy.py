@@ -0,0 +1,706 @@
+"""
+In-memory stand-in for the part of arcpy the converters use: cursors, NumPy conversion, Describe and the
+field and table management tools. Tables are column lists keyed by their path, nothing is written to disk.
+
+Only the benchmarks install it, before the converter modules are imported:
+
+    import fake_arcpy
+    fake_arcpy.install()
+
+Where clauses support the forms of the pipeline, conditions of <field> <op> <value> or <field> IN (...) joined
+with AND. Geoprocessing tools without an equivalent here (Buffer, AddSpatialJoin, JoinField, Project, ...)
+are not provided, calling them raises AttributeError.
+"""
+import bisect
+import copy
+import os
+import re
+import sys
+import types
+
+import numpy as np
+
+OID_FIELD_NAME = 'OBJECTID'
+SHAPE_FIELD_NAME = 'Shape'
+
+# AddField type: arcpy Field.type
+FIELD_TYPE_NAMES = {'TEXT': 'String', 'LONG': 'Integer', 'SHORT': 'SmallInteger', 'DOUBLE': 'Double',
+                    'FLOAT': 'Single', 'DATE': 'Date', 'OID': 'OID', 'GEOMETRY': 'Geometry'}
+FIELD_MAPPING_TYPES = {'TEXT': 'TEXT', 'LONG': 'LONG', 'SHORT': 'SHORT', 'DOUBLE': 'DOUBLE', 'FLOAT': 'DOUBLE',
+                       'DATE': 'DATE'}
+NUMPY_DTYPES = {'OID': np.int64, 'LONG': np.int32, 'SHORT': np.int16, 'DOUBLE': np.float64}
+
+_CONDITION_PATTERN = re.compile(r'^\s*(\w+)\s*(>=|<=|<>|=|>|<)\s*(.+?)\s*$')
+_IN_PATTERN = re.compile(r'^\s*(\w+)\s+IN\s*\((.*)\)\s*$', re.IGNORECASE)
+_AND_PATTERN = re.compile(r'\s+AND\s+', re.IGNORECASE)
+
+_tables = {}
+_layers = {}
+_workspaces = set()
+_next_dataset_id = [1]
+
+
+def _get_key(path):
+    return os.path.normcase(os.path.normpath(str(path)))
+
+
+class Point:
+    __slots__ = ('X', 'Y')
+
+    def __init__(self, x, y):
+        self.X, self.Y = x, y
+
+
+class Polyline:
+    """
+    Flat (x0, y0, x1, y1, ...) coordinates. A union keeps the coordinates of both parts, enough for the
+    first and last point and the cost of the geometry operation in the benchmarks.
+    """
+    __slots__ = ('coordinates',)
+
+    def __init__(self, coordinates):
+        self.coordinates = coordinates
+
+    @property
+    def firstPoint(self):
+        return Point(self.coordinates[0], self.coordinates[1])
+
+    @property
+    def lastPoint(self):
+        return Point(self.coordinates[-2], self.coordinates[-1])
+
+    @property
+    def pointCount(self):
+        return len(self.coordinates) // 2
+
+    def __or__(self, other):
+        return type(self)(self.coordinates + other.coordinates)
+
+    def union(self, other):
+        return self | other
+
+
+class Polygon(Polyline):
+    __slots__ = ()
+
+
+class PointGeometry(Polyline):
+    __slots__ = ()
+
+    def __init__(self, point):
+        super().__init__([point.X, point.Y])
+
+
+class SpatialReference:
+    def __init__(self, factory_code=4326):
+        self.factoryCode = factory_code
+        self.type = 'Geographic' if factory_code == 4326 else 'Projected'
+
+
+class Extent:
+    def __init__(self, x_min, y_min, x_max, y_max):
+        self.XMin, self.YMin, self.XMax, self.YMax = x_min, y_min, x_max, y_max
+
+
+class Field:
+    def __init__(self, name, field_type):
+        self.name = name
+        self.type = FIELD_TYPE_NAMES.get(field_type, field_type)
+        self.aliasName = name
+        self.length = 255
+
+
+class Table:
+    def __init__(self, path, geometry_type=None, spatial_reference=None):
+        self.path = path
+        self.geometry_type = geometry_type
+        self.spatial_reference = spatial_reference or SpatialReference(4326)
+        self.dataset_id = _next_dataset_id[0]
+        _next_dataset_id[0] += 1
+
+        self.object_ids = []
+        self.field_types = {OID_FIELD_NAME: 'OID'}
+        self.columns = {}
+        self.defaults = {}
+        self.field_names = {OID_FIELD_NAME.lower(): OID_FIELD_NAME}
+        self.indexes = {}
+        if geometry_type:
+            self.add_field(SHAPE_FIELD_NAME, 'GEOMETRY')
+
+    def __len__(self):
+        return len(self.object_ids)
+
+    def add_field(self, name, field_type, values=None):
+        if name.lower() in self.field_names:
+            return
+        self.field_names[name.lower()] = name
+        self.field_types[name] = field_type
+        self.columns[name] = values if values is not None else [None] * len(self.object_ids)
+
+    def delete_field(self, name):
+        name = self.get_field_name(name)
+        if name in self.columns:
+            del self.columns[name]
+            del self.field_types[name]
+            del self.field_names[name.lower()]
+
+    def get_field_name(self, name):
+        if name in ('OID@', 'SHAPE@', 'SHAPE@WKB'):
+            return name
+        try:
+            return self.field_names[name.lower()]
+        except KeyError:
+            raise RuntimeError(f'Cannot find field {name} in {self.path}')
+
+    def get_column(self, name):
+        if name == 'OID@' or name == OID_FIELD_NAME:
+            return self.object_ids
+        if name.startswith('SHAPE@'):
+            return self.columns[SHAPE_FIELD_NAME]
+        return self.columns[name]
+
+    def get_extent(self):
+        shapes = self.columns.get(SHAPE_FIELD_NAME) or []
+        xs = [value for shape in shapes if shape is not None for value in shape.coordinates[0::2]]
+        ys = [value for shape in shapes if shape is not None for value in shape.coordinates[1::2]]
+        if not xs:
+            return Extent(None, None, None, None)
+        return Extent(min(xs), min(ys), max(xs), max(ys))
+
+
+def create_table(path, fields, geometry_type=None, spatial_reference=None):
+    """
+    Register a table filled with columns.
+    :param fields: Dict[name] = (field type, list of values), the SHAPE field type is GEOMETRY
+    """
+    table = Table(path, geometry_type, spatial_reference)
+    row_count = None
+    for name, (field_type, values) in fields.items():
+        row_count = len(values) if row_count is None else row_count
+        if len(values) != row_count:
+            raise ValueError(f'create_table, {name} has {len(values)} rows, expected {row_count}')
+
+        if field_type == 'GEOMETRY':
+            table.columns[SHAPE_FIELD_NAME] = list(values)
+        else:
+            table.add_field(name, field_type, list(values))
+
+    table.object_ids = list(range(1, (row_count or 0) + 1))
+    has_shape = any(field_type == 'GEOMETRY' for field_type, _ in fields.values())
+    if geometry_type and not has_shape:
+        table.columns[SHAPE_FIELD_NAME] = [None] * len(table.object_ids)
+    _tables[_get_key(path)] = table
+    return table
+
+
+def get_table(path):
+    return _tables[_get_key(path)]
+
+
+def reset():
+    _tables.clear()
+    _layers.clear()
+    _workspaces.clear()
+
+
+def _resolve(in_table):
+    """
+    :return: Table, where clause of the layer (None for a table)
+    """
+    key = _get_key(in_table)
+    if key in _layers:
+        source, layer_where_clause = _layers[key]
+        table, where_clause = _resolve(source)
+        return table, _join_where_clauses(where_clause, layer_where_clause)
+    if key in _tables:
+        return _tables[key], None
+    raise RuntimeError(f'Dataset {in_table} does not exist')
+
+
+def _join_where_clauses(*where_clauses):
+    where_clauses = [where_clause for where_clause in where_clauses if where_clause and where_clause != '#']
+    return ' AND '.join(where_clauses) or None
+
+
+def _parse_value(text):
+    text = text.strip()
+    if text.startswith("'") and text.endswith("'"):
+        return text[1:-1].replace("''", "'")
+    return float(text) if '.' in text else int(text)
+
+
+def _parse_condition(table, condition):
+    match = _IN_PATTERN.match(condition)
+    if match:
+        field_name = table.get_field_name(match.group(1))
+        return field_name, 'IN', {_parse_value(value) for value in match.group(2).split(',') if value.strip()}
+
+    match = _CONDITION_PATTERN.match(condition)
+    if match is None:
+        raise RuntimeError(f'Unsupported where clause condition: {condition}')
+    return table.get_field_name(match.group(1)), match.group(2), _parse_value(match.group(3))
+
+
+def _select_positions(table, where_clause):
+    positions = range(len(table))
+    if not where_clause or where_clause == '#':
+        return positions
+
+    for condition in _AND_PATTERN.split(where_clause):
+        field_name, operator, value = _parse_condition(table, condition)
+        if field_name == OID_FIELD_NAME and operator in ('>=', '<=', '>', '<'):
+            # object ids are ascending, a range is a slice
+            positions = _select_object_id_range(table, positions, operator, value)
+            continue
+
+        column = table.get_column(field_name)
+        if operator == 'IN':
+            positions = [position for position in positions if column[position] in value]
+        elif operator == '=':
+            positions = [position for position in positions if column[position] == value]
+        elif operator == '<>':
+            positions = [position for position in positions
+                         if column[position] is not None and column[position] != value]
+        elif operator == '>=':
+            positions = [position for position in positions if column[position] is not None
+                         and column[position] >= value]
+        elif operator == '<=':
+            positions = [position for position in positions if column[position] is not None
+                         and column[position] <= value]
+        elif operator == '>':
+            positions = [position for position in positions if column[position] is not None
+                         and column[position] > value]
+        else:
+            positions = [position for position in positions if column[position] is not None
+                         and column[position] < value]
+    return positions
+
+
+def _select_object_id_range(table, positions, operator, value):
+    object_ids = table.object_ids
+    if operator == '>=':
+        start, end = bisect.bisect_left(object_ids, value), len(object_ids)
+    elif operator == '>':
+        start, end = bisect.bisect_right(object_ids, value), len(object_ids)
+    elif operator == '<=':
+        start, end = 0, bisect.bisect_right(object_ids, value)
+    else:
+        start, end = 0, bisect.bisect_left(object_ids, value)
+
+    if isinstance(positions, range):
+        return range(max(positions.start, start), min(positions.stop, end))
+    return [position for position in positions if start <= position < end]
+
+
+def _order_positions(table, positions, field_names, sql_clause):
+    postfix = sql_clause[1] if sql_clause and len(sql_clause) > 1 and sql_clause[1] else ''
+    group_by = re.search(r'GROUP BY\s+([\w\s,]+?)(?:\s+ORDER BY|$)', postfix, re.IGNORECASE)
+    order_by = re.search(r'ORDER BY\s+([\w\s,]+)$', postfix, re.IGNORECASE)
+
+    if order_by:
+        order_fields = [table.get_field_name(name.strip()) for name in order_by.group(1).split(',')]
+        order_columns = [table.get_column(name) for name in order_fields]
+        positions = sorted(positions, key=lambda position: tuple(
+            (column[position] is not None, column[position]) for column in order_columns))
+
+    if group_by:
+        # one row for every distinct value of the selected fields
+        columns = [table.get_column(table.get_field_name(name)) for name in field_names]
+        seen, unique_positions = set(), []
+        for position in positions:
+            key = tuple(column[position] for column in columns)
+            if key not in seen:
+                seen.add(key)
+                unique_positions.append(position)
+        positions = unique_positions
+
+    return positions
+
+
+class _Cursor:
+    def __init__(self, in_table, field_names, where_clause=None, spatial_reference=None, explode_to_points=False,
+                 sql_clause=(None, None), **kwargs):
+        self.table, layer_where_clause = _resolve(in_table)
+        if isinstance(field_names, str):
+            field_names = [name.strip() for name in field_names.split(';')]
+        self.fields = [self.table.get_field_name(name) for name in field_names]
+        self.columns = [self.table.get_column(name) for name in self.fields]
+        where_clause = _join_where_clauses(layer_where_clause, where_clause)
+        positions = _select_positions(self.table, where_clause)
+        self.positions = _order_positions(self.table, positions, self.fields, sql_clause)
+        self.position = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def reset(self):
+        self.position = None
+
+
+class SearchCursor(_Cursor):
+    def __iter__(self):
+        columns = self.columns
+        for position in self.positions:
+            yield tuple(column[position] for column in columns)
+
+
+class UpdateCursor(_Cursor):
+    def __iter__(self):
+        columns = self.columns
+        for position in self.positions:
+            self.position = position
+            yield [column[position] for column in columns]
+
+    def updateRow(self, row):
+        for name, column, value in zip(self.fields, self.columns, row):
+            if name != 'OID@':
+                column[self.position] = value
+
+    def deleteRow(self):
+        raise NotImplementedError('fake_arcpy, deleteRow')
+
+
+class InsertCursor:
+    def __init__(self, in_table, field_names, **kwargs):
+        self.table, _ = _resolve(in_table)
+        if isinstance(field_names, str):
+            field_names = [name.strip() for name in field_names.split(';')]
+        self.fields = [self.table.get_field_name(name) for name in field_names]
+        self.shape_field = next((name for name in self.fields if name.startswith('SHAPE@')), None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def insertRow(self, row):
+        table = self.table
+        object_id = table.object_ids[-1] + 1 if table.object_ids else 1
+        table.object_ids.append(object_id)
+        values = dict(zip(self.fields, row))
+        for name, column in table.columns.items():
+            if name == SHAPE_FIELD_NAME and self.shape_field:
+                column.append(values[self.shape_field])
+            else:
+                column.append(values.get(name, table.defaults.get(name)))
+        return object_id
+
+
+def _to_numpy_array(in_table, field_names, where_clause=None, null_value=None, **kwargs):
+    table, layer_where_clause = _resolve(in_table)
+    if isinstance(field_names, str):
+        field_names = [name.strip() for name in field_names.split(';')]
+    fields = [table.get_field_name(name) for name in field_names]
+    positions = _select_positions(table, _join_where_clauses(layer_where_clause, where_clause))
+
+    null_values = null_value if isinstance(null_value, dict) else {}
+    arrays, dtypes = [], []
+    for field_name, name in zip(field_names, fields):
+        column = table.get_column(name)
+        values = [column[position] for position in positions]
+        default = null_values.get(field_name, null_value if not isinstance(null_value, dict) else None)
+        if default is not None:
+            values = [default if value is None else value for value in values]
+
+        field_type = 'OID' if name == 'OID@' else table.field_types.get(name)
+        if field_type in NUMPY_DTYPES:
+            dtype = NUMPY_DTYPES[field_type]
+        else:
+            dtype = f'<U{max([len(value) for value in values if value is not None], default=1)}'
+        arrays.append(values)
+        dtypes.append((field_name, dtype))
+
+    result = np.empty(len(positions), dtype=dtypes)
+    for (field_name, _), values in zip(dtypes, arrays):
+        result[field_name] = values
+    return result
+
+
+def _get_extra_argument(args, kwargs, index, name, default=None):
+    if len(args) > index:
+        return args[index]
+    return kwargs.get(name, default)
+
+
+def _add_field(in_table, field_name, field_type, *args, **kwargs):
+    table, _ = _resolve(in_table)
+    table.add_field(field_name, field_type.upper())
+    return in_table
+
+
+def _add_fields(in_table, field_description, *args, **kwargs):
+    for description in field_description:
+        _add_field(in_table, description[0], description[1])
+    return in_table
+
+
+def _delete_field(in_table, drop_field, *args, **kwargs):
+    table, _ = _resolve(in_table)
+    if isinstance(drop_field, str):
+        drop_field = drop_field.split(';')
+    for name in drop_field:
+        table.delete_field(name)
+    return in_table
+
+
+def _assign_default_to_field(in_table, field_name, default_value, *args, **kwargs):
+    table, _ = _resolve(in_table)
+    table.defaults[table.get_field_name(field_name)] = default_value
+    return in_table
+
+
+def _create_feature_class(out_path, out_name, geometry_type='POLYGON', *args, **kwargs):
+    spatial_reference = _get_extra_argument(args, kwargs, 4, 'spatial_reference')
+    path = os.path.join(str(out_path), out_name)
+    _tables[_get_key(path)] = Table(path, geometry_type.upper(), spatial_reference)
+    return path
+
+
+def _create_table(out_path, out_name, *args, **kwargs):
+    path = os.path.join(str(out_path), out_name)
+    _tables[_get_key(path)] = Table(path)
+    return path
+
+
+def _create_turn_feature_class(out_location, out_feature_class_name, maximum_edges=5, *args, **kwargs):
+    path = _create_feature_class(out_location, out_feature_class_name, 'POLYLINE')
+    table = get_table(path)
+    table.add_field('Edge1End', 'TEXT')
+    for i in range(maximum_edges):
+        table.add_field(f'Edge{i + 1}FCID', 'LONG')
+        table.add_field(f'Edge{i + 1}FID', 'LONG')
+        table.add_field(f'Edge{i + 1}Pos', 'DOUBLE')
+    return path
+
+
+def _make_feature_layer(in_features, out_layer, where_clause=None, *args, **kwargs):
+    _layers[_get_key(out_layer)] = (in_features, where_clause)
+    return out_layer
+
+
+def _delete(in_data, *args, **kwargs):
+    key = _get_key(in_data)
+    _layers.pop(key, None)
+    _tables.pop(key, None)
+    if key in _workspaces:
+        _workspaces.discard(key)
+        for table_key in [table_key for table_key in _tables if os.path.dirname(table_key) == key]:
+            del _tables[table_key]
+
+
+def _create_file_gdb(out_folder_path, out_name, *args, **kwargs):
+    out_name = out_name if out_name.lower().endswith('.gdb') else f'{out_name}.gdb'
+    path = os.path.join(str(out_folder_path), out_name)
+    _workspaces.add(_get_key(path))
+    return path
+
+
+def _copy(in_data, out_data, *args, **kwargs):
+    table = copy.deepcopy(get_table(in_data))
+    table.path = str(out_data)
+    _tables[_get_key(out_data)] = table
+    return out_data
+
+
+def _list_workspace_tables(is_feature_class):
+    workspace = _get_key(sys.modules['arcpy'].env.workspace)
+    return [os.path.basename(table.path) for key, table in _tables.items()
+            if os.path.dirname(key) == workspace and bool(table.geometry_type) == is_feature_class]
+
+
+def _get_count(in_rows):
+    table, where_clause = _resolve(in_rows)
+    return [str(len(_select_positions(table, where_clause)))]
+
+
+def _append(inputs, target, schema_type='TEST', *args, **kwargs):
+    """
+    NO_TEST, the fields of the target take the values of the input fields of the same name.
+    """
+    target_table, _ = _resolve(target)
+    for in_table in inputs if isinstance(inputs, (list, tuple)) else [inputs]:
+        table, where_clause = _resolve(in_table)
+        field_names = {name.lower(): name for name in table.columns}
+        for position in _select_positions(table, where_clause):
+            target_table.object_ids.append(target_table.object_ids[-1] + 1 if target_table.object_ids else 1)
+            for name, column in target_table.columns.items():
+                source_name = field_names.get(name.lower())
+                column.append(table.columns[source_name][position] if source_name
+                              else target_table.defaults.get(name))
+    return target
+
+
+def _join_field(in_data, in_field, join_table, join_field, fields=None, *args, **kwargs):
+    """
+    A row of in_data takes the values of the first join table row with its key, NULL without a match.
+    """
+    table, _ = _resolve(in_data)
+    join, join_where_clause = _resolve(join_table)
+    if isinstance(fields, str):
+        fields = [name.strip() for name in fields.split(';')]
+
+    join_keys = join.get_column(join.get_field_name(join_field))
+    first_positions = {}
+    for position in _select_positions(join, join_where_clause):
+        if join_keys[position] is not None:
+            first_positions.setdefault(join_keys[position], position)
+
+    keys = table.get_column(table.get_field_name(in_field))
+    for name in fields:
+        join_name = join.get_field_name(name)
+        join_column = join.get_column(join_name)
+        values = [join_column[first_positions[key]] if key in first_positions else None for key in keys]
+        table.add_field(join_name, join.field_types[join_name])
+        table.columns[table.get_field_name(join_name)] = values
+    return in_data
+
+
+def parse_field_mapping(field_mapping):
+    """
+    :return: [(output field, field type, source field)] of a field mapping string of the GP tools
+    """
+    results = []
+    for item in field_mapping.split(';'):
+        if not item.strip():
+            continue
+        definition, _, source = item.partition(',First,#,')
+        tokens = definition.split()
+        results.append((tokens[0], FIELD_MAPPING_TYPES[tokens[6].upper()], source.split(',')[-3]))
+    return results
+
+
+def _convert_value(value, field_type):
+    if value is None:
+        return None
+    if field_type == 'TEXT':
+        return value if isinstance(value, str) else str(value)
+    if field_type in ('LONG', 'SHORT'):
+        return int(value)
+    if field_type == 'DOUBLE':
+        return float(value)
+    return value
+
+
+def _export_features(in_features, out_features, where_clause=None, use_field_alias_as_name=None,
+                     field_mapping=None, sort_field=None, *args, **kwargs):
+    table, layer_where_clause = _resolve(in_features)
+    positions = _select_positions(table, _join_where_clauses(layer_where_clause, where_clause))
+
+    if field_mapping and field_mapping != '#':
+        mappings = parse_field_mapping(field_mapping)
+    else:
+        mappings = [(name, field_type, name) for name, field_type in table.field_types.items()
+                    if field_type not in ('OID', 'GEOMETRY')]
+
+    fields = {}
+    if table.geometry_type:
+        shapes = table.columns[SHAPE_FIELD_NAME]
+        fields[SHAPE_FIELD_NAME] = ('GEOMETRY', [shapes[position] for position in positions])
+    for name, field_type, source_field in mappings:
+        column = table.get_column(table.get_field_name(source_field))
+        fields[name] = (field_type, [_convert_value(column[position], field_type) for position in positions])
+
+    create_table(out_features, fields, table.geometry_type, table.spatial_reference)
+    return out_features
+
+
+class _Describe:
+    def __init__(self, table):
+        self._table = table
+        self.OIDFieldName = OID_FIELD_NAME
+        self.DSID = table.dataset_id
+        self.spatialReference = table.spatial_reference
+        self.fields = [Field(name, field_type) for name, field_type in table.field_types.items()]
+        self.dataType = 'FeatureClass' if table.geometry_type else 'Table'
+        if table.geometry_type:
+            self.featureType = 'Simple'
+            self.shapeType = table.geometry_type.capitalize()
+            self.shapeFieldName = SHAPE_FIELD_NAME
+
+    @property
+    def extent(self):
+        return self._table.get_extent()
+
+
+def _describe(value):
+    table, _ = _resolve(value)
+    return _Describe(table)
+
+
+def _exists(dataset):
+    key = _get_key(dataset)
+    return key in _tables or key in _layers or key in _workspaces
+
+
+def _list_fields(dataset, *args, **kwargs):
+    return _describe(dataset).fields
+
+
+def _add_index(in_table, fields, index_name=None, *args, **kwargs):
+    table = _resolve(in_table)[0]
+    if index_name.lower() in (name.lower() for name in table.indexes):
+        raise RuntimeError(f'AddIndex, {index_name} already exists in {table.path}')
+    table.indexes[index_name] = fields if isinstance(fields, list) else fields.split(';')
+
+
+def _list_indexes(dataset, *args, **kwargs):
+    return [types.SimpleNamespace(name=name, fields=[Field(field_name, 'TEXT') for field_name in fields])
+            for name, fields in _resolve(dataset)[0].indexes.items()]
+
+
+def _create_module():
+    module = types.ModuleType('arcpy')
+    module.__doc__ = __doc__
+    module.env = types.SimpleNamespace(workspace=None, overwriteOutput=True)
+    module.Point = Point
+    module.Polyline = Polyline
+    module.Polygon = Polygon
+    module.PointGeometry = PointGeometry
+    module.SpatialReference = SpatialReference
+    module.Describe = _describe
+    module.Exists = _exists
+    module.ListFields = _list_fields
+    module.ListIndexes = _list_indexes
+    module.ListFeatureClasses = lambda *args, **kwargs: _list_workspace_tables(True)
+    module.ListTables = lambda *args, **kwargs: _list_workspace_tables(False)
+    module.AddMessage = print
+    module.SetProgressorLabel = print
+    module.da = types.SimpleNamespace(
+        SearchCursor=SearchCursor,
+        UpdateCursor=UpdateCursor,
+        InsertCursor=InsertCursor,
+        FeatureClassToNumPyArray=_to_numpy_array,
+        TableToNumPyArray=_to_numpy_array
+    )
+    module.management = types.SimpleNamespace(
+        AddField=_add_field,
+        AddFields=_add_fields,
+        AddIndex=_add_index,
+        Append=_append,
+        DeleteField=_delete_field,
+        AssignDefaultToField=_assign_default_to_field,
+        Copy=_copy,
+        CreateFileGDB=_create_file_gdb,
+        CreateFeatureclass=_create_feature_class,
+        CreateTable=_create_table,
+        MakeFeatureLayer=_make_feature_layer,
+        MakeTableView=_make_feature_layer,
+        Delete=_delete,
+        GetCount=_get_count,
+        JoinField=_join_field
+    )
+    module.conversion = types.SimpleNamespace(ExportFeatures=_export_features, ExportTable=_export_features)
+    module.na = types.SimpleNamespace(CreateTurnFeatureClass=_create_turn_feature_class)
+    return module
+
+
+def install():
+    """
+    Register the stand-in as the arcpy module, the tables only exist in the stand-in.
+    """
+    sys.modules['arcpy'] = _create_module()
+    return sys.modules['arcpy']
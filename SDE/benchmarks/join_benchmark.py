@@ -0,0 +1,87 @@
+"""
+Compare arcpy JoinField with hash_join_field on the national signpost table, needs ArcGIS Pro.
+
+    python benchmarks/join_benchmark.py --workspace D:/national/plus.gdb
+
+Both joins copy State and City of the national streets to a copy of SIGNPOST_TABLE through SegmentID -> LocalId,
+then the two copies are compared row by row. The copies are written to a scratch File Geodatabase next to the
+workspace and deleted at the end.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import arcpy  # noqa: E402
+
+import constants  # noqa: E402
+from attribute_join import hash_join_field  # noqa: E402
+from national_map_logger import NationalMapLogger  # noqa: E402
+
+JOIN_FIELDS = ['State', 'City']
+SCRATCH_GDB_NAME = 'join_benchmark.gdb'
+
+
+def _copy_signpost_table(signpost_table, scratch_gdb, name):
+    out_table = os.path.join(scratch_gdb, name)
+    arcpy.conversion.ExportTable(signpost_table, out_table)
+    # a finished national build already has the joined fields
+    existing_fields = [field_name for field_name in JOIN_FIELDS if arcpy.ListFields(out_table, field_name)]
+    if existing_fields:
+        arcpy.management.DeleteField(out_table, existing_fields)
+    return out_table
+
+
+def _measure(name, func, rows):
+    start_time = time.perf_counter()
+    func()
+    cost_time = time.perf_counter() - start_time
+    print(f'{name:<24} rows: {rows:>12,}  time: {cost_time:>9.2f} sec.  '
+          f'{rows / max(cost_time, 1e-9):>12,.0f} rows/sec.')
+    return cost_time
+
+
+def _count_differences(join_field_table, hash_join_table):
+    fields = ['OID@'] + JOIN_FIELDS
+    join_field_rows = {row[0]: row[1:] for row in arcpy.da.SearchCursor(join_field_table, fields)}
+    return sum(1 for row in arcpy.da.SearchCursor(hash_join_table, fields) if join_field_rows.get(row[0]) != row[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workspace', required=True, help='national File Geodatabase')
+    args = parser.parse_args()
+
+    NationalMapLogger.logger = logging.getLogger('join_benchmark')
+    NationalMapLogger.logger.setLevel(logging.WARNING)
+    arcpy.env.overwriteOutput = True
+
+    national_items = constants.GDB_ITEMS_DICT['NATIONAL']
+    street_feature_class = os.path.join(args.workspace, national_items['DATASET']['name'],
+                                        national_items['DATASET']['street_name'])
+    signpost_table = os.path.join(args.workspace, national_items['signpost_table_name'])
+
+    scratch_folder = os.path.dirname(os.path.abspath(args.workspace))
+    scratch_gdb = os.path.join(scratch_folder, SCRATCH_GDB_NAME)
+    arcpy.management.CreateFileGDB(scratch_folder, SCRATCH_GDB_NAME)
+    try:
+        rows = int(arcpy.management.GetCount(signpost_table)[0])
+        join_field_table = _copy_signpost_table(signpost_table, scratch_gdb, 'signpost_join_field')
+        hash_join_table = _copy_signpost_table(signpost_table, scratch_gdb, 'signpost_hash_join')
+
+        join_field_time = _measure('JoinField', lambda: arcpy.management.JoinField(
+            join_field_table, 'SegmentID', street_feature_class, 'LocalId', JOIN_FIELDS), rows)
+        hash_join_time = _measure('hash_join_field', lambda: hash_join_field(
+            hash_join_table, 'SegmentID', street_feature_class, 'LocalId', JOIN_FIELDS), rows)
+
+        print(f'speedup: {join_field_time / max(hash_join_time, 1e-9):.1f}x, '
+              f'different rows: {_count_differences(join_field_table, hash_join_table):,}')
+    finally:
+        arcpy.management.Delete(scratch_gdb)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Memory of the LocalId -> OBJECTID lookup, dict of strings vs LocalIdLookup.
+
+    python benchmarks/local_id_lookup_memory.py --rows 1000000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_id_lookup import LocalIdLookup  # noqa: E402
+
+
+def _generate_items(rows):
+    for object_id in range(1, rows + 1):
+        yield str(uuid.uuid4()).upper(), object_id
+
+
+def _measure(name, create_lookup, rows):
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+
+    lookup = create_lookup(_generate_items(rows))
+
+    cost_time = time.perf_counter() - start_time
+    current_memory, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{name:<16} rows: {rows:>12,}  retained: {current_memory / 1024.0 ** 2:>10.1f} MiB  '
+          f'peak: {peak_memory / 1024.0 ** 2:>10.1f} MiB  build: {cost_time:>8.1f} sec.')
+    return lookup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    dict_lookup = _measure('dict', lambda items: {local_id: object_id for local_id, object_id in items}, args.rows)
+    del dict_lookup
+    compact_lookup = _measure('LocalIdLookup', LocalIdLookup.from_items, args.rows)
+    print(f'LocalIdLookup arrays: {compact_lookup.nbytes / 1024.0 ** 2:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Time the converters on synthetic NAVPREM data, in memory through the fake_arcpy stand-in.
+
+    python benchmarks/pipeline_benchmark.py --rows 10000 1000000 10000000
+
+--rows is the number of streets, the restrictions, signposts, towns and postcodes scale with it.
+The stages run the cursor, lookup and Python work of StateStreetConverter, StateSignpostConverter,
+NationalRestrictionTurnFactory and NationalSignpostFactory. The geoprocessing tools (Buffer, AddSpatialJoin,
+JoinField, Project) need ArcGIS Pro and are not part of it, 10M streets need about 25 GB of memory.
+"""
+import argparse
+import gc
+import logging
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARK_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_FOLDER))
+sys.path.insert(0, BENCHMARK_FOLDER)
+
+import fake_arcpy  # noqa: E402
+
+fake_arcpy.install()
+
+import constants  # noqa: E402
+from attribute_join import hash_join_field  # noqa: E402
+import map_convertor_configuration  # noqa: E402
+from map_convertor_configuration import MapConvertorConfiguration  # noqa: E402
+from national_map_logger import NationalMapLogger, get_peak_memory_usage  # noqa: E402
+from national_restriction_turn_factory import NationalRestrictionTurnFactory  # noqa: E402
+from national_signpost_factory import NationalSignpostFactory  # noqa: E402
+from national_street_index import NationalStreetIndex, get_street_index_folder  # noqa: E402
+from state_data_settings import StateDataSettings  # noqa: E402
+from state_exporter import StateExporter  # noqa: E402
+from state_signpost_converter import StateSignpostConverter  # noqa: E402
+from state_street_converter import StateStreetConverter  # noqa: E402
+from synthetic_navprem import create_synthetic_data  # noqa: E402
+
+STATE = 'CO'
+
+
+class BenchmarkConfiguration(MapConvertorConfiguration):
+    """
+    Configuration without the XML file, only the settings the measured stages read.
+    """
+
+    def __init__(self, workspace):
+        self.configuration_file, self.tree, self.root = None, None, None
+        self.data = {
+            'Precisely': {'version': 'BENCHMARK', 'fgdb_location': os.path.join(workspace, 'precisely')},
+            'Logging': {'log_level': 'WARNING', 'tracing': False},
+            'Outputs': {'format': constants.OUT_FORMAT['FILE_GDB'],
+                        'scratch_folder': os.path.join(workspace, 'scratch')},
+            'Performance': {
+                'street_field_calculation': map_convertor_configuration.STREET_FIELD_CALCULATION['VECTORIZED'],
+                'street_group_engine': map_convertor_configuration.STREET_GROUP_ENGINE['GRAPH'],
+                'read_from_zip': False,
+                'fused_state_export': False,
+                'export_workers': 1
+            }
+        }
+
+
+def _measure(name, func, rows):
+    gc.collect()
+    start_time = time.perf_counter()
+    result = func()
+    cost_time = time.perf_counter() - start_time
+
+    print(f'{name:<58} rows: {rows:>12,}  time: {cost_time:>9.2f} sec.  '
+          f'{rows / max(cost_time, 1e-9):>12,.0f} rows/sec.')
+    return result
+
+
+def _get_row_count(path):
+    return len(fake_arcpy.get_table(path))
+
+
+def _run_state_benchmarks(configuration, rows):
+    data_settings = StateDataSettings(STATE, configuration)
+    exporter = StateExporter(data_settings)
+
+    street_converter = StateStreetConverter(data_settings, exporter)
+    source_streets = exporter.get_precisely_feature_path(f'usa_{data_settings.state}_streets')
+    _measure('StateStreetConverter._export_state_streets', street_converter._export_state_streets, rows)
+    street_feature_class = street_converter.data['state_street_feature_class']
+    street_count = _get_row_count(street_feature_class)
+
+    street_converter._alter_street_fields()
+    _measure('StateStreetConverter._add_group_id_with_graph', street_converter._add_group_id_with_graph,
+             street_count + _get_row_count(source_streets))
+    _measure('StateStreetConverter._calculate_street_fields_vectorized',
+             street_converter._calculate_street_fields_vectorized, street_count)
+    _measure('StateStreetConverter._calculate_street_fields_with_cursor',
+             street_converter._calculate_street_fields_with_cursor, street_count)
+
+    signpost_destinations = exporter.get_precisely_feature_path(f'{data_settings.state}signpostdestinations')
+    signpost_converter = _measure('StateSignpostConverter, street endpoint cache',
+                                  lambda: StateSignpostConverter(data_settings, exporter, street_converter.data),
+                                  street_count)
+    _measure('StateSignpostConverter._export_state_signposts', signpost_converter._export_state_signposts,
+             _get_row_count(signpost_destinations))
+
+
+def _run_national_benchmarks(configuration, workspace):
+    national_items = constants.GDB_ITEMS_DICT['NATIONAL']
+    street_feature_class = os.path.join(workspace, national_items['DATASET']['name'],
+                                        national_items['DATASET']['street_name'])
+    restriction_feature_class = os.path.join(workspace, national_items['restriction_name'])
+    signpost_table = os.path.join(workspace, national_items['signpost_table_name'])
+
+    index_folder = get_street_index_folder(configuration, workspace)
+    _measure('NationalStreetIndex.get_index', lambda: NationalStreetIndex.get_index(street_feature_class,
+                                                                                     index_folder),
+             _get_row_count(street_feature_class))
+
+    turn_factory = NationalRestrictionTurnFactory(configuration, workspace)
+    turn_factory._create_turn_feature_class()
+    _measure('NationalRestrictionTurnFactory._create_turn_features', turn_factory._create_turn_features,
+             _get_row_count(restriction_feature_class))
+
+    signpost_factory = NationalSignpostFactory(configuration, workspace)
+    _measure('NationalSignpostFactory._update_signpost_edge_feature_id',
+             lambda: signpost_factory._update_signpost_edge_feature_id_in_file_gdb(signpost_table),
+             _get_row_count(signpost_table))
+    _measure('attribute_join.hash_join_field, signposts SegmentID',
+             lambda: hash_join_field(signpost_table, 'SegmentID', street_feature_class, 'LocalId', ['State', 'City']),
+             _get_row_count(signpost_table))
+
+
+def _run(rows, seed):
+    with tempfile.TemporaryDirectory() as folder:
+        configuration = BenchmarkConfiguration(folder)
+        os.makedirs(configuration.get_scratch_folder())
+        precisely_geodatabase = StateDataSettings(STATE, configuration).get_precisely_file_geodatabase()
+        national_workspace = os.path.join(folder, 'national.gdb')
+
+        counts = _measure('create_synthetic_data', lambda: create_synthetic_data(
+            STATE, rows, precisely_geodatabase, national_workspace, seed), rows)
+        print('  ' + ', '.join(f'{name}: {count:,}' for name, count in counts.items()))
+
+        _run_state_benchmarks(configuration, rows)
+        _run_national_benchmarks(configuration, national_workspace)
+
+        fake_arcpy.reset()
+        NationalStreetIndex._instances.clear()
+
+    print(f'peak memory: {get_peak_memory_usage() / 1024.0 ** 3:.1f} GiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # the converters log through NationalMapLogger, which is set up by national_main otherwise
+    NationalMapLogger.logger = logging.getLogger('pipeline_benchmark')
+    NationalMapLogger.logger.setLevel(logging.WARNING)
+
+    for rows in args.rows:
+        _run(rows, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""
+Synthetic NAVPREM-like data of one state, written into the tables of fake_arcpy.
+
+The streets are a grid of nodes joined by horizontal and vertical streets with START_NODE/END_NODE topology.
+Restrictions follow connected streets in groups of 2 to 3 sequences, signposts have 1 to 3 streets with branch,
+toward and exit destinations. Towns and postcodes are squares over the grid. The national tables of the
+restriction turn and signpost factories are derived from the same streets.
+
+Import it after fake_arcpy.install(), constants imports arcpy.
+"""
+import math
+import os
+import uuid
+
+import numpy as np
+
+import constants
+import fake_arcpy
+
+GRID_ORIGIN = (-100.0, 35.0)
+GRID_SPACING = 0.002
+METERS_PER_DEGREE = 111_320.0
+
+ROAD_CLASSES = ['M', 'P', 'S', 'C', 'F', 'Z', 'H']
+ROAD_CLASS_WEIGHTS = [0.03, 0.07, 0.15, 0.25, 0.43, 0.05, 0.02]
+STREET_TYPES = [1000, 1004, 1010, 1510, 2000, 26014, 28019]
+STREET_TYPE_WEIGHTS = [0.70, 0.03, 0.04, 0.02, 0.17, 0.03, 0.01]
+ONEWAY_VALUES = [1, 2, 3, 4]
+ONEWAY_WEIGHTS = [0.85, 0.06, 0.06, 0.03]
+
+UNNAMED_STREET_RATE = 0.05
+RESTRICTION_RATE = 0.1
+SIGNPOST_RATE = 0.05
+STREETS_PER_TOWN = 2_000
+STREETS_PER_POSTCODE = 500
+
+
+def create_uuids(count, rng):
+    id_bytes = rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+    return [str(uuid.UUID(bytes=item.tobytes())).upper() for item in id_bytes]
+
+
+def _get_grid_size(street_count):
+    # 2 * n * (n - 1) streets on a grid of n x n nodes
+    return max(int(math.ceil(math.sqrt(street_count / 2.0))) + 1, 2)
+
+
+def create_street_network(street_count, rng):
+    """
+    :return: Dict of numpy arrays, the first street_count streets of the grid, row by row
+    """
+    size = _get_grid_size(street_count)
+    columns, rows = np.meshgrid(np.arange(size), np.arange(size))
+    columns, rows = columns.ravel(), rows.ravel()
+
+    is_horizontal = np.concatenate([np.ones(size * size, dtype=bool), np.zeros(size * size, dtype=bool)])
+    start_columns, start_rows = np.concatenate([columns, columns]), np.concatenate([rows, rows])
+    end_columns = start_columns + is_horizontal
+    end_rows = start_rows + ~is_horizontal
+    is_inside = (end_columns < size) & (end_rows < size)
+
+    order = np.lexsort((start_columns, ~is_horizontal, start_rows))
+    order = order[is_inside[order]][:street_count]
+    start_columns, start_rows = start_columns[order], start_rows[order]
+    end_columns, end_rows, is_horizontal = end_columns[order], end_rows[order], is_horizontal[order]
+
+    start_nodes = start_rows * size + start_columns
+    end_nodes = end_rows * size + end_columns
+
+    # the next street of a restriction or signpost starts at the end node
+    street_by_start_node = np.full(size * size, -1, dtype=np.int64)
+    street_by_start_node[start_nodes[::-1]] = np.arange(len(order))[::-1]
+    next_streets = street_by_start_node[end_nodes]
+
+    coordinates = np.column_stack([
+        GRID_ORIGIN[0] + start_columns * GRID_SPACING, GRID_ORIGIN[1] + start_rows * GRID_SPACING,
+        GRID_ORIGIN[0] + end_columns * GRID_SPACING, GRID_ORIGIN[1] + end_rows * GRID_SPACING
+    ])
+    return {
+        'start_nodes': start_nodes,
+        'end_nodes': end_nodes,
+        'next_streets': next_streets,
+        'is_horizontal': is_horizontal,
+        'rows': start_rows,
+        'columns': start_columns,
+        'coordinates': coordinates,
+        'node_count': size * size
+    }
+
+
+def _get_street_names(network, rng):
+    # one name for a horizontal row or a vertical column of the grid
+    names = np.where(network['is_horizontal'],
+                     np.char.add(network['rows'].astype(str), ' ST'),
+                     np.char.add(network['columns'].astype(str), ' AVE')).astype(object)
+    names[rng.random(len(names)) < UNNAMED_STREET_RATE] = ''
+    return names.tolist()
+
+
+def _get_street_lengths(coordinates):
+    latitude = np.radians((coordinates[:, 1] + coordinates[:, 3]) / 2.0)
+    dx = (coordinates[:, 2] - coordinates[:, 0]) * np.cos(latitude)
+    dy = coordinates[:, 3] - coordinates[:, 1]
+    return np.hypot(dx, dy) * METERS_PER_DEGREE
+
+
+def _choose(values, weights, count, rng):
+    return np.array(values)[rng.choice(len(values), size=count, p=weights)].tolist()
+
+
+def create_state_streets(path, network, feature_ids, rng):
+    count = len(feature_ids)
+    node_ids = create_uuids(network['node_count'], rng)
+    from_left = rng.integers(1, 9_999, size=count) * 2
+    from_left[rng.random(count) < 0.1] = -1
+    to_left = np.where(from_left == -1, -1, from_left + 98)
+    postcodes = np.char.zfill(rng.integers(10_000, 99_999, size=count).astype(str), 5).tolist()
+    speed = rng.choice([25, 35, 45, 55, 65], size=count).tolist()
+
+    fields = {
+        'SHAPE': ('GEOMETRY', [fake_arcpy.Polyline(item) for item in network['coordinates'].tolist()]),
+        'FEATURE_ID': ('TEXT', feature_ids),
+        'STREET': ('TEXT', _get_street_names(network, rng)),
+        'FROMLEFT': ('LONG', from_left.tolist()),
+        'TOLEFT': ('LONG', to_left.tolist()),
+        'FROMRIGHT': ('LONG', np.where(from_left == -1, -1, from_left + 1).tolist()),
+        'TORIGHT': ('LONG', np.where(to_left == -1, -1, to_left + 1).tolist()),
+        'LOCALITY_CODE_LEFT': ('TEXT', ['L1'] * count),
+        'LOCALITY_CODE_RIGHT': ('TEXT', ['L1'] * count),
+        'PC_LEFT': ('TEXT', postcodes),
+        'PC_RIGHT': ('TEXT', postcodes),
+        'FCODE': ('LONG', _choose(STREET_TYPES, STREET_TYPE_WEIGHTS, count, rng)),
+        'ROAD_CLASS': ('TEXT', _choose(ROAD_CLASSES, ROAD_CLASS_WEIGHTS, count, rng)),
+        'LENGTH': ('DOUBLE', _get_street_lengths(network['coordinates']).tolist()),
+        'SPEED': ('LONG', speed),
+        'ONEWAY': ('LONG', _choose(ONEWAY_VALUES, ONEWAY_WEIGHTS, count, rng)),
+        'ROUGHRD': ('LONG', (rng.random(count) < 0.01).astype(int).tolist()),
+        'LEVEL_BEG': ('LONG', [0] * count),
+        'LEVEL_END': ('LONG', [0] * count),
+        'MAX_HEIGHT': ('DOUBLE', [0.0] * count),
+        'MAX_WEIGHT': ('DOUBLE', [0.0] * count),
+        'START_NODE': ('TEXT', [node_ids[node] for node in network['start_nodes'].tolist()]),
+        'END_NODE': ('TEXT', [node_ids[node] for node in network['end_nodes'].tolist()])
+    }
+    return fake_arcpy.create_table(path, fields, 'POLYLINE')
+
+
+def create_street_paths(network, path_count, min_length, max_length, rng):
+    """
+    :return: [[street index]] of path_count paths of min_length to max_length connected streets,
+        shorter at the edge of the grid
+    """
+    street_count = len(network['next_streets'])
+    first_streets = rng.choice(street_count, size=min(path_count, street_count), replace=False)
+    lengths = rng.integers(min_length, max_length + 1, size=len(first_streets))
+    next_streets = network['next_streets'].tolist()
+
+    paths = []
+    for street, length in zip(first_streets.tolist(), lengths.tolist()):
+        path = [street]
+        while len(path) < length and next_streets[path[-1]] != -1:
+            path.append(next_streets[path[-1]])
+        paths.append(path)
+    return paths
+
+
+def create_state_restrictions(path, paths, feature_ids, shapes, rng):
+    restriction_ids = create_uuids(len(paths), rng)
+    # a few restrictions are of another type or vehicle, the state export filters them
+    restriction_types = _choose(['8I', '8D'], [0.95, 0.05], len(paths), rng)
+    vehicle_types = _choose([0, 1], [0.95, 0.05], len(paths), rng)
+
+    fields = {name: (field_type, []) for name, field_type in [
+        ('SHAPE', 'GEOMETRY'), ('RESTRICTION_ID', 'TEXT'), ('SEQUENCE_NUM', 'LONG'), ('FEATURE_ID', 'TEXT'),
+        ('RESTRICTION_TYPE', 'TEXT'), ('VEHICLE_TYPE', 'LONG')
+    ]}
+    for restriction_path, restriction_id, restriction_type, vehicle_type in zip(
+            paths, restriction_ids, restriction_types, vehicle_types):
+        for sequence_num, street in enumerate(restriction_path, start=1):
+            for name, value in [('SHAPE', shapes[street]), ('RESTRICTION_ID', restriction_id),
+                                ('SEQUENCE_NUM', sequence_num), ('FEATURE_ID', feature_ids[street]),
+                                ('RESTRICTION_TYPE', restriction_type), ('VEHICLE_TYPE', vehicle_type)]:
+                fields[name][1].append(value)
+    return fake_arcpy.create_table(path, fields, 'POLYLINE')
+
+
+def create_state_signposts(signposts_path, destinations_path, paths, feature_ids, shapes, rng):
+    signpost_ids = create_uuids(len(paths), rng)
+    fake_arcpy.create_table(signposts_path, {
+        'SHAPE': ('GEOMETRY', [shapes[signpost_path[0]] for signpost_path in paths]),
+        'SignpostID': ('TEXT', signpost_ids)
+    }, 'POLYLINE')
+
+    fields = {name: (field_type, []) for name, field_type in [
+        ('SignpostID', 'TEXT'), ('StreetID', 'TEXT'), ('StreetSeq', 'LONG'), ('Connection', 'LONG'),
+        ('DestinationSeq', 'LONG'), ('DestinationName', 'TEXT')
+    ]}
+    branch_counts = rng.integers(1, 3, size=len(paths)).tolist()
+    for signpost_path, signpost_id, branch_count in zip(paths, signpost_ids, branch_counts):
+        # branches, one toward and one exit: (Connection, DestinationSeq, DestinationName)
+        destinations = [(1, sequence, f'I-{sequence}{len(signpost_path)}') for sequence in range(1, branch_count + 1)]
+        destinations.extend([(2, 1, 'DOWNTOWN'), (3, 1, f'EXIT {branch_count}')])
+
+        # the destinations table is the cross product of the streets and the destinations of a signpost
+        for street_sequence, street in enumerate(signpost_path, start=1):
+            for connection, destination_sequence, destination_name in destinations:
+                for name, value in [('SignpostID', signpost_id), ('StreetID', feature_ids[street]),
+                                    ('StreetSeq', street_sequence), ('Connection', connection),
+                                    ('DestinationSeq', destination_sequence), ('DestinationName', destination_name)]:
+                    fields[name][1].append(value)
+    fake_arcpy.create_table(destinations_path, fields)
+    return signpost_ids
+
+
+def _create_grid_squares(network, square_count):
+    """
+    :return: [Polygon] of the squares of a square_count grid over the street grid
+    """
+    size = _get_grid_size(len(network['next_streets']))
+    per_side = max(int(math.sqrt(square_count)), 1)
+    step = (size - 1) * GRID_SPACING / per_side
+    squares = []
+    for row in range(per_side):
+        for column in range(per_side):
+            x_min, y_min = GRID_ORIGIN[0] + column * step, GRID_ORIGIN[1] + row * step
+            squares.append(fake_arcpy.Polygon([x_min, y_min, x_min + step, y_min, x_min + step, y_min + step,
+                                               x_min, y_min + step, x_min, y_min]))
+    return squares
+
+
+def create_state_towns(path, state, network, rng):
+    squares = _create_grid_squares(network, max(len(network['next_streets']) // STREETS_PER_TOWN, 1))
+    return fake_arcpy.create_table(path, {
+        'SHAPE': ('GEOMETRY', squares),
+        'Name': ('TEXT', [f'TOWN {index}' for index in range(len(squares))]),
+        'A1_Abbrev': ('TEXT', [state.upper()] * len(squares)),
+        'A2_Code': ('TEXT', [f'{index % 100:03d}' for index in range(len(squares))]),
+        'ID': ('TEXT', create_uuids(len(squares), rng))
+    }, 'POLYGON')
+
+
+def create_state_postcodes(path, network):
+    squares = _create_grid_squares(network, max(len(network['next_streets']) // STREETS_PER_POSTCODE, 1))
+    return fake_arcpy.create_table(path, {
+        'SHAPE': ('GEOMETRY', squares),
+        'PC_Name': ('TEXT', [f'POSTCODE {index}' for index in range(len(squares))]),
+        'PostalCode': ('TEXT', [f'{10_000 + index:05d}' for index in range(len(squares))])
+    }, 'POLYGON')
+
+
+def create_national_tables(workspace, streets, restrictions, signpost_paths, signpost_ids):
+    """
+    National streets, restrictions and signposts table, as the national importer and the state signpost
+    converter leave them for the restriction turn and signpost factories.
+    """
+    national_items = constants.GDB_ITEMS_DICT['NATIONAL']
+    street_fields = {'SHAPE': ('GEOMETRY', streets.columns[fake_arcpy.SHAPE_FIELD_NAME]),
+                     'LocalId': ('TEXT', streets.columns['FEATURE_ID']),
+                     'State': ('TEXT', ['XX'] * len(streets)),
+                     'City': ('TEXT', [f'TOWN {index // STREETS_PER_TOWN}' for index in range(len(streets))])}
+    street_path = os.path.join(workspace, national_items['DATASET']['name'], national_items['DATASET']['street_name'])
+    fake_arcpy.create_table(street_path, street_fields, 'POLYLINE')
+
+    restriction_fields = {'SHAPE': ('GEOMETRY', restrictions.columns[fake_arcpy.SHAPE_FIELD_NAME])}
+    for name in ['RESTRICTION_ID', 'SEQUENCE_NUM', 'FEATURE_ID']:
+        restriction_fields[name] = (restrictions.field_types[name], restrictions.columns[name])
+    restriction_fields['State'] = ('TEXT', ['XX'] * len(restrictions))
+    restriction_fields['City'] = ('TEXT', ['TOWN'] * len(restrictions))
+    fake_arcpy.create_table(os.path.join(workspace, national_items['restriction_name']), restriction_fields,
+                            'POLYLINE')
+
+    feature_ids = streets.columns['FEATURE_ID']
+    fields = {name: (field_type, []) for name, field_type in [
+        ('SignpostID', 'LONG'), ('Sequence', 'LONG'), ('EdgeFCID', 'LONG'), ('EdgeFID', 'LONG'),
+        ('EdgeFrmPos', 'DOUBLE'), ('EdgeToPos', 'DOUBLE'), ('SegmentID', 'TEXT'), ('SrcSignID', 'TEXT')
+    ]}
+    for signpost_oid, (signpost_path, signpost_id) in enumerate(zip(signpost_paths, signpost_ids), start=1):
+        for sequence, street in enumerate(signpost_path, start=1):
+            for name, value in [('SignpostID', signpost_oid), ('Sequence', sequence), ('EdgeFCID', -1),
+                                ('EdgeFID', None), ('EdgeFrmPos', 0.0), ('EdgeToPos', 1.0),
+                                ('SegmentID', feature_ids[street]), ('SrcSignID', signpost_id)]:
+                fields[name][1].append(value)
+    fake_arcpy.create_table(os.path.join(workspace, national_items['signpost_table_name']), fields)
+
+
+def create_synthetic_data(state, street_count, precisely_geodatabase, national_workspace, seed=0):
+    """
+    :return: Dict[table name] = row count of the generated tables
+    """
+    rng = np.random.default_rng(seed)
+    state = state.lower()
+    network = create_street_network(street_count, rng)
+    feature_ids = create_uuids(len(network['next_streets']), rng)
+
+    streets = create_state_streets(os.path.join(precisely_geodatabase, f'usa_{state}_streets'), network,
+                                   feature_ids, rng)
+    shapes = streets.columns[fake_arcpy.SHAPE_FIELD_NAME]
+
+    restriction_paths = create_street_paths(network, int(len(feature_ids) * RESTRICTION_RATE), 2, 3, rng)
+    restrictions = create_state_restrictions(os.path.join(precisely_geodatabase, f'usa_{state}_restrictions'),
+                                             restriction_paths, feature_ids, shapes, rng)
+
+    signpost_paths = create_street_paths(network, int(len(feature_ids) * SIGNPOST_RATE), 1, 3, rng)
+    signpost_ids = create_state_signposts(os.path.join(precisely_geodatabase, f'{state}signposts'),
+                                          os.path.join(precisely_geodatabase, f'{state}signpostdestinations'),
+                                          signpost_paths, feature_ids, shapes, rng)
+
+    create_state_towns(os.path.join(precisely_geodatabase, f'{state}towns'), state, network, rng)
+    create_state_postcodes(os.path.join(precisely_geodatabase, f'{state}postcodes'), network)
+    create_national_tables(national_workspace, streets, restrictions, signpost_paths, signpost_ids)
+
+    table_names = [f'usa_{state}_streets', f'usa_{state}_restrictions', f'{state}signposts',
+                   f'{state}signpostdestinations', f'{state}towns', f'{state}postcodes']
+    return {name: len(fake_arcpy.get_table(os.path.join(precisely_geodatabase, name))) for name in table_names}
@@ -0,0 +1,160 @@
+import glob
+import hashlib
+import json
+import os
+
+import arcpy
+
+import constants
+from national_map_logger import NationalMapLogger
+from national_map_utility import NationalMapUtility
+
+# bump when the state output changes without a change of the code files, e.g. a new template
+PIPELINE_VERSION = '1'
+HASH_BUFFER_SIZE = 8 * 1024 * 1024
+# the Performance settings the state conversion reads which change its output, the worker counts do not
+STATE_OUTPUT_PERFORMANCE_SETTINGS = ('street_field_calculation', 'street_group_engine', 'join_engine',
+                                     'data_access_backend', 'read_from_zip', 'selective_extraction',
+                                     'fused_state_export')
+
+
+def hash_file(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, mode='rb') as file:
+        while True:
+            buffer = file.read(HASH_BUFFER_SIZE)
+            if not buffer:
+                break
+            sha256.update(buffer)
+    return sha256.hexdigest()
+
+
+def get_code_hash(source_folder=None):
+    """
+    :return: sha256 of the python files of the pipeline, any code change converts the states again
+    """
+    source_folder = source_folder or os.path.dirname(os.path.abspath(__file__))
+    sha256 = hashlib.sha256()
+    for file_path in sorted(glob.glob(os.path.join(source_folder, '*.py'))):
+        sha256.update(os.path.basename(file_path).encode('utf-8'))
+        with open(file_path, mode='rb') as file:
+            sha256.update(file.read())
+    return sha256.hexdigest()
+
+
+def get_configuration_hash(configuration):
+    """
+    :return: sha256 of the settings which change the state output
+    """
+    settings = {
+        'precisely_version': configuration.data['Precisely']['version'],
+        'format': configuration.data['Outputs']['format']
+    }
+    settings.update({name: configuration.data['Performance'][name] for name in STATE_OUTPUT_PERFORMANCE_SETTINGS})
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class BuildManifest:
+    """
+    Inputs of every converted state, saved as JSON next to the scratch folder.
+    A state is current when its zip, the pipeline and the configuration are unchanged and its scratch GDB is intact.
+    """
+
+    def __init__(self, configuration):
+        self.configuration = configuration
+        scratch_folder = os.path.normpath(configuration.get_scratch_folder())
+        self.manifest_file = os.path.join(os.path.dirname(scratch_folder),
+                                          f'{os.path.basename(scratch_folder)}_build_manifest.json')
+        self.code_hash = get_code_hash()
+        self.configuration_hash = get_configuration_hash(configuration)
+        self.data = self._load()
+
+    def __del__(self):
+        del self.configuration
+        del self.manifest_file
+        del self.code_hash
+        del self.configuration_hash
+        del self.data
+
+    def _load(self):
+        data = {'states': {}, 'zip_hashes': {}}
+        if not os.path.exists(self.manifest_file):
+            return data
+
+        try:
+            with open(self.manifest_file, mode='r', encoding='utf-8') as file:
+                data.update(json.load(file))
+        except (OSError, ValueError) as e:
+            NationalMapLogger.warning(f'BuildManifest, invalid manifest {self.manifest_file}: {e}')
+        return data
+
+    def save(self):
+        NationalMapUtility.ensure_path_exists(os.path.dirname(self.manifest_file))
+        temp_file = f'{self.manifest_file}.tmp'
+        with open(temp_file, mode='w', encoding='utf-8') as file:
+            json.dump(self.data, file, indent=2, sort_keys=True)
+        os.replace(temp_file, self.manifest_file)
+
+    def _get_zip_file(self, state):
+        settings = self.configuration.data['Precisely']
+        file_name = f'USA_{state.upper()}_NAVPREM_{settings["version"]}_FGDB.zip'
+        return os.path.join(settings['zip_location'], file_name)
+
+    def _get_zip_hash(self, state):
+        """
+        :return: sha256 of the zip of state, reused while its size and modified time are unchanged
+        """
+        zip_file = self._get_zip_file(state)
+        if not os.path.exists(zip_file):
+            return None
+
+        stat = os.stat(zip_file)
+        cached = self.data['zip_hashes'].get(zip_file)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+
+        NationalMapLogger.debug(f'BuildManifest, hash {zip_file}')
+        sha256 = hash_file(zip_file)
+        self.data['zip_hashes'][zip_file] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+        return sha256
+
+    def _get_state_inputs(self, state):
+        return {
+            'zip_sha256': self._get_zip_hash(state),
+            'pipeline_version': PIPELINE_VERSION,
+            'code_hash': self.code_hash,
+            'configuration_hash': self.configuration_hash
+        }
+
+    def _is_scratch_output_intact(self, state):
+        scratch_gdb = os.path.join(self.configuration.get_scratch_folder(), f'{state.lower()}.gdb')
+        if not arcpy.Exists(scratch_gdb):
+            return False
+
+        for key, name in constants.GDB_ITEMS_DICT['STATE'].items():
+            if key == 'node_name' and not self.configuration.is_output_file_gdb():
+                continue
+            if not arcpy.Exists(os.path.join(scratch_gdb, name)):
+                return False
+        return True
+
+    def is_state_current(self, state):
+        recorded_inputs = self.data['states'].get(state)
+        if recorded_inputs is None:
+            return False
+
+        state_inputs = self._get_state_inputs(state)
+        return state_inputs['zip_sha256'] is not None and recorded_inputs == state_inputs and \
+            self._is_scratch_output_intact(state)
+
+    def invalidate_states(self, states):
+        """
+        Forget states before they are converted, so an interrupted conversion is never reused.
+        """
+        for state in states:
+            self.data['states'].pop(state, None)
+        self.save()
+
+    def record_state(self, state):
+        self.data['states'][state] = self._get_state_inputs(state)
+        self.save()
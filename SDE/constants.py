@@ -1,9 +1,10 @@
 import os
-import arcpy
 
-# Projection
-SR_WEB_MERCATOR = arcpy.SpatialReference(3857)
-SR_WGS_1984 = arcpy.SpatialReference(4326)
+# Projection, SR_WEB_MERCATOR and SR_WGS_1984 are arcpy spatial references created on first use
+SPATIAL_REFERENCE_FACTORY_CODES = {
+    'SR_WEB_MERCATOR': 3857,
+    'SR_WGS_1984': 4326
+}
 
 # Region
 US_STATES = ['ME', 'NH', 'VT', 'MA', 'RI', 'CT', 'NY', 'NJ', 'PA', 'DE',
@@ -83,3 +84,14 @@ MMPK_DATA_SOURCE = {
     'StreetPolygon': GDB_ITEMS_DICT['NATIONAL']['street_polygon_name'],
     'national_routing_ND': NATIONAL_NETWORK_DATASET_NAME
 }
+
+
+def __getattr__(name):
+    # the modules of a GDAL worker import constants without arcpy
+    if name not in SPATIAL_REFERENCE_FACTORY_CODES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    import arcpy
+    spatial_reference = arcpy.SpatialReference(SPATIAL_REFERENCE_FACTORY_CODES[name])
+    globals()[name] = spatial_reference
+    return spatial_reference
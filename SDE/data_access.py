@@ -0,0 +1,441 @@
+import os
+import posixpath
+import re
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+OID_TOKEN = 'OID@'
+SHAPE_TOKEN = 'SHAPE@'
+OBJECT_ID_QUERY_CHUNK_SIZE = 1000
+# GDAL virtual file systems, /vsizip/ reads a geodatabase inside a zip in place
+VSI_PREFIX = '/vsi'
+
+GDAL_DRIVERS = {
+    '.gdb': 'OpenFileGDB',
+    '.gpkg': 'GPKG'
+}
+
+WKB_POINT = 1
+WKB_LINE_STRING = 2
+WKB_POLYGON = 3
+WKB_MULTI_POINT = 4
+WKB_MULTI_LINE_STRING = 5
+WKB_MULTI_TYPES = [4, 5, 6, 7]
+
+GEOGRAPHIC_CRS = 'EPSG:4326'
+WEB_MERCATOR_WKID = 3857
+WEB_MERCATOR_RADIUS = 6378137.0
+WEB_MERCATOR_MAX_LATITUDE = 85.0511287798066
+
+WkbPoint = namedtuple('WkbPoint', ['X', 'Y'])
+
+
+def import_arcpy():
+    # the backends import their library on first use, the modules of a GDAL worker import without arcpy
+    import arcpy
+    return arcpy
+
+
+def _import_pyogrio():
+    try:
+        import pyogrio
+    except ImportError as e:
+        raise RuntimeError(f'DataAccess, the GDAL backend needs pyogrio: {e}')
+    return pyogrio
+
+
+def is_vsi_path(feature_class_or_table):
+    return str(feature_class_or_table).replace('\\', '/').startswith(VSI_PREFIX)
+
+
+def split_workspace_path(feature_class_or_table):
+    """
+    :return: path of the .gdb or .gpkg workspace, layer name; a feature dataset in between is not part of it
+    """
+    path_module = os.path
+    path = os.path.normpath(str(feature_class_or_table))
+    if is_vsi_path(feature_class_or_table):
+        # GDAL only knows the virtual file systems with forward slashes, /vsizip//data keeps its double slash
+        path_module = posixpath
+        path = str(feature_class_or_table).replace('\\', '/').rstrip('/')
+
+    workspace = path_module.dirname(path)
+    while workspace and path_module.splitext(workspace)[1].lower() not in GDAL_DRIVERS:
+        parent = path_module.dirname(workspace)
+        if parent == workspace:
+            raise ValueError(f'DataAccess, no .gdb or .gpkg workspace in {feature_class_or_table}')
+        workspace = parent
+    return workspace, path_module.basename(path)
+
+
+def read_gdal_layer_info(feature_class_or_table):
+    """
+    :return: pyogrio layer info, with the geometry_type, crs, fields and dtypes
+    """
+    workspace, layer = split_workspace_path(feature_class_or_table)
+    return _import_pyogrio().read_info(workspace, layer=layer)
+
+
+def _to_web_mercator(coordinates):
+    """
+    :param coordinates: longitude, latitude pairs in one flat array
+    """
+    longitudes = np.radians(coordinates[0::2])
+    latitudes = np.radians(np.clip(coordinates[1::2], -WEB_MERCATOR_MAX_LATITUDE, WEB_MERCATOR_MAX_LATITUDE))
+    projected = np.empty_like(coordinates)
+    projected[0::2] = WEB_MERCATOR_RADIUS * longitudes
+    projected[1::2] = WEB_MERCATOR_RADIUS * np.log(np.tan(np.pi / 4 + latitudes / 2))
+    return projected
+
+
+def _project_wkb_coordinates(wkb, offset, point_count, byte_order, out):
+    dtype = np.dtype(f'{byte_order}f8')
+    coordinates = np.frombuffer(wkb, dtype=dtype, count=point_count * 2, offset=offset)
+    out += _to_web_mercator(coordinates.astype(np.float64)).astype(dtype).tobytes()
+    return offset + 16 * point_count
+
+
+def _project_wkb(wkb, offset, out):
+    """
+    Append the 2D WKB geometry at offset to out, with its coordinates projected to Web Mercator.
+    :return: offset after the geometry
+    """
+    byte_order = '<' if wkb[offset] == 1 else '>'
+    geometry_type = struct.unpack_from(f'{byte_order}I', wkb, offset + 1)[0] % 1000
+    out += wkb[offset:offset + 5]
+    offset += 5
+    if geometry_type == WKB_POINT:
+        return _project_wkb_coordinates(wkb, offset, 1, byte_order, out)
+
+    count = struct.unpack_from(f'{byte_order}I', wkb, offset)[0]
+    out += wkb[offset:offset + 4]
+    offset += 4
+    if geometry_type == WKB_LINE_STRING:
+        return _project_wkb_coordinates(wkb, offset, count, byte_order, out)
+
+    if geometry_type == WKB_POLYGON:
+        for _ in range(count):
+            point_count = struct.unpack_from(f'{byte_order}I', wkb, offset)[0]
+            out += wkb[offset:offset + 4]
+            offset = _project_wkb_coordinates(wkb, offset + 4, point_count, byte_order, out)
+        return offset
+
+    if geometry_type in WKB_MULTI_TYPES:
+        for _ in range(count):
+            offset = _project_wkb(wkb, offset, out)
+        return offset
+    raise ValueError(f'DataAccess, unsupported WKB geometry type {geometry_type}')
+
+
+def _read_wkb_parts(wkb):
+    """
+    :return: [(byte order, offset of the first coordinate, point count)] of a (multi) point or (multi) line WKB
+    """
+    byte_order = '<' if wkb[0] == 1 else '>'
+    geometry_type = struct.unpack_from(f'{byte_order}I', wkb, 1)[0] % 1000
+    if geometry_type == WKB_POINT:
+        return [(byte_order, 5, 1)]
+    if geometry_type == WKB_MULTI_POINT:
+        # every point is a WKB point of 21 bytes
+        return [('<' if wkb[offset] == 1 else '>', offset + 5, 1)
+                for offset in range(9, 9 + 21 * struct.unpack_from(f'{byte_order}I', wkb, 5)[0], 21)]
+    if geometry_type == WKB_LINE_STRING:
+        return [(byte_order, 9, struct.unpack_from(f'{byte_order}I', wkb, 5)[0])]
+    if geometry_type == WKB_MULTI_LINE_STRING:
+        parts, offset = [], 9
+        for _ in range(struct.unpack_from(f'{byte_order}I', wkb, 5)[0]):
+            part_byte_order = '<' if wkb[offset] == 1 else '>'
+            point_count = struct.unpack_from(f'{part_byte_order}I', wkb, offset + 5)[0]
+            parts.append((part_byte_order, offset + 9, point_count))
+            offset += 9 + 16 * point_count
+        return parts
+    raise ValueError(f'DataAccess, unsupported WKB geometry type {geometry_type}')
+
+
+class WkbGeometry:
+    """
+    Geometry of the GDAL backend, 2D WKB with the firstPoint and lastPoint of an arcpy geometry.
+    A union joins the lines into a multi line, the shared points are not dissolved.
+    """
+    __slots__ = ('WKB',)
+
+    def __init__(self, wkb):
+        self.WKB = bytes(wkb)
+
+    def _get_point(self, byte_order, offset):
+        return WkbPoint(*struct.unpack_from(f'{byte_order}2d', self.WKB, offset))
+
+    @property
+    def firstPoint(self):
+        byte_order, offset, _ = _read_wkb_parts(self.WKB)[0]
+        return self._get_point(byte_order, offset)
+
+    @property
+    def lastPoint(self):
+        byte_order, offset, point_count = _read_wkb_parts(self.WKB)[-1]
+        return self._get_point(byte_order, offset + 16 * (point_count - 1))
+
+    def get_part_coordinates(self):
+        """
+        :return: List of numpy arrays of the (x, y) points of the parts
+        """
+        return [np.frombuffer(self.WKB, dtype=f'{byte_order}f8', count=2 * point_count, offset=offset).reshape(-1, 2)
+                for byte_order, offset, point_count in _read_wkb_parts(self.WKB)]
+
+    def get_lines(self):
+        return [self.WKB[offset - 9:offset + 16 * point_count] for _, offset, point_count in _read_wkb_parts(self.WKB)]
+
+    def __or__(self, other):
+        lines = self.get_lines() + other.get_lines()
+        return WkbGeometry(struct.pack('<BII', 1, WKB_MULTI_LINE_STRING, len(lines)) + b''.join(lines))
+
+    def project_to_web_mercator(self):
+        out = bytearray()
+        _project_wkb(self.WKB, 0, out)
+        return WkbGeometry(out)
+
+
+def _is_projected_to_web_mercator(workspace, layer, spatial_reference):
+    """
+    :return: True when the geographic geometries of the layer are to be projected to Web Mercator
+    """
+    if spatial_reference is None:
+        return False
+
+    crs = _import_pyogrio().read_info(workspace, layer=layer)['crs']
+    if crs == f'EPSG:{spatial_reference.factoryCode}':
+        return False
+    if crs == GEOGRAPHIC_CRS and spatial_reference.factoryCode == WEB_MERCATOR_WKID:
+        return True
+    raise ValueError(f'DataAccess, the GDAL backend cannot project {crs} to {spatial_reference.factoryCode}')
+
+
+def _get_null_first_key(columns):
+    return lambda index: tuple((column[index] is not None, column[index]) for column in columns)
+
+
+def _to_field_values(data, dtype):
+    """
+    GDAL reads the NULL numbers as NaN, so an integer field with NULL values is read as float64.
+    :param dtype: numpy dtype of the layer field
+    :return: list of the values, None for NULL as an arcpy cursor returns
+    """
+    if data.dtype.kind != 'f':
+        return data.tolist()
+
+    is_integer = np.dtype(dtype).kind in 'biu'
+    return [None if np.isnan(value) else int(value) if is_integer else value for value in data.tolist()]
+
+
+def _read_with_gdal(feature_class_or_table, field_names, where_clause=None, object_ids=None, spatial_reference=None):
+    """
+    :param spatial_reference: of the geometries, only a geographic layer projected to Web Mercator is supported
+    :return: Dict[field name] = list of the values
+    """
+    pyogrio = _import_pyogrio()
+    workspace, layer = split_workspace_path(feature_class_or_table)
+    columns = [name for name in field_names if name not in [OID_TOKEN, SHAPE_TOKEN]]
+    if where_clause:
+        # GDAL skips the fields which are not read, a where clause on them matches nothing
+        column_names = [name.lower() for name in columns]
+        columns.extend(name for name in pyogrio.read_info(workspace, layer=layer)['fields']
+                       if name.lower() not in column_names and
+                       re.search(rf'\b{re.escape(name)}\b', where_clause, flags=re.IGNORECASE))
+    read_geometry = SHAPE_TOKEN in field_names
+    fids = None if object_ids is None else np.asarray(object_ids, dtype=np.int64)
+
+    meta, object_id_array, geometries, field_data = pyogrio.raw.read(
+        workspace, layer=layer, columns=columns, read_geometry=read_geometry, force_2d=True,
+        where=where_clause or None, fids=fids, return_fids=True)
+
+    result = {name.lower(): _to_field_values(data, dtype)
+              for name, dtype, data in zip(meta['fields'], meta['dtypes'], field_data)}
+    result[OID_TOKEN.lower()] = object_id_array.tolist()
+    if read_geometry:
+        geometries = [None if wkb is None else WkbGeometry(wkb) for wkb in geometries]
+        if _is_projected_to_web_mercator(workspace, layer, spatial_reference):
+            geometries = [None if geometry is None else geometry.project_to_web_mercator() for geometry in geometries]
+        result[SHAPE_TOKEN.lower()] = geometries
+    return {name: result[name.lower()] for name in field_names}
+
+
+def _search_rows_with_gdal(feature_class_or_table, field_names, where_clause=None, order_by=None, object_ids=None,
+                           spatial_reference=None):
+    order_by = order_by or []
+    read_field_names = list(field_names) + [name for name in order_by if name not in field_names]
+    values = _read_with_gdal(feature_class_or_table, read_field_names, where_clause, object_ids, spatial_reference)
+    columns = [values[name] for name in field_names]
+    if not order_by:
+        return zip(*columns)
+
+    order_columns = [values[name] for name in order_by]
+    order = sorted(range(len(values[read_field_names[0]])), key=_get_null_first_key(order_columns))
+    return (tuple(column[index] for column in columns) for index in order)
+
+
+def _search_rows_with_arcpy(feature_class_or_table, field_names, where_clause=None, order_by=None,
+                            spatial_reference=None):
+    arcpy = import_arcpy()
+    sql_clause = (None, f'ORDER BY {", ".join(order_by)}') if order_by else (None, None)
+    with arcpy.da.SearchCursor(feature_class_or_table, field_names, where_clause, spatial_reference,
+                               sql_clause=sql_clause) as cursor:
+        for row in cursor:
+            yield row
+
+
+def _to_arcpy_value(value, spatial_reference):
+    if isinstance(value, WkbGeometry):
+        return import_arcpy().FromWKB(bytearray(value.WKB), spatial_reference)
+    return value
+
+
+class DataAccess:
+    """
+    Reads and inserts of the converters and factories, through arcpy or through GDAL (pyogrio).
+    The GDAL backend reads File and GeoPackage geodatabases through pyogrio, its geometries are WkbGeometry.
+    The geoprocessing tools and the schema changes stay with arcpy, so the converters and factories run under an
+    ArcGIS Pro install. The tile workers of the tiled StreetPolygon and STREETINTERSECTR engines only read, their
+    modules import arcpy on first use, so with the GDAL backend they run without arcpy.
+    """
+    is_gdal = False
+
+    @staticmethod
+    def init(configuration):
+        DataAccess.is_gdal = configuration.is_data_access_backend_gdal()
+
+    @staticmethod
+    def is_gdal_path(feature_class_or_table):
+        # arcpy cannot open the virtual file systems, they are read through GDAL with either backend
+        return DataAccess.is_gdal or is_vsi_path(feature_class_or_table)
+
+    @staticmethod
+    def exists(feature_class_or_table):
+        if not DataAccess.is_gdal_path(feature_class_or_table):
+            return import_arcpy().Exists(feature_class_or_table)
+
+        pyogrio = _import_pyogrio()
+        workspace, layer = split_workspace_path(feature_class_or_table)
+        try:
+            layer_names = [name.lower() for name, _ in pyogrio.list_layers(workspace)]
+        except pyogrio.errors.DataSourceError:
+            return False
+        return layer.lower() in layer_names
+
+    @staticmethod
+    def search_rows(feature_class_or_table, field_names, where_clause=None, order_by=None, spatial_reference=None):
+        """
+        :param field_names: field names and the OID@, SHAPE@ tokens
+        :param order_by: field names to sort by, NULL values first
+        :param spatial_reference: the geometries are projected to it while they are read
+        :return: Iterator[tuple]
+        """
+        if DataAccess.is_gdal_path(feature_class_or_table):
+            return _search_rows_with_gdal(feature_class_or_table, field_names, where_clause, order_by,
+                                          spatial_reference=spatial_reference)
+        return _search_rows_with_arcpy(feature_class_or_table, field_names, where_clause, order_by, spatial_reference)
+
+    @staticmethod
+    def search_rows_by_object_ids(feature_class_or_table, field_names, object_ids):
+        """
+        :return: Iterator[tuple] of the rows of object_ids, in any order
+        """
+        if DataAccess.is_gdal_path(feature_class_or_table):
+            yield from _search_rows_with_gdal(feature_class_or_table, field_names, object_ids=object_ids)
+            return
+
+        oid_field_name = import_arcpy().Describe(feature_class_or_table).OIDFieldName
+        object_ids = list(object_ids)
+        for start in range(0, len(object_ids), OBJECT_ID_QUERY_CHUNK_SIZE):
+            chunk = object_ids[start:start + OBJECT_ID_QUERY_CHUNK_SIZE]
+            where_clause = f'{oid_field_name} IN ({",".join(str(object_id) for object_id in chunk)})'
+            yield from _search_rows_with_arcpy(feature_class_or_table, field_names, where_clause)
+
+    @staticmethod
+    def read_columns(feature_class_or_table, field_names, where_clause=None, null_values=None):
+        """
+        :param null_values: Dict[field name] = value of the NULL values
+        :return: Dict[field name] = numpy array
+        """
+        if not DataAccess.is_gdal_path(feature_class_or_table):
+            array = import_arcpy().da.FeatureClassToNumPyArray(feature_class_or_table, field_names, where_clause,
+                                                                null_value=null_values)
+            return {name: array[name] for name in field_names}
+
+        null_values = null_values or {}
+        values = _read_with_gdal(feature_class_or_table, field_names, where_clause)
+        columns = {}
+        for name in field_names:
+            null_value = null_values.get(name)
+            column = values[name] if null_value is None else \
+                [null_value if value is None else value for value in values[name]]
+            columns[name] = np.array(column)
+        return columns
+
+    @staticmethod
+    def insert_rows(feature_class_or_table, field_names, rows):
+        """
+        :param rows: Iterable of the field values, geometries of either backend
+        :return: count of the inserted rows
+        """
+        if DataAccess.is_gdal:
+            return _insert_rows_with_gdal(feature_class_or_table, field_names, rows)
+
+        arcpy = import_arcpy()
+        spatial_reference = None
+        if SHAPE_TOKEN in field_names:
+            spatial_reference = arcpy.Describe(feature_class_or_table).spatialReference
+
+        count = 0
+        with arcpy.da.InsertCursor(feature_class_or_table, field_names) as cursor:
+            for row in rows:
+                cursor.insertRow([_to_arcpy_value(value, spatial_reference) for value in row]
+                                 if spatial_reference else row)
+                count += 1
+        return count
+
+
+def _insert_rows_with_gdal(feature_class_or_table, field_names, rows):
+    pyogrio = _import_pyogrio()
+    workspace, layer = split_workspace_path(feature_class_or_table)
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    columns = list(zip(*rows))
+    geometries = None
+    if SHAPE_TOKEN in field_names:
+        shape_index = field_names.index(SHAPE_TOKEN)
+        # WKB of either backend, arcpy geometries have a WKB property too
+        geometries = np.array([None if value is None else bytes(value.WKB) for value in columns[shape_index]],
+                              dtype=object)
+        columns = columns[:shape_index] + columns[shape_index + 1:]
+        field_names = field_names[:shape_index] + field_names[shape_index + 1:]
+
+    driver = GDAL_DRIVERS[os.path.splitext(workspace)[1].lower()]
+    layer_info = pyogrio.read_info(workspace, layer=layer)
+    layer_dtypes = {name.lower(): dtype for name, dtype in zip(layer_info['fields'], layer_info['dtypes'])}
+    typed_columns = [_to_typed_column(column, layer_dtypes.get(name.lower(), 'object'))
+                     for name, column in zip(field_names, columns)]
+    field_data = [values for values, _ in typed_columns]
+    field_mask = [is_null for _, is_null in typed_columns]
+    pyogrio.raw.write(workspace, geometries, field_data, list(field_names), field_mask=field_mask,
+                      layer=layer, driver=driver, geometry_type=layer_info['geometry_type'], crs=layer_info['crs'],
+                      append=True)
+    return len(rows)
+
+
+def _to_typed_column(column, dtype):
+    """
+    GDAL takes the type of a field from its array, an object array of numbers is not written as numbers.
+    :param dtype: numpy dtype of the layer field
+    :return: array of dtype for the numeric fields (object array otherwise), mask of the NULL values or None
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind not in 'biuf':
+        return np.array(column, dtype=object), None
+
+    is_null = np.array([value is None for value in column], dtype=bool)
+    values = np.array([0 if value is None else value for value in column], dtype=dtype)
+    return values, is_null if is_null.any() else None
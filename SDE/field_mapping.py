@@ -0,0 +1,90 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+
+FieldMap = namedtuple('FieldMap', ['name', 'field_type', 'length', 'source_field', 'start', 'end'])
+
+# Out "Alias" editable nullable required length type precision scale,merge rule,delimiter,source,field,start,end
+FIELD_MAP_PATTERN = re.compile(
+    r'^(\S+) "[^"]*" \S+ \S+ \S+ (\d+) (\S+) \S+ \S+,[^,]*,[^,]*,(.*),([^,]+),(-?\d+),(-?\d+)$')
+
+# field map type: AddField type
+FIELD_TYPES = {
+    'TEXT': 'TEXT',
+    'SHORT': 'SHORT',
+    'LONG': 'LONG',
+    'BIGINTEGER': 'BIGINTEGER',
+    'FLOAT': 'FLOAT',
+    'DOUBLE': 'DOUBLE',
+    'DATE': 'DATE'
+}
+INTEGER_FIELD_TYPES = ['SHORT', 'LONG', 'BIGINTEGER']
+REAL_FIELD_TYPES = ['FLOAT', 'DOUBLE']
+
+# numpy dtype kind of a GDAL column: field map type
+DTYPE_KIND_FIELD_TYPES = {
+    'i': 'LONG',
+    'u': 'LONG',
+    'f': 'DOUBLE',
+    'M': 'DATE',
+    'b': 'SHORT'
+}
+DEFAULT_TEXT_LENGTH = 255
+
+
+def parse_field_mapping(field_mapping):
+    """
+    Parse the field mapping string of ExportFeatures, one source field per output field.
+    :return: List[FieldMap], text positions are -1 when the whole value is kept
+    """
+    field_maps = []
+    for item in field_mapping.split(';'):
+        item = item.strip()
+        if not item:
+            continue
+
+        match = FIELD_MAP_PATTERN.match(item)
+        if match is None:
+            raise ValueError(f'parse_field_mapping, unsupported field map {item}')
+
+        name, length, field_type, _, source_field, start, end = match.groups()
+        field_type = FIELD_TYPES[field_type.upper()]
+        field_maps.append(FieldMap(name, field_type, int(length), source_field, int(start), int(end)))
+    return field_maps
+
+
+def get_field_maps_of_columns(field_names, dtypes):
+    """
+    :param dtypes: numpy dtype names of the columns
+    :return: List[FieldMap] which copies every column, text fields get the default length
+    """
+    return [
+        FieldMap(name, DTYPE_KIND_FIELD_TYPES.get(np.dtype(dtype).kind, 'TEXT'), DEFAULT_TEXT_LENGTH, name, -1, -1)
+        for name, dtype in zip(field_names, dtypes)
+    ]
+
+
+def convert_field_value(field_map, value):
+    """
+    Convert a source value as ExportFeatures does, text is cut to the start and end positions and the length.
+    """
+    if value is None or value != value:
+        # NULL, or the NaN of a GDAL numeric column
+        return None
+
+    if field_map.field_type == 'TEXT':
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        value = str(value)
+        if field_map.start >= 0:
+            value = value[field_map.start:field_map.end + 1]
+        return value[:field_map.length]
+
+    if field_map.field_type in INTEGER_FIELD_TYPES:
+        return int(value)
+
+    if field_map.field_type in REAL_FIELD_TYPES:
+        return float(value)
+
+    return value
@@ -0,0 +1,185 @@
+import struct
+
+CATALOG_TABLE_NAME = 'a00000001'
+SYSTEM_TABLE_PREFIX = 'gdb_'
+
+TABLE_MAGIC = 3
+TABLX_HEADER_SIZE = 16
+TABLX_BLOCK_SIZE = 1024
+
+FIELD_TYPE_INT16 = 0
+FIELD_TYPE_INT32 = 1
+FIELD_TYPE_FLOAT32 = 2
+FIELD_TYPE_FLOAT64 = 3
+FIELD_TYPE_STRING = 4
+FIELD_TYPE_DATETIME = 5
+FIELD_TYPE_OBJECTID = 6
+FIELD_TYPE_GUID = 10
+FIELD_TYPE_GLOBALID = 11
+FIXED_WIDTH_FIELD_TYPES = {
+    FIELD_TYPE_INT16: 2,
+    FIELD_TYPE_INT32: 4,
+    FIELD_TYPE_FLOAT32: 4,
+    FIELD_TYPE_FLOAT64: 8,
+    FIELD_TYPE_DATETIME: 8
+}
+GUID_FIELD_TYPES = [FIELD_TYPE_GUID, FIELD_TYPE_GLOBALID]
+
+
+def get_table_file_prefix(object_id):
+    """
+    :return: the file name prefix of the table with object_id in the catalog, e.g. a00000001
+    """
+    return f'a{object_id:08x}'
+
+
+def _read_varuint(data, offset):
+    value, shift = 0, 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80 == 0:
+            return value, offset
+        shift += 7
+
+
+def _read_utf16(data, offset):
+    length = data[offset]
+    offset += 1
+    return data[offset:offset + length * 2].decode('utf-16-le'), offset + length * 2
+
+
+def _read_fields(gdbtable):
+    """
+    :return: [(field name, field type, is nullable)] of the table, the catalog has no geometry field
+    """
+    magic, = struct.unpack_from('<i', gdbtable, 0)
+    if magic != TABLE_MAGIC:
+        raise ValueError(f'unsupported gdbtable version {magic}')
+
+    field_offset, = struct.unpack_from('<q', gdbtable, 32)
+    field_count, = struct.unpack_from('<h', gdbtable, field_offset + 12)
+    offset = field_offset + 14
+
+    fields = []
+    for _ in range(field_count):
+        name, offset = _read_utf16(gdbtable, offset)
+        _, offset = _read_utf16(gdbtable, offset)
+        field_type = gdbtable[offset]
+        offset += 1
+
+        if field_type == FIELD_TYPE_OBJECTID or field_type in GUID_FIELD_TYPES:
+            flag = gdbtable[offset + 1]
+            offset += 2
+        elif field_type == FIELD_TYPE_STRING:
+            flag = gdbtable[offset + 4]
+            default_length, offset = _read_varuint(gdbtable, offset + 5)
+            offset += default_length
+        elif field_type in FIXED_WIDTH_FIELD_TYPES:
+            flag = gdbtable[offset + 1]
+            default_length = gdbtable[offset + 2]
+            offset += 3 + default_length
+        else:
+            raise ValueError(f'unsupported catalog field type {field_type}')
+
+        fields.append((name, field_type, bool(flag & 1)))
+
+    return fields
+
+
+def _read_row_offsets(gdbtablx):
+    """
+    :return: Dict[OBJECTID] = offset of the row in the gdbtable, deleted rows are left out
+    """
+    magic, block_count, row_count, offset_size = struct.unpack_from('<iiii', gdbtablx, 0)
+    if magic != TABLE_MAGIC:
+        raise ValueError(f'unsupported gdbtablx version {magic}')
+
+    trailer_offset = TABLX_HEADER_SIZE + block_count * TABLX_BLOCK_SIZE * offset_size
+    bitmap_word_count = struct.unpack_from('<i', gdbtablx, trailer_offset)[0] if block_count > 0 else 0
+    bitmap = gdbtablx[trailer_offset + 16:trailer_offset + 16 + bitmap_word_count * 4]
+
+    def get_index(object_id):
+        if bitmap_word_count == 0:
+            return object_id - 1
+
+        # sparse file, only the 1024 row blocks with a set bit are stored
+        block = (object_id - 1) // TABLX_BLOCK_SIZE
+        if block // 8 >= len(bitmap) or not bitmap[block // 8] & (1 << (block % 8)):
+            return None
+        present_blocks = sum(bin(byte).count('1') for byte in bitmap[:block // 8]) + \
+            bin(bitmap[block // 8] & ((1 << (block % 8)) - 1)).count('1')
+        return present_blocks * TABLX_BLOCK_SIZE + (object_id - 1) % TABLX_BLOCK_SIZE
+
+    row_offsets = {}
+    for object_id in range(1, row_count + 1):
+        index = get_index(object_id)
+        if index is None or index >= block_count * TABLX_BLOCK_SIZE:
+            continue
+
+        position = TABLX_HEADER_SIZE + index * offset_size
+        row_offset = int.from_bytes(gdbtablx[position:position + offset_size], 'little')
+        if row_offset > 0:
+            row_offsets[object_id] = row_offset
+    return row_offsets
+
+
+def read_catalog(gdbtable, gdbtablx):
+    """
+    Read GDB_SystemCatalog (a00000001.gdbtable and a00000001.gdbtablx) of a File Geodatabase.
+    :param gdbtable: bytes of a00000001.gdbtable
+    :param gdbtablx: bytes of a00000001.gdbtablx
+    :return: Dict[lower case table name] = OBJECTID, the number of the table files
+    """
+    fields = _read_fields(gdbtable)
+    nullable_count = sum(1 for _, _, is_nullable in fields if is_nullable)
+
+    catalog = {}
+    for object_id, row_offset in _read_row_offsets(gdbtablx).items():
+        offset = row_offset + 4
+        null_flags = gdbtable[offset:offset + (nullable_count + 7) // 8]
+        offset += len(null_flags)
+
+        name, nullable_index = None, 0
+        for field_name, field_type, is_nullable in fields:
+            if field_type == FIELD_TYPE_OBJECTID:
+                continue
+
+            if is_nullable:
+                is_null = null_flags[nullable_index // 8] & (1 << (nullable_index % 8))
+                nullable_index += 1
+                if is_null:
+                    continue
+
+            if field_type == FIELD_TYPE_STRING:
+                length, offset = _read_varuint(gdbtable, offset)
+                value = gdbtable[offset:offset + length].decode('utf-8')
+                offset += length
+                if field_name.lower() == 'name':
+                    name = value
+            elif field_type in GUID_FIELD_TYPES:
+                offset += 16
+            else:
+                offset += FIXED_WIDTH_FIELD_TYPES[field_type]
+
+        if name:
+            catalog[name.lower()] = object_id
+    return catalog
+
+
+def select_table_prefixes(catalog, table_names):
+    """
+    :param table_names: names of the tables to keep in any case, the ones missing in the catalog are ignored
+    :return: set of the file name prefixes of table_names and of the system tables
+    """
+    prefixes = {get_table_file_prefix(1)}
+    for name, object_id in catalog.items():
+        if name.startswith(SYSTEM_TABLE_PREFIX):
+            prefixes.add(get_table_file_prefix(object_id))
+
+    for table_name in table_names:
+        object_id = catalog.get(table_name.lower())
+        if object_id is not None:
+            prefixes.add(get_table_file_prefix(object_id))
+    return prefixes
@@ -0,0 +1,201 @@
+import uuid
+
+import numpy as np
+
+# the case byte and the 16 bytes of a UUID
+UUID_KEY_DTYPE = 'S17'
+LOWER_CASE_UUID_PREFIX = b'l'
+UPPER_CASE_UUID_PREFIX = b'U'
+MISSING_VALUE = -1
+BUILDER_CHUNK_SIZE = 1_000_000
+
+
+def encode_uuid(local_id):
+    """
+    The keys match the exact text, as JoinField does, only the canonical lower or upper case form of a UUID is
+    kept binary, e.g. {...} or a UUID of mixed case is not a UUID key.
+    :return: the case byte and the 16-byte binary form of a FEATURE_ID UUID, None when local_id is not a UUID
+    """
+    try:
+        uuid_value = uuid.UUID(local_id)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+    text = str(uuid_value)
+    if local_id == text:
+        return LOWER_CASE_UUID_PREFIX + uuid_value.bytes
+    if local_id == text.upper():
+        return UPPER_CASE_UUID_PREFIX + uuid_value.bytes
+    return None
+
+
+def get_local_id_key(local_id):
+    """
+    :return: a comparable key of local_id, the binary UUID or the UTF-8 bytes of any other value
+    """
+    if local_id is None:
+        return None
+
+    uuid_key = encode_uuid(local_id)
+    return uuid_key if uuid_key is not None else str(local_id).encode('utf-8')
+
+
+def _search_sorted(sorted_keys, sorted_values, keys):
+    results = np.full(len(keys), MISSING_VALUE, dtype=np.int64)
+    if len(sorted_keys) == 0 or len(keys) == 0:
+        return results
+
+    positions = np.searchsorted(sorted_keys, keys)
+    positions = np.minimum(positions, len(sorted_keys) - 1)
+    found = sorted_keys[positions] == keys
+    results[found] = sorted_values[positions[found]]
+    return results
+
+
+def _sort_unique(keys, values, keep_first=False):
+    # the last value of a duplicated key wins, same as building a dict, or the first one with keep_first
+    order = np.argsort(keys, kind='stable')
+    keys, values = keys[order], values[order]
+    if len(keys) == 0:
+        return keys, values
+
+    is_new_key = keys[1:] != keys[:-1]
+    keep = np.insert(is_new_key, 0, True) if keep_first else np.append(is_new_key, True)
+    return keys[keep], values[keep]
+
+
+class LocalIdLookup:
+    """
+    Compact LocalId -> integer lookup.
+    FEATURE_ID UUIDs are kept as 17-byte keys in a sorted array with the values in a parallel integer array,
+    the few LocalIds which are not UUIDs are kept in a second sorted array.
+    """
+
+    def __init__(self, uuid_keys, uuid_values, other_keys, other_values):
+        self.uuid_keys = uuid_keys
+        self.uuid_values = uuid_values
+        self.other_keys = other_keys
+        self.other_values = other_values
+
+    def __del__(self):
+        del self.uuid_keys
+        del self.uuid_values
+        del self.other_keys
+        del self.other_values
+
+    def __len__(self):
+        return len(self.uuid_keys) + len(self.other_keys)
+
+    @staticmethod
+    def from_items(items, value_dtype=np.int64):
+        """
+        :param items: Iterable[(LocalId, value)]
+        """
+        builder = LocalIdLookupBuilder(value_dtype)
+        for local_id, value in items:
+            builder.add(local_id, value)
+        return builder.build()
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in [self.uuid_keys, self.uuid_values, self.other_keys, self.other_values])
+
+    def get(self, local_id):
+        if local_id is None:
+            return None
+
+        uuid_key = encode_uuid(local_id)
+        if uuid_key is not None:
+            result = _search_sorted(self.uuid_keys, self.uuid_values, np.array([uuid_key], dtype=UUID_KEY_DTYPE))[0]
+        else:
+            result = _search_sorted(self.other_keys, self.other_values, np.array([str(local_id).encode('utf-8')]))[0]
+
+        return None if result == MISSING_VALUE else int(result)
+
+    def get_many(self, local_ids):
+        """
+        :param local_ids: Sequence[LocalId]
+        :return: numpy int64 array of the values, MISSING_VALUE for the LocalIds which are not found
+        """
+        uuid_positions, uuid_keys = [], []
+        other_positions, other_keys = [], []
+        for position, local_id in enumerate(local_ids):
+            if local_id is None:
+                continue
+
+            uuid_key = encode_uuid(local_id)
+            if uuid_key is not None:
+                uuid_positions.append(position)
+                uuid_keys.append(uuid_key)
+            else:
+                other_positions.append(position)
+                other_keys.append(str(local_id).encode('utf-8'))
+
+        results = np.full(len(local_ids), MISSING_VALUE, dtype=np.int64)
+        if uuid_keys:
+            keys = np.array(uuid_keys, dtype=UUID_KEY_DTYPE)
+            results[uuid_positions] = _search_sorted(self.uuid_keys, self.uuid_values, keys)
+        if other_keys:
+            results[other_positions] = _search_sorted(self.other_keys, self.other_values, np.array(other_keys))
+        return results
+
+
+class LocalIdLookupBuilder:
+    """
+    Collect (LocalId, value) pairs in fixed size numpy chunks instead of Python objects.
+    """
+
+    def __init__(self, value_dtype=np.int64):
+        self.value_dtype = value_dtype
+        self.uuid_key_chunks, self.uuid_value_chunks = [], []
+        self.uuid_keys, self.uuid_values = [], []
+        self.other_keys, self.other_values = [], []
+
+    def __del__(self):
+        del self.value_dtype
+        del self.uuid_key_chunks
+        del self.uuid_value_chunks
+        del self.uuid_keys
+        del self.uuid_values
+        del self.other_keys
+        del self.other_values
+
+    def _flush(self):
+        if not self.uuid_keys:
+            return
+
+        self.uuid_key_chunks.append(np.array(self.uuid_keys, dtype=UUID_KEY_DTYPE))
+        self.uuid_value_chunks.append(np.array(self.uuid_values, dtype=self.value_dtype))
+        self.uuid_keys, self.uuid_values = [], []
+
+    def add(self, local_id, value):
+        if local_id is None:
+            return
+
+        uuid_key = encode_uuid(local_id)
+        if uuid_key is not None:
+            self.uuid_keys.append(uuid_key)
+            self.uuid_values.append(value)
+            if len(self.uuid_keys) >= BUILDER_CHUNK_SIZE:
+                self._flush()
+        else:
+            self.other_keys.append(str(local_id).encode('utf-8'))
+            self.other_values.append(value)
+
+    def build(self, keep_first=False):
+        """
+        :param keep_first: True to keep the first value added for a duplicated LocalId, the last one otherwise
+        """
+        self._flush()
+        uuid_keys = np.concatenate(self.uuid_key_chunks) if self.uuid_key_chunks \
+            else np.zeros(0, dtype=UUID_KEY_DTYPE)
+        uuid_values = np.concatenate(self.uuid_value_chunks) if self.uuid_value_chunks \
+            else np.zeros(0, dtype=self.value_dtype)
+        self.uuid_key_chunks, self.uuid_value_chunks = [], []
+
+        other_keys = np.array(self.other_keys) if self.other_keys else np.zeros(0, dtype='S1')
+        other_values = np.array(self.other_values, dtype=self.value_dtype)
+
+        uuid_keys, uuid_values = _sort_unique(uuid_keys, uuid_values, keep_first)
+        other_keys, other_values = _sort_unique(other_keys, other_values, keep_first)
+        return LocalIdLookup(uuid_keys, uuid_values, other_keys, other_values)
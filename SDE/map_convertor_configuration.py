@@ -1,13 +1,76 @@
 from typing import Dict, Any
 import os
-import arcpy
 import xml.etree.ElementTree as ET
 from xml.etree.ElementTree import ElementTree
 
 import constants
+from data_access import import_arcpy
 from national_map_utility import NationalMapUtility
 
 ALL_US_STATES = 'USA'
+DEFAULT_STATE_WORKERS = 1
+STREET_FIELD_CALCULATION = {
+    'CURSOR': 'CURSOR',
+    'VECTORIZED': 'VECTORIZED'
+}
+STREET_GROUP_ENGINE = {
+    'BUFFER': 'BUFFER',
+    'GRAPH': 'GRAPH'
+}
+IMPORT_ENGINE = {
+    'CURSOR': 'CURSOR',
+    'BULK': 'BULK'
+}
+DATA_ACCESS_BACKEND = {
+    'ARCPY': 'ARCPY',
+    'GDAL': 'GDAL'
+}
+JOIN_ENGINE = {
+    'JOIN_FIELD': 'JOIN_FIELD',
+    'HASH': 'HASH'
+}
+JUNCTION_ENGINE = {
+    'SPATIAL_JOIN': 'SPATIAL_JOIN',
+    'ENDPOINT': 'ENDPOINT'
+}
+STREET_INTERSECT_ENGINE = {
+    'PAIRWISE_INTERSECT': 'PAIRWISE_INTERSECT',
+    'TILED': 'TILED'
+}
+STREET_POLYGON_ENGINE = {
+    'FEATURE_TO_POLYGON': 'FEATURE_TO_POLYGON',
+    'TILED': 'TILED'
+}
+REFERENCE_LANDMARKS_ENGINE = {
+    'MEASURE_ON_LINE': 'MEASURE_ON_LINE',
+    'VECTORIZED': 'VECTORIZED'
+}
+DEFAULT_IMPORT_BATCH_SIZE = 100_000
+DEFAULT_IMPORT_WORKERS = 1
+DEFAULT_PREFETCH_STATES = 0
+DEFAULT_MAX_EXTRACTED_STATES = 2
+DEFAULT_EXPORT_WORKERS = 1
+DEFAULT_STREET_INTERSECT_WORKERS = 1
+DEFAULT_STREET_POLYGON_WORKERS = 1
+DEFAULT_STREET_POLYGON_WORKER_MEMORY_MB = 2048
+
+
+def _find_text(parent_element, tag, default_value=None):
+    if parent_element is None:
+        return default_value
+
+    element = parent_element.find(tag)
+    if element is None or element.text is None:
+        return default_value
+    return element.text.strip()
+
+
+def _find_int(parent_element, tag, default_value):
+    return int(_find_text(parent_element, tag, default_value))
+
+
+def _find_bool(parent_element, tag, default_value):
+    return str(_find_text(parent_element, tag, default_value)).lower() == 'true'
 
 
 class MapConvertorConfiguration:
@@ -15,17 +78,20 @@ class MapConvertorConfiguration:
     tree: ElementTree
 
     def __init__(self, configuration_file):
+        self.configuration_file = configuration_file
         self.tree = ET.parse(configuration_file)
         self.root = self.tree.getroot()
         self.data = {
             'Precisely': {},
             'Logging': {},
             'ArcGIS': {},
-            'Outputs': {}
+            'Outputs': {},
+            'Performance': {}
         }
         self.run()
 
     def __del__(self):
+        del self.configuration_file
         del self.tree
         del self.root
         del self.data
@@ -52,9 +118,11 @@ class MapConvertorConfiguration:
 
         logging_level_element = logging_element.find('Level')
         log_level = logging_level_element.text.upper()
+        tracing = _find_bool(logging_element, 'Tracing', False)
 
         self.data['Logging'] = {
-            'log_level': log_level
+            'log_level': log_level,
+            'tracing': tracing
         }
 
     def _read_arcgis_enterprise_geodatabase_configuration(self):
@@ -168,6 +236,66 @@ class MapConvertorConfiguration:
             'arcgis_server_connection_name': arcgis_server_connection_name,
         }
 
+    def _read_performance_configuration(self):
+        # optional section, missing settings keep the sequential behavior
+        performance_element = self.root.find('Performance')
+
+        state_workers = _find_int(performance_element, 'StateWorkers', DEFAULT_STATE_WORKERS)
+        street_field_calculation = _find_text(performance_element, 'StreetFieldCalculation',
+                                              STREET_FIELD_CALCULATION['CURSOR']).upper()
+        street_group_engine = _find_text(performance_element, 'StreetGroupEngine',
+                                         STREET_GROUP_ENGINE['BUFFER']).upper()
+        import_engine = _find_text(performance_element, 'ImportEngine', IMPORT_ENGINE['CURSOR']).upper()
+        import_batch_size = _find_int(performance_element, 'ImportBatchSize', DEFAULT_IMPORT_BATCH_SIZE)
+        import_workers = _find_int(performance_element, 'ImportWorkers', DEFAULT_IMPORT_WORKERS)
+        prefetch_states = _find_int(performance_element, 'PrefetchStates', DEFAULT_PREFETCH_STATES)
+        max_extracted_states = _find_int(performance_element, 'MaxExtractedStates', DEFAULT_MAX_EXTRACTED_STATES)
+        selective_extraction = _find_bool(performance_element, 'SelectiveExtraction', False)
+        incremental_build = _find_bool(performance_element, 'IncrementalBuild', False)
+        data_access_backend = _find_text(performance_element, 'DataAccessBackend',
+                                         DATA_ACCESS_BACKEND['ARCPY']).upper()
+        read_from_zip = _find_bool(performance_element, 'ReadFromZip', False)
+        fused_state_export = _find_bool(performance_element, 'FusedStateExport', False)
+        export_workers = _find_int(performance_element, 'ExportWorkers', DEFAULT_EXPORT_WORKERS)
+        join_engine = _find_text(performance_element, 'JoinEngine', JOIN_ENGINE['JOIN_FIELD']).upper()
+        junction_engine = _find_text(performance_element, 'JunctionEngine', JUNCTION_ENGINE['SPATIAL_JOIN']).upper()
+        street_intersect_engine = _find_text(performance_element, 'StreetIntersectEngine',
+                                             STREET_INTERSECT_ENGINE['PAIRWISE_INTERSECT']).upper()
+        street_intersect_workers = _find_int(performance_element, 'StreetIntersectWorkers',
+                                             DEFAULT_STREET_INTERSECT_WORKERS)
+        street_polygon_engine = _find_text(performance_element, 'StreetPolygonEngine',
+                                           STREET_POLYGON_ENGINE['FEATURE_TO_POLYGON']).upper()
+        street_polygon_workers = _find_int(performance_element, 'StreetPolygonWorkers', DEFAULT_STREET_POLYGON_WORKERS)
+        street_polygon_worker_memory_mb = _find_int(performance_element, 'StreetPolygonWorkerMemoryMB',
+                                                    DEFAULT_STREET_POLYGON_WORKER_MEMORY_MB)
+        reference_landmarks_engine = _find_text(performance_element, 'ReferenceLandmarksEngine',
+                                                REFERENCE_LANDMARKS_ENGINE['MEASURE_ON_LINE']).upper()
+
+        self.data['Performance'] = {
+            'state_workers': max(state_workers, 1),
+            'street_field_calculation': street_field_calculation,
+            'street_group_engine': street_group_engine,
+            'import_engine': import_engine,
+            'import_batch_size': max(import_batch_size, 1),
+            'import_workers': max(import_workers, 1),
+            'prefetch_states': max(prefetch_states, 0),
+            'max_extracted_states': max(max_extracted_states, 1),
+            'selective_extraction': selective_extraction,
+            'incremental_build': incremental_build,
+            'data_access_backend': data_access_backend,
+            'read_from_zip': read_from_zip,
+            'fused_state_export': fused_state_export,
+            'export_workers': max(export_workers, 1),
+            'join_engine': join_engine,
+            'junction_engine': junction_engine,
+            'street_intersect_engine': street_intersect_engine,
+            'street_intersect_workers': max(street_intersect_workers, 1),
+            'street_polygon_engine': street_polygon_engine,
+            'street_polygon_workers': max(street_polygon_workers, 1),
+            'street_polygon_worker_memory_mb': max(street_polygon_worker_memory_mb, 1),
+            'reference_landmarks_engine': reference_landmarks_engine
+        }
+
     def get_scratch_folder(self):
         return self.data['Outputs']['scratch_folder']
 
@@ -200,6 +328,72 @@ class MapConvertorConfiguration:
     def get_arcgis_server_folder_name(self):
         return self.data['Outputs']['arcgis_server_folder_name']
 
+    def get_state_workers(self):
+        return self.data['Performance']['state_workers']
+
+    def is_street_field_calculation_vectorized(self):
+        return self.data['Performance']['street_field_calculation'] == STREET_FIELD_CALCULATION['VECTORIZED']
+
+    def is_street_group_engine_graph(self):
+        return self.data['Performance']['street_group_engine'] == STREET_GROUP_ENGINE['GRAPH']
+
+    def is_import_engine_bulk(self):
+        return self.data['Performance']['import_engine'] == IMPORT_ENGINE['BULK']
+
+    def get_import_batch_size(self):
+        return self.data['Performance']['import_batch_size']
+
+    def get_import_workers(self):
+        return self.data['Performance']['import_workers']
+
+    def get_prefetch_states(self):
+        return self.data['Performance']['prefetch_states']
+
+    def get_max_extracted_states(self):
+        return self.data['Performance']['max_extracted_states']
+
+    def is_selective_extraction(self):
+        return self.data['Performance']['selective_extraction']
+
+    def is_incremental_build(self):
+        return self.data['Performance']['incremental_build']
+
+    def is_data_access_backend_gdal(self):
+        return self.data['Performance']['data_access_backend'] == DATA_ACCESS_BACKEND['GDAL']
+
+    def is_read_from_zip(self):
+        return self.data['Performance']['read_from_zip']
+
+    def is_fused_state_export(self):
+        return self.data['Performance']['fused_state_export']
+
+    def get_export_workers(self):
+        return self.data['Performance']['export_workers']
+
+    def is_join_engine_hash(self):
+        return self.data['Performance']['join_engine'] == JOIN_ENGINE['HASH']
+
+    def is_junction_engine_endpoint(self):
+        return self.data['Performance']['junction_engine'] == JUNCTION_ENGINE['ENDPOINT']
+
+    def is_street_intersect_engine_tiled(self):
+        return self.data['Performance']['street_intersect_engine'] == STREET_INTERSECT_ENGINE['TILED']
+
+    def get_street_intersect_workers(self):
+        return self.data['Performance']['street_intersect_workers']
+
+    def is_street_polygon_engine_tiled(self):
+        return self.data['Performance']['street_polygon_engine'] == STREET_POLYGON_ENGINE['TILED']
+
+    def get_street_polygon_workers(self):
+        return self.data['Performance']['street_polygon_workers']
+
+    def get_street_polygon_worker_memory_mb(self):
+        return self.data['Performance']['street_polygon_worker_memory_mb']
+
+    def is_reference_landmarks_engine_vectorized(self):
+        return self.data['Performance']['reference_landmarks_engine'] == REFERENCE_LANDMARKS_ENGINE['VECTORIZED']
+
     def is_output_file_gdb(self):
         return self.data['Outputs']['format'] == constants.OUT_FORMAT['FILE_GDB']
 
@@ -208,6 +402,7 @@ class MapConvertorConfiguration:
 
     @staticmethod
     def set_arcpy_environment():
+        arcpy = import_arcpy()
         if arcpy.GetLogHistory():
             arcpy.SetLogHistory(False)
 
@@ -228,4 +423,5 @@ class MapConvertorConfiguration:
         self._read_arcgis_enterprise_geodatabase_configuration()
         self._read_arcgis_server_configuration()
         self._read_outputs_configuration()
+        self._read_performance_configuration()
 
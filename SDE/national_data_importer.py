@@ -1,8 +1,14 @@
 import os.path
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import arcpy
 
+from map_convertor_configuration import MapConvertorConfiguration
 from national_map_logger import NationalMapLogger
 from national_map_utility import NationalMapUtility
+from street_intersect import generate_street_intersect
+from street_junction import generate_t_junctions
+from street_polygon import generate_street_polygon
 import constants
 
 
@@ -20,20 +26,28 @@ def _get_out_target_feature_class(target_workspace, key):
     return out_feature_class
 
 
-def _convert_feature_class_to_workspace(feature_class_or_table, out_feature_class_or_table):
+def _convert_feature_class_to_workspace(feature_class_or_table, out_feature_class_or_table, batch_size=None):
+    """
+    :param batch_size: rows per OBJECTID range of the bulk engine, None for the row by row cursor
+    :return: number of rows written
+    """
     is_feature_class = NationalMapUtility.is_feature_class(feature_class_or_table)
     is_out_exists = arcpy.Exists(out_feature_class_or_table)
 
     if is_out_exists:
-        if is_feature_class:
-            _append_features_with_cursor(feature_class_or_table, out_feature_class_or_table)
+        if batch_size:
+            return _append_in_batches(feature_class_or_table, out_feature_class_or_table, is_feature_class,
+                                      batch_size)
+        elif is_feature_class:
+            return _append_features_with_cursor(feature_class_or_table, out_feature_class_or_table)
         else:
-            _append_rows_with_cursor(feature_class_or_table, out_feature_class_or_table)
+            return _append_rows_with_cursor(feature_class_or_table, out_feature_class_or_table)
     else:
         if is_feature_class:
             arcpy.management.CopyFeatures(feature_class_or_table, out_feature_class_or_table)
         else:
             arcpy.management.CopyRows(feature_class_or_table, out_feature_class_or_table)
+        return int(NationalMapUtility.get_count(out_feature_class_or_table)[0])
 
 
 def _get_source_fields(source_feature_class):
@@ -49,32 +63,96 @@ def _get_source_fields(source_feature_class):
     return field_names
 
 
+def _get_table_fields(source_table):
+    source_describe = arcpy.Describe(source_table)
+    return [field.name for field in source_describe.fields]
+
+
 def _append_features_with_cursor(source_feature_class, target_feature_class):
     memory_layer = constants.TEMP_MEMORY_LAYER
     if arcpy.Exists(memory_layer):
         arcpy.management.Delete(memory_layer)
     arcpy.management.MakeFeatureLayer(source_feature_class, memory_layer)
 
+    count = 0
     field_names = _get_source_fields(source_feature_class)
     with arcpy.da.SearchCursor(memory_layer, field_names) as search_cursor:
         with arcpy.da.InsertCursor(target_feature_class, field_names) as insert_cursor:
             for row in search_cursor:
                 insert_cursor.insertRow(row)
+                count += 1
 
     arcpy.management.Delete(memory_layer)
     del memory_layer
     arcpy.management.Delete("memory")
+    return count
 
 
 def _append_rows_with_cursor(source_table, target_table):
-    source_describe = arcpy.Describe(source_table)
-    source_fields = source_describe.fields
-    field_names = [field.name for field in source_fields]
-
+    count = 0
+    field_names = _get_table_fields(source_table)
     with arcpy.da.SearchCursor(source_table, field_names) as search_cursor:
         with arcpy.da.InsertCursor(target_table, field_names) as insert_cursor:
             for row in search_cursor:
                 insert_cursor.insertRow(row)
+                count += 1
+    return count
+
+
+def _append_in_batches(source_feature_class_or_table, target_feature_class_or_table, is_feature_class, batch_size):
+    """
+    Append the source in OBJECTID ranges of batch_size rows, one Append of a layer (table view) per range,
+    the rows are written by the geoprocessing tool and not one by one through Python.
+    """
+    batch_layer = f'{constants.TEMP_MEMORY_LAYER}_batch'
+    make_batch_layer = arcpy.management.MakeFeatureLayer if is_feature_class else arcpy.management.MakeTableView
+
+    count = 0
+    where_clauses = NationalMapUtility.get_object_id_where_clauses(source_feature_class_or_table, batch_size)
+    for where_clause in where_clauses:
+        if arcpy.Exists(batch_layer):
+            arcpy.management.Delete(batch_layer)
+        make_batch_layer(source_feature_class_or_table, batch_layer, where_clause)
+
+        count += int(NationalMapUtility.get_count(batch_layer)[0])
+        arcpy.management.Append(batch_layer, target_feature_class_or_table, 'NO_TEST')
+        arcpy.management.Delete(batch_layer)
+    return count
+
+
+def _log_throughput(name, count, cost_time):
+    rows_per_second = count / cost_time if cost_time > 0 else 0
+    NationalMapLogger.info(f'{name}: {count} rows, {cost_time:.1f} sec., {rows_per_second:.0f} rows/sec')
+
+
+def _import_feature_class(feature_class_or_table, out_feature_class_or_table, batch_size):
+    start_time = time.time()
+    count = _convert_feature_class_to_workspace(feature_class_or_table, out_feature_class_or_table, batch_size)
+    NationalMapLogger.add_rows(read=count, written=count)
+    _log_throughput(f'import {feature_class_or_table}', count, time.time() - start_time)
+    return count
+
+
+def _import_layer_in_worker(configuration_file, layer_key, sources, out_feature_class, batch_size):
+    """
+    Append the state sources of one national layer in order, the worker is the only writer of out_feature_class.
+    :return: (layer_key, rows written, error)
+    """
+    configuration = MapConvertorConfiguration(configuration_file)
+    NationalMapLogger.init(configuration, log_suffix=f'import_{layer_key}')
+    MapConvertorConfiguration.set_arcpy_environment()
+
+    layer_count, layer_start_time = 0, time.time()
+    try:
+        with NationalMapLogger.span(f'import layer {layer_key}'):
+            for feature_class in sources:
+                layer_count += _import_feature_class(feature_class, out_feature_class, batch_size)
+    except Exception as e:
+        NationalMapLogger.error(f'_import_layer_in_worker failed, {layer_key}: {e}')
+        return layer_key, layer_count, str(e)
+
+    _log_throughput(f'import {out_feature_class}', layer_count, time.time() - layer_start_time)
+    return layer_key, layer_count, None
 
 
 class NationalDataImporter:
@@ -82,17 +160,26 @@ class NationalDataImporter:
     Import US national map data into Enterprise Geodatabase (SDE)
     """
 
-    def __init__(self, configuration, out_workspace):
+    def __init__(self, configuration, out_workspace, journal=None):
         self.configuration = configuration
         self.states = configuration.data['Outputs']['states']
         self.scratch_gdb_location = configuration.get_scratch_folder()
         self.target_workspace = out_workspace
+        self.journal = journal
 
     def __del__(self):
         del self.configuration
         del self.states
         del self.scratch_gdb_location
         del self.target_workspace
+        del self.journal
+
+    def _run_stage(self, stage, func, out_key):
+        with NationalMapLogger.span(stage):
+            if self.journal is None:
+                func()
+            else:
+                self.journal.run_stage(stage, func, [_get_out_target_feature_class(self.target_workspace, out_key)])
 
     def _create_dataset(self):
         dataset_name = constants.GDB_ITEMS_DICT['NATIONAL']['DATASET']['name']
@@ -103,20 +190,35 @@ class NationalDataImporter:
 
         arcpy.management.CreateFeatureDataset(self.target_workspace, dataset_name, constants.SR_WEB_MERCATOR)
 
+    def _get_state_gdb_file(self, state):
+        gdb_name = f'{state.lower()}.gdb'
+        return os.path.join(self.scratch_gdb_location, gdb_name)
+
+    def _get_skip_items(self):
+        skip_items = []
+        if self.configuration.is_output_sde():
+            skip_items = ['node_name', 'counties_name']
+        return skip_items
+
+    def _get_batch_size(self):
+        return self.configuration.get_import_batch_size() if self.configuration.is_import_engine_bulk() else None
+
     def _convert_to_target_workspace(self):
+        if self.configuration.get_import_workers() > 1 and len(self.states) > 1:
+            self._convert_layers_in_parallel()
+            return
+
         for state in self.states:
-            gdb_name = f'{state.lower()}.gdb'
-            gdb_file = os.path.join(self.scratch_gdb_location, gdb_name)
+            gdb_file = self._get_state_gdb_file(state)
             self._convert_gdb_to_target_workspace(gdb_file)
 
     def _convert_gdb_to_target_workspace(self, gdb_file):
         message = f'_convert_gdb_to_target_workspace {gdb_file}'
         NationalMapLogger.info(message)
 
-        skip_items = []
-        if self.configuration.is_output_sde():
-            skip_items = ['node_name', 'counties_name']
-
+        skip_items = self._get_skip_items()
+        batch_size = self._get_batch_size()
+        state_count, state_start_time = 0, time.time()
         for key, name in constants.GDB_ITEMS_DICT['STATE'].items():
             if key in skip_items:
                 print(f'_convert_gdb_to_target_workspace skip {key}')
@@ -124,22 +226,76 @@ class NationalDataImporter:
             feature_class = os.path.join(gdb_file, name)
             out_feature_class = _get_out_target_feature_class(self.target_workspace, key)
             if out_feature_class:
-                _convert_feature_class_to_workspace(feature_class, out_feature_class)
+                state_count += _import_feature_class(feature_class, out_feature_class, batch_size)
+
+        _log_throughput(f'import {gdb_file}', state_count, time.time() - state_start_time)
+
+    def _convert_layers_in_parallel(self):
+        """
+        One worker per national layer, appending the states in order.
+        The first state creates every national layer here, so the workers never change the workspace schema.
+        """
+        skip_items = self._get_skip_items()
+        batch_size = self._get_batch_size()
+        import_workers = self.configuration.get_import_workers()
+
+        layers = {}
+        for key, name in constants.GDB_ITEMS_DICT['STATE'].items():
+            out_feature_class = _get_out_target_feature_class(self.target_workspace, key)
+            if key in skip_items or not out_feature_class:
+                continue
+            layers[key] = (out_feature_class, [os.path.join(self._get_state_gdb_file(state), name)
+                                               for state in self.states])
+
+        NationalMapLogger.info(f'_convert_layers_in_parallel, workers: {import_workers}, layers: {len(layers)}')
+        for key, (out_feature_class, sources) in layers.items():
+            _import_feature_class(sources[0], out_feature_class, batch_size)
+
+        failed_layers = []
+        start_time = time.time()
+        # the largest layers are submitted first, so they do not wait for a free worker at the end
+        layer_row_counts = {key: sum(int(NationalMapUtility.get_count(source)[0]) for source in sources[1:])
+                            for key, (_, sources) in layers.items()}
+        layer_keys = sorted(layers.keys(), key=lambda layer_key: layer_row_counts[layer_key], reverse=True)
+        with ProcessPoolExecutor(max_workers=import_workers) as executor:
+            futures = [
+                executor.submit(_import_layer_in_worker, self.configuration.configuration_file, key,
+                                layers[key][1][1:], layers[key][0], batch_size)
+                for key in layer_keys
+            ]
+            for future in as_completed(futures):
+                try:
+                    key, count, error = future.result()
+                except Exception as e:
+                    # the worker process itself died
+                    key, count, error = None, 0, str(e)
+
+                if error:
+                    failed_layers.append(f'{key}: {error}')
+                else:
+                    NationalMapLogger.info(f'_convert_layers_in_parallel, {key} succeeded, {count} rows')
+
+        NationalMapLogger.info(f'_convert_layers_in_parallel, cost time: {time.time() - start_time:.1f} sec.')
+        if failed_layers:
+            message = f'_convert_layers_in_parallel failed: {"; ".join(failed_layers)}'
+            NationalMapLogger.error(message)
+            raise RuntimeError(message)
 
     def _add_attribute_index(self):
         street_feature_class = _get_out_target_feature_class(self.target_workspace, 'street_name')
         if arcpy.Exists(street_feature_class):
             NationalMapLogger.debug(f'_add_attribute_index: idx_state_city')
-            arcpy.management.AddIndex(
-                in_table=street_feature_class,
-                fields='State;City',
-                index_name='idx_state_city'
-            )
+            NationalMapUtility.add_index(street_feature_class, 'State;City', 'idx_state_city')
 
     @NationalMapLogger.debug_decorator
     def _generate_t_junctions(self):
         street_nodes_feature_class = _get_out_target_feature_class(self.target_workspace, 'node_name')
         street_feature_class = _get_out_target_feature_class(self.target_workspace, 'street_name')
+        if self.configuration.is_junction_engine_endpoint():
+            junctions_feature_class = _get_out_target_feature_class(self.target_workspace, 't_junction_name')
+            generate_t_junctions(street_feature_class, street_nodes_feature_class, junctions_feature_class)
+            return
+
         memory_layer = constants.TEMP_MEMORY_LAYER
         if arcpy.Exists(memory_layer):
             arcpy.management.Delete(memory_layer)
@@ -178,6 +334,11 @@ class NationalDataImporter:
     def _generate_street_intersect(self):
         street_feature_class = _get_out_target_feature_class(self.target_workspace, 'street_name')
         railroad_feature_class = _get_out_target_feature_class(self.target_workspace, 'railroad_name')
+        if self.configuration.is_street_intersect_engine_tiled():
+            out_intersect = _get_out_target_feature_class(self.target_workspace, 'street_railroad_intersect_name')
+            generate_street_intersect(self.configuration, street_feature_class, railroad_feature_class, out_intersect)
+            return
+
         input_features = [street_feature_class, railroad_feature_class]
         memory_layer = constants.TEMP_MEMORY_LAYER
         if arcpy.Exists(memory_layer):
@@ -211,14 +372,30 @@ class NationalDataImporter:
     def _generate_street_polygon(self):
         street_feature_class = _get_out_target_feature_class(self.target_workspace, 'street_name')
         out_street_polygon_feature_class = _get_out_target_feature_class(self.target_workspace, 'street_polygon_name')
+        if self.configuration.is_street_polygon_engine_tiled():
+            generate_street_polygon(self.configuration, street_feature_class, out_street_polygon_feature_class)
+            return
         arcpy.management.FeatureToPolygon(street_feature_class, out_street_polygon_feature_class)
 
-    def run(self):
+    def _delete_target_layers(self):
+        # a resumed import starts over, rows of an interrupted import must not be appended twice
+        for key in constants.GDB_ITEMS_DICT['STATE'].keys():
+            out_feature_class = _get_out_target_feature_class(self.target_workspace, key)
+            if out_feature_class and arcpy.Exists(out_feature_class):
+                arcpy.management.Delete(out_feature_class)
+
+    def _import_state_data(self):
+        if self.journal is not None:
+            self._delete_target_layers()
         self._create_dataset()
         self._convert_to_target_workspace()
         self._add_attribute_index()
+
+    def run(self):
+        self._run_stage('import', self._import_state_data, 'street_name')
         if self.configuration.is_output_file_gdb():
             # Generate Junctions,national_street_polygon,STREETINTERSECTR for National Map FileGDB only.
-            self._generate_t_junctions()
-            self._generate_street_intersect()
-            self._generate_street_polygon()
+            self._run_stage('import:t_junctions', self._generate_t_junctions, 't_junction_name')
+            self._run_stage('import:street_intersect', self._generate_street_intersect,
+                            'street_railroad_intersect_name')
+            self._run_stage('import:street_polygon', self._generate_street_polygon, 'street_polygon_name')
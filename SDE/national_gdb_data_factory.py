@@ -3,13 +3,7 @@ import os.path
 import arcpy
 
 import constants
-
-
-def create_street_local_id_and_oid_lookup(street_feature_class):
-    return {
-        (item[0]): item[1]
-        for item in arcpy.da.SearchCursor(street_feature_class, ['LocalId', 'OID@'])
-    }
+from national_street_index import NationalStreetIndex, get_street_index_folder
 
 
 class NationalGDBDataFactory:
@@ -17,8 +11,8 @@ class NationalGDBDataFactory:
     def __init__(self, configuration, workspace):
         self.configuration = configuration
         self.workspace = workspace
+        # built on first use, the locator and network factories never need it
         self.street_local_id_oid_lookup = None
-        self._init_street_lookup()
 
     def __del__(self):
         del self.configuration
@@ -43,17 +37,23 @@ class NationalGDBDataFactory:
         return describe_id
 
     def _init_street_lookup(self):
-        if self.street_local_id_oid_lookup:
+        if self.street_local_id_oid_lookup is not None:
             return
 
         street_feature_class = self._get_street_feature_class()
-        self.street_local_id_oid_lookup = create_street_local_id_and_oid_lookup(street_feature_class)
+        index_folder = get_street_index_folder(self.configuration, self.workspace)
+        self.street_local_id_oid_lookup = NationalStreetIndex.get_index(street_feature_class, index_folder)
 
     def _get_street_object_id(self, local_id):
-        try:
-            return self.street_local_id_oid_lookup[local_id]
-        except Exception as e:
-            return None
+        self._init_street_lookup()
+        return self.street_local_id_oid_lookup.get(local_id)
+
+    def _get_street_object_ids(self, local_ids):
+        """
+        :return: numpy array of the OBJECTIDs, local_id_lookup.MISSING_VALUE for the unknown LocalIds
+        """
+        self._init_street_lookup()
+        return self.street_local_id_oid_lookup.get_many(local_ids)
 
     def _get_enterprise_database_connection(self):
         sql_connection = arcpy.ArcSDESQLExecute(self.workspace)
@@ -1,7 +1,9 @@
 import os
 import arcpy
+import numpy as np
 
 import constants
+from data_access import DataAccess, OID_TOKEN, SHAPE_TOKEN, WkbGeometry
 from national_gdb_data_factory import NationalGDBDataFactory
 from national_map_utility import NationalMapUtility
 from national_map_logger import NationalMapLogger
@@ -11,6 +13,7 @@ REFERENCE_LANDMARKS_SIDE = 0  # Both
 REFERENCE_LANDMARKS_GUIDANCE_TYPE = 4  # Railroad Crossing
 START_LANDMARKS_ID = 1
 HOTFIX_OFFSET = 0.00001
+CROSSING_CHUNK_SIZE = 500_000
 
 
 def add_reference_landmarks_fields(reference_landmarks_table):
@@ -33,10 +36,14 @@ def add_reference_landmarks_fields(reference_landmarks_table):
 
 
 @NationalMapLogger.debug_decorator
-def create_street_oid_and_shape_lookup(street_feature_class):
+def create_street_oid_and_shape_lookup(street_feature_class, object_ids):
+    """
+    :param object_ids: set of the OBJECTID of the streets to keep
+    """
     return {
         (item[0]): item[1]
         for item in arcpy.da.SearchCursor(street_feature_class, ['OID@', 'SHAPE@'])
+        if item[0] in object_ids
     }
 
 
@@ -53,6 +60,102 @@ def _calculate_from_to_position(position):
     return from_position, to_position
 
 
+class StreetSegments:
+    """
+    Segments of the crossed streets in flat arrays, the segments of street i are
+    first_segments[i]:first_segments[i + 1], from_measures are the distances of the segment starts along the street.
+    """
+
+    def __init__(self, object_ids, first_segments, starts, vectors, from_measures, lengths):
+        self.object_ids = object_ids
+        self.first_segments = first_segments
+        self.starts = starts
+        self.vectors = vectors
+        self.from_measures = from_measures
+        self.lengths = lengths
+
+    def __del__(self):
+        del self.object_ids
+        del self.first_segments
+        del self.starts
+        del self.vectors
+        del self.from_measures
+        del self.lengths
+
+    @staticmethod
+    def build(street_feature_class, object_ids):
+        """
+        :param object_ids: OBJECTID of the streets, only these streets are read
+        """
+        part_coordinates = {}
+        for object_id, geometry in DataAccess.search_rows_by_object_ids(street_feature_class, [OID_TOKEN, SHAPE_TOKEN],
+                                                                        object_ids):
+            if geometry is not None:
+                part_coordinates[object_id] = WkbGeometry(geometry.WKB).get_part_coordinates()
+
+        object_ids = np.array(sorted(part_coordinates.keys()), dtype=np.int64)
+        starts, vectors, segment_counts = [], [], []
+        for object_id in object_ids.tolist():
+            parts = part_coordinates.pop(object_id)
+            # a multipart street has no segment between its parts
+            starts.extend(part[:-1] for part in parts)
+            vectors.extend(part[1:] - part[:-1] for part in parts)
+            segment_counts.append(sum(len(part) - 1 for part in parts))
+
+        starts = np.concatenate(starts) if starts else np.zeros((0, 2), dtype=np.float64)
+        vectors = np.concatenate(vectors) if vectors else np.zeros((0, 2), dtype=np.float64)
+        first_segments = np.concatenate([[0], np.cumsum(segment_counts, dtype=np.int64)])
+        segment_lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+        cumulative_lengths = np.concatenate([[0.0], np.cumsum(segment_lengths)])
+        from_measures = cumulative_lengths[:-1] - cumulative_lengths[first_segments[:-1]].repeat(segment_counts)
+        lengths = cumulative_lengths[first_segments[1:]] - cumulative_lengths[first_segments[:-1]]
+        return StreetSegments(object_ids, first_segments, starts, vectors, from_measures, lengths)
+
+    def find_streets(self, street_object_ids):
+        """
+        :return: numpy array of the positions of the streets, -1 for the streets which are not read
+        """
+        positions = np.searchsorted(self.object_ids, street_object_ids)
+        is_found = positions < len(self.object_ids)
+        is_found[is_found] = self.object_ids[positions[is_found]] == street_object_ids[is_found]
+        return np.where(is_found, positions, -1)
+
+    def get_positions(self, streets, points):
+        """
+        measureOnLine of the points divided by the street length, the measure is the distance along the street to the
+        closest point of its first closest segment.
+        :param streets: numpy array of the street positions of find_streets, without -1
+        :param points: numpy array of the (x, y) points
+        :return: numpy array of the positions, 0 to 1
+        """
+        segment_counts = self.first_segments[streets + 1] - self.first_segments[streets]
+        # one row per point and segment of its street
+        pair_points = np.repeat(np.arange(len(streets)), segment_counts)
+        pair_offsets = np.arange(len(pair_points)) - np.repeat(np.cumsum(segment_counts) - segment_counts,
+                                                               segment_counts)
+        segments = self.first_segments[streets][pair_points] + pair_offsets
+
+        vectors = self.vectors[segments]
+        offsets = points[pair_points] - self.starts[segments]
+        squared_lengths = np.einsum('ij,ij->i', vectors, vectors)
+        ratios = np.divide(np.einsum('ij,ij->i', offsets, vectors), squared_lengths,
+                           out=np.zeros(len(segments)), where=squared_lengths > 0)
+        ratios = np.clip(ratios, 0.0, 1.0)
+        distances = offsets - ratios[:, np.newaxis] * vectors
+        squared_distances = np.einsum('ij,ij->i', distances, distances)
+
+        # the first closest segment of every point
+        order = np.lexsort((squared_distances, pair_points))
+        closest = order[np.concatenate([[True], pair_points[order][1:] != pair_points[order][:-1]])] \
+            if len(order) else order
+        measures = np.zeros(len(streets), dtype=np.float64)
+        measures[pair_points[closest]] = self.from_measures[segments[closest]] + \
+            ratios[closest] * np.sqrt(squared_lengths[closest])
+
+        lengths = self.lengths[streets]
+        return np.divide(measures, lengths, out=np.zeros(len(streets)), where=lengths > 0)
+
+
 class NationalLandmarksFactory(NationalGDBDataFactory):
     def __init__(self, configuration, workspace):
         super().__init__(configuration, workspace)
@@ -60,7 +163,8 @@ class NationalLandmarksFactory(NationalGDBDataFactory):
         self.street_railroad_intersect_feature_class = os.path.join(self.workspace, street_railroad_intersect_name)
         self.street_feature_class_name = constants.GDB_ITEMS_DICT['NATIONAL']['DATASET']['street_name']
         self.street_feature_class = os.path.join(self.workspace, self.street_feature_class_name)
-        self.street_oid_shape_lookup = create_street_oid_and_shape_lookup(self.street_feature_class)
+        # the crossed streets only, read by _generate_reference_landmarks_records
+        self.street_oid_shape_lookup = None
         self.reference_landmarks_table = None
 
     def __del__(self):
@@ -73,7 +177,8 @@ class NationalLandmarksFactory(NationalGDBDataFactory):
     @NationalMapLogger.debug_decorator
     def _create_reference_landmarks_table(self):
         reference_landmarks_table_name = constants.GDB_ITEMS_DICT['NATIONAL']['reference_landmarks_table_name']
-        reference_landmarks_table = arcpy.management.CreateTable(self.workspace, reference_landmarks_table_name)
+        arcpy.management.CreateTable(self.workspace, reference_landmarks_table_name)
+        reference_landmarks_table = os.path.join(self.workspace, reference_landmarks_table_name)
 
         add_reference_landmarks_fields(reference_landmarks_table)
         self.reference_landmarks_table = reference_landmarks_table
@@ -87,6 +192,10 @@ class NationalLandmarksFactory(NationalGDBDataFactory):
 
         landmark_id = START_LANDMARKS_ID
 
+        street_object_ids = {row[0] for row in arcpy.da.SearchCursor(self.street_railroad_intersect_feature_class,
+                                                                     search_fields[:1])}
+        self.street_oid_shape_lookup = create_street_oid_and_shape_lookup(self.street_feature_class,
+                                                                          street_object_ids)
         with arcpy.da.SearchCursor(self.street_railroad_intersect_feature_class, search_fields) as search_cursor:
             with arcpy.da.InsertCursor(self.reference_landmarks_table, insert_fields) as insert_cursor:
                 for intersect_feature in search_cursor:
@@ -99,6 +208,49 @@ class NationalLandmarksFactory(NationalGDBDataFactory):
                     insert_cursor.insertRow(row)
                     landmark_id += 1
 
+    @NationalMapLogger.debug_decorator
+    def _generate_reference_landmarks_records_vectorized(self):
+        """
+        The crossing positions of all crossings at once, memory grows with the crossings and the crossed streets.
+        """
+        street_feature_class_id = self.get_street_feature_class_id()
+        search_fields = [f'FID_{self.street_feature_class_name}', SHAPE_TOKEN]
+        insert_fields = ['LandmarkID', 'GuidanceType', 'Edge1FCID',
+                         'Edge1FID', 'Edge1FrmPos', 'Edge1ToPos', 'Edge1ConfirmationPos', 'Importance', 'Side']
+
+        street_object_ids, points = [], []
+        for street_oid, shape in DataAccess.search_rows(self.street_railroad_intersect_feature_class, search_fields):
+            intersect_point = shape.firstPoint
+            street_object_ids.append(street_oid)
+            points.append((intersect_point.X, intersect_point.Y))
+        street_object_ids = np.array(street_object_ids, dtype=np.int64)
+        points = np.array(points, dtype=np.float64).reshape(-1, 2)
+
+        street_segments = StreetSegments.build(self.street_feature_class, np.unique(street_object_ids).tolist())
+        streets = street_segments.find_streets(street_object_ids)
+        is_found = streets >= 0
+        if not is_found.all():
+            NationalMapLogger.warning(f'_generate_reference_landmarks_records_vectorized, '
+                                      f'{np.count_nonzero(~is_found)} crossings without their street are skipped')
+        street_object_ids, points, streets = street_object_ids[is_found], points[is_found], streets[is_found]
+
+        landmark_id, count = START_LANDMARKS_ID, 0
+        for start in range(0, len(streets), CROSSING_CHUNK_SIZE):
+            end = start + CROSSING_CHUNK_SIZE
+            positions = street_segments.get_positions(streets[start:end], points[start:end])
+            rows = []
+            for street_oid, position in zip(street_object_ids[start:end].tolist(), positions.tolist()):
+                position = round(position, 2)
+                from_position, to_position = _calculate_from_to_position(position)
+                rows.append([landmark_id, REFERENCE_LANDMARKS_GUIDANCE_TYPE, street_feature_class_id,
+                             street_oid, from_position, to_position, position,
+                             REFERENCE_LANDMARKS_IMPORTANCE, REFERENCE_LANDMARKS_SIDE])
+                landmark_id += 1
+            count += DataAccess.insert_rows(self.reference_landmarks_table, insert_fields, rows)
+            del positions, rows
+
+        NationalMapLogger.add_rows(read=len(streets) + len(street_segments.object_ids), written=count)
+
     def _calculate_intersect_point_position(self, intersect_feature):
         street_oid = intersect_feature[0]
         intersect_point = intersect_feature[1].firstPoint
@@ -111,5 +263,8 @@ class NationalLandmarksFactory(NationalGDBDataFactory):
 
     def run(self):
         self._create_reference_landmarks_table()
-        self._generate_reference_landmarks_records()
+        if self.configuration.is_reference_landmarks_engine_vectorized():
+            self._generate_reference_landmarks_records_vectorized()
+        else:
+            self._generate_reference_landmarks_records()
 
@@ -1,6 +1,10 @@
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import constants
+from build_manifest import BuildManifest
+from data_access import DataAccess
 from map_convertor_configuration import MapConvertorConfiguration
 from file_geodatabase import FileGeodatabase
 from national_landmarks_factory import NationalLandmarksFactory
@@ -8,7 +12,7 @@ from national_landmarks_factory import NationalLandmarksFactory
 from national_mobile_map_package_factory import NationalMobileMapPackageFactory
 from national_map_logger import NationalMapLogger
 from enterprise_geodatabase import EnterpriseGeodatabase
-from precisely_data_extract import PreciselyDataExtract
+from precisely_data_extract import PreciselyDataExtract, PreciselyDataPrefetcher
 from state_data_settings import StateDataSettings
 from state_exporter import StateExporter
 from state_street_converter import StateStreetConverter
@@ -20,91 +24,254 @@ from national_restriction_turn_factory import NationalRestrictionTurnFactory
 from national_signpost_factory import NationalSignpostFactory
 from national_network_factory import NationalNetworkFactory
 from national_locator_factory import NationalLocatorFactory
+from pipeline_journal import PipelineJournal, get_journal_file, get_state_stage
 
 
-def convert_state_data_for_national(state, configuration):
+def convert_state_data_for_national(state, configuration, precisely_data_extract=None):
+    """
+    :param precisely_data_extract: already extracted source data of a prefetcher, which also removes it
+    """
     message = f'convert_state_data_for_national, {state}'
     NationalMapLogger.info(message)
 
-    precisely_data_extract = PreciselyDataExtract(state, configuration)
-    precisely_data_extract.run()
+    with NationalMapLogger.span(f'state {state}', state=state):
+        _convert_state_data(state, configuration, precisely_data_extract)
+
+
+def _run_converter(converter):
+    with NationalMapLogger.span(f'{type(converter).__name__}.run'):
+        converter.run()
+
+
+def _convert_state_data(state, configuration, precisely_data_extract):
+    is_extract_owner = precisely_data_extract is None
+    if is_extract_owner:
+        precisely_data_extract = PreciselyDataExtract(state, configuration)
+        _run_converter(precisely_data_extract)
 
     state_data_settings = StateDataSettings(state, configuration)
     state_exporter = StateExporter(state_data_settings)
-    state_exporter.run()
+    _run_converter(state_exporter)
 
     street_converter = StateStreetConverter(state_data_settings, state_exporter)
-    street_converter.run()
+    _run_converter(street_converter)
     street_data = street_converter.data
 
     restriction_converter = StateRestrictionConverter(state_data_settings, state_exporter, street_data)
-    restriction_converter.run()
+    _run_converter(restriction_converter)
 
     signpost_convert = StateSignpostConverter(state_data_settings, state_exporter, street_data)
-    signpost_convert.run()
+    _run_converter(signpost_convert)
 
     if configuration.is_output_file_gdb():
         node_converter = StateNodeConverter(state_data_settings, state_exporter, street_data)
-        node_converter.run()
-
-    precisely_data_extract.dispose()
-
+        _run_converter(node_converter)
+
+    if is_extract_owner:
+        precisely_data_extract.dispose()
+
+
+def convert_states_with_prefetch(states, configuration, on_state_converted=None):
+    """
+    Convert the states one after another while the next archives are extracted in the background.
+    :param on_state_converted: called with the state after its conversion
+    """
+    NationalMapLogger.info(f'convert_states_with_prefetch, prefetch: {configuration.get_prefetch_states()}, '
+                           f'max extracted: {configuration.get_max_extracted_states()}')
+    prefetcher = PreciselyDataPrefetcher(states, configuration)
+    try:
+        for state in states:
+            precisely_data_extract = prefetcher.get(state)
+            try:
+                convert_state_data_for_national(state, configuration, precisely_data_extract)
+            finally:
+                prefetcher.release(state)
+
+            if on_state_converted:
+                on_state_converted(state)
+    finally:
+        prefetcher.shutdown()
+
+
+def _convert_state_data_in_worker(state, configuration_file):
+    configuration = MapConvertorConfiguration(configuration_file)
+    NationalMapLogger.init(configuration, log_suffix=state)
+    MapConvertorConfiguration.set_arcpy_environment()
+    DataAccess.init(configuration)
 
-def generate_national_enterprise_geodatabase(configuration):
+    try:
+        convert_state_data_for_national(state, configuration)
+    except Exception as e:
+        NationalMapLogger.error(f'convert_state_data_for_national failed, {state}: {e}')
+        return False, str(e)
+
+    return True, None
+
+
+def convert_states_in_parallel(states, configuration):
+    """
+    Convert the states in a process pool, a failed state does not stop the others.
+    :return: Dict[state] = succeeded
+    """
+    summary = {}
+    state_workers = configuration.get_state_workers()
+    NationalMapLogger.info(f'convert_states_in_parallel, workers: {state_workers}, states: {len(states)}')
+
+    with ProcessPoolExecutor(max_workers=state_workers) as executor:
+        futures = {
+            executor.submit(_convert_state_data_in_worker, state, configuration.configuration_file): state
+            for state in states
+        }
+        for future in as_completed(futures):
+            state = futures[future]
+            try:
+                succeeded, error = future.result()
+            except Exception as e:
+                # the worker process itself died
+                succeeded, error = False, str(e)
+
+            summary[state] = succeeded
+            if succeeded:
+                NationalMapLogger.info(f'convert_states_in_parallel, {state} succeeded')
+            else:
+                NationalMapLogger.error(f'convert_states_in_parallel, {state} failed: {error}')
+
+    return {state: summary[state] for state in states}
+
+
+def _log_state_summary(summary):
+    succeeded_states = [state for state, succeeded in summary.items() if succeeded]
+    failed_states = [state for state, succeeded in summary.items() if not succeeded]
+    NationalMapLogger.info(f'states succeeded ({len(succeeded_states)}): {";".join(succeeded_states)}')
+    if failed_states:
+        NationalMapLogger.error(f'states failed ({len(failed_states)}): {";".join(failed_states)}')
+
+
+def _run_stage(journal, stage, func, outputs=None):
+    with NationalMapLogger.span(stage):
+        if journal is None:
+            func()
+        else:
+            journal.run_stage(stage, func, outputs)
+
+
+def generate_national_enterprise_geodatabase(configuration, journal=None):
     enterprise_geodatabase = EnterpriseGeodatabase(configuration)
-    enterprise_geodatabase.run()
-
     sde_connection = enterprise_geodatabase.get_sde_connection()
-    _generate_national_data(configuration, sde_connection)
+    _run_stage(journal, 'geodatabase', enterprise_geodatabase.run, [sde_connection])
 
+    _generate_national_data(configuration, sde_connection, journal)
 
-def generate_national_file_geodatabase(configuration):
-    file_geodatabase = FileGeodatabase(configuration)
-    file_geodatabase.run()
 
+def generate_national_file_geodatabase(configuration, journal=None):
+    file_geodatabase = FileGeodatabase(configuration)
     file_gdb_path = configuration.get_file_geodatabase()
-    _generate_national_data(configuration, file_gdb_path)
+    _run_stage(journal, 'geodatabase', file_geodatabase.run, [file_gdb_path])
+
+    _generate_national_data(configuration, file_gdb_path, journal)
 
     locator_factory = NationalLocatorFactory(configuration, file_gdb_path)
-    locator_factory.run()
+    _run_stage(journal, 'locator', locator_factory.run, [configuration.get_locator_file_path()])
 
     network_factory = NationalNetworkFactory(configuration, file_gdb_path)
-    network_factory.run()
+    _run_stage(journal, 'network', network_factory.run, [configuration.get_dissolved_file_geodatabase()])
 
 
-def _generate_national_data(configuration, workspace):
-    national_importer = NationalDataImporter(configuration, workspace)
+def _generate_national_data(configuration, workspace, journal=None):
+    national_importer = NationalDataImporter(configuration, workspace, journal)
     national_importer.run()
 
+    national_items = constants.GDB_ITEMS_DICT['NATIONAL']
+    national_dataset = os.path.join(workspace, national_items['DATASET']['name'])
+
     restriction_turn_factory = NationalRestrictionTurnFactory(configuration, workspace)
-    restriction_turn_factory.run()
+    _run_stage(journal, 'turn', restriction_turn_factory.run,
+               [os.path.join(national_dataset, national_items['DATASET']['turn_name'])])
+    # a stage of its own, a resumed 'turn' still finds its input
+    _run_stage(journal, 'turn:drop_restrictions', restriction_turn_factory.drop_restriction_feature_class)
 
     signpost_factory = NationalSignpostFactory(configuration, workspace)
-    signpost_factory.run()
+    _run_stage(journal, 'signpost', signpost_factory.run,
+               [os.path.join(workspace, national_items['signpost_table_name'])])
 
     if configuration.is_output_file_gdb():
         landmarks_factory = NationalLandmarksFactory(configuration, workspace)
-        landmarks_factory.run()
+        _run_stage(journal, 'landmarks', landmarks_factory.run,
+                   [os.path.join(workspace, national_items['reference_landmarks_table_name'])])
+
+
+def _get_states_to_convert(states, build_manifest, journal):
+    convert_states = states
+    if build_manifest:
+        convert_states = [state for state in convert_states if not build_manifest.is_state_current(state)]
+        skipped_states = [state for state in states if state not in convert_states]
+        NationalMapLogger.info(f'incremental build, unchanged states skipped ({len(skipped_states)}): '
+                               f'{";".join(skipped_states)}')
+        build_manifest.invalidate_states(convert_states)
+
+    if journal:
+        completed_states = [state for state in convert_states
+                            if journal.is_completed(get_state_stage(state), is_state_stage=True)]
+        if completed_states:
+            NationalMapLogger.info(f'resume, completed states skipped ({len(completed_states)}): '
+                                   f'{";".join(completed_states)}')
+        convert_states = [state for state in convert_states if state not in completed_states]
+        for state in convert_states:
+            journal.start(get_state_stage(state))
+
+    return convert_states
+
+
+def _parse_arguments():
+    parser = argparse.ArgumentParser(description='Convert the Precisely NAVPREM data into the national map')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip the stages completed by the previous run, restart from the first incomplete one')
+    return parser.parse_args()
 
 
 def main():
+    arguments = _parse_arguments()
     configuration_file = os.path.join('config', 'national_configuration.xml')
     configuration = MapConvertorConfiguration(configuration_file)
     NationalMapLogger.init(configuration)
     MapConvertorConfiguration.set_arcpy_environment()
+    DataAccess.init(configuration)
     NationalMapLogger.info('---------- Start ----------')
 
+    journal = PipelineJournal(get_journal_file(configuration), resume=arguments.resume)
+    build_manifest = BuildManifest(configuration) if configuration.is_incremental_build() else None
+
+    def record_converted_state(converted_state):
+        if build_manifest:
+            build_manifest.record_state(converted_state)
+        scratch_gdb = os.path.join(configuration.get_scratch_folder(), f'{converted_state.lower()}.gdb')
+        journal.complete(get_state_stage(converted_state), [scratch_gdb])
+
     output_states = configuration.data['Outputs']['states']
-    for state in output_states:
-        convert_state_data_for_national(state, configuration)
+    convert_states = _get_states_to_convert(output_states, build_manifest, journal)
+
+    if configuration.get_state_workers() > 1:
+        summary = convert_states_in_parallel(convert_states, configuration)
+        _log_state_summary(summary)
+        for state in [state for state, succeeded in summary.items() if succeeded]:
+            record_converted_state(state)
+
+        # import the skipped states and the states which are converted successfully only
+        configuration.data['Outputs']['states'] = [state for state in output_states if summary.get(state, True)]
+    elif configuration.get_prefetch_states() > 0:
+        convert_states_with_prefetch(convert_states, configuration, record_converted_state)
+    else:
+        for state in convert_states:
+            convert_state_data_for_national(state, configuration)
+            record_converted_state(state)
 
     if configuration.is_output_file_gdb():
-        generate_national_file_geodatabase(configuration)
+        generate_national_file_geodatabase(configuration, journal)
         national_mobile_map_package_factory = NationalMobileMapPackageFactory(configuration)
-        national_mobile_map_package_factory.run()
+        _run_stage(journal, 'mmpk', national_mobile_map_package_factory.run, [configuration.get_mobile_geodatabase()])
 
     if configuration.is_output_sde():
-        generate_national_enterprise_geodatabase(configuration)
+        generate_national_enterprise_geodatabase(configuration, journal)
 
     NationalMapLogger.info('---------- Completed ----------')
 
@@ -1,31 +1,59 @@
+import functools
+import json
 import os
 import sys
+import threading
 import time
+from contextlib import contextmanager
 import psutil
 
 import logging
 from logging.handlers import RotatingFileHandler
-import arcpy
 
+from data_access import import_arcpy
 from national_map_utility import NationalMapUtility
 
+TRACE_FILE_MAX_BYTES = 100_000_000
+
 
 def get_memory_usage():
-    memory = psutil.virtual_memory()
-    return memory.used
+    """
+    :return: resident set size of this process in bytes
+    """
+    return psutil.Process().memory_info().rss
+
+
+def get_peak_memory_usage():
+    """
+    :return: peak resident set size of this process in bytes, since the process started
+    """
+    memory_info = psutil.Process().memory_info()
+    if hasattr(memory_info, 'peak_wset'):
+        return memory_info.peak_wset
+
+    import resource
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
 
 
 class NationalMapLogger:
     logger = None
+    metrics_file = None
+    trace_file = None
+    trace_lock = threading.Lock()
+    span_stacks = threading.local()
 
     @staticmethod
-    def init(configuration):
+    def init(configuration, log_suffix=None):
         out_log_folder = configuration.data['Outputs']['log_folder']
         NationalMapUtility.ensure_path_exists(out_log_folder)
 
         NationalMapLogger.logger = logging.getLogger(__name__)
 
         log_file = configuration.data['Outputs']['log']
+        if log_suffix:
+            # worker processes must not share (and rotate) the same log file
+            log_file = f'{log_file}_{log_suffix}'
         file_handler = RotatingFileHandler(log_file, mode='a', maxBytes=10_100_000, encoding='utf-8')
         formatter = logging.Formatter(
             '{asctime}\t{levelname}:\t\t{message}',
@@ -41,6 +69,105 @@ class NationalMapLogger:
         log_level = configuration.data['Logging']['log_level']
         NationalMapLogger.logger.setLevel(log_level)
 
+        NationalMapLogger.metrics_file, NationalMapLogger.trace_file = None, None
+        if configuration.data['Logging']['tracing']:
+            NationalMapLogger._init_tracing(log_file)
+
+    @staticmethod
+    def _init_tracing(log_file):
+        """
+        Spans are written to a JSON lines metrics file and to a Chrome trace file (chrome://tracing, Perfetto).
+        The trace uses the JSON array format without the closing bracket, so it stays readable after a crash.
+        """
+        NationalMapLogger.metrics_file = f'{log_file}_metrics.jsonl'
+        NationalMapLogger.trace_file = f'{log_file}_trace.json'
+        for file_name in [NationalMapLogger.metrics_file, NationalMapLogger.trace_file]:
+            # every run appends to the files, they are rotated when a run starts so they stay bounded
+            if os.path.exists(file_name) and os.path.getsize(file_name) > TRACE_FILE_MAX_BYTES:
+                os.replace(file_name, f'{file_name}.1')
+        if not os.path.exists(NationalMapLogger.trace_file) or os.path.getsize(NationalMapLogger.trace_file) == 0:
+            with open(NationalMapLogger.trace_file, mode='w', encoding='utf-8') as file:
+                file.write('[\n')
+
+    @staticmethod
+    def _get_span_stack():
+        if not hasattr(NationalMapLogger.span_stacks, 'stack'):
+            NationalMapLogger.span_stacks.stack = []
+        return NationalMapLogger.span_stacks.stack
+
+    @staticmethod
+    def _write_span(span):
+        metrics = {key: value for key, value in span.items() if not key.startswith('_')}
+        trace_event = {
+            'name': span['name'],
+            'cat': 'pipeline',
+            'ph': 'X',
+            'ts': int(span['start_time'] * 1_000_000),
+            'dur': int(span['wall_time'] * 1_000_000),
+            'pid': span['pid'],
+            'tid': span['tid'],
+            'args': {key: value for key, value in metrics.items()
+                     if key not in ['name', 'start_time', 'pid', 'tid']}
+        }
+        with NationalMapLogger.trace_lock:
+            with open(NationalMapLogger.metrics_file, mode='a', encoding='utf-8') as file:
+                file.write(json.dumps(metrics) + '\n')
+            with open(NationalMapLogger.trace_file, mode='a', encoding='utf-8') as file:
+                file.write(json.dumps(trace_event) + ',\n')
+
+    @staticmethod
+    @contextmanager
+    def span(name, **attributes):
+        """
+        Measure a nested stage: wall time, CPU time, process RSS and peak RSS, rows read and written.
+        The rows of a span are added to its parent span when it ends.
+        """
+        if NationalMapLogger.metrics_file is None:
+            yield None
+            return
+
+        stack = NationalMapLogger._get_span_stack()
+        span = {
+            'name': name,
+            'parent': stack[-1]['name'] if stack else None,
+            'depth': len(stack),
+            'attributes': attributes,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'start_time': time.time(),
+            'rows_read': 0,
+            'rows_written': 0,
+            'start_rss': get_memory_usage(),
+            '_start_counter': time.perf_counter(),
+            '_start_cpu_time': time.process_time()
+        }
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            stack.pop()
+            span['wall_time'] = time.perf_counter() - span['_start_counter']
+            span['cpu_time'] = time.process_time() - span['_start_cpu_time']
+            span['end_rss'] = get_memory_usage()
+            span['peak_rss'] = max(get_peak_memory_usage(), span['end_rss'])
+            if stack:
+                stack[-1]['rows_read'] += span['rows_read']
+                stack[-1]['rows_written'] += span['rows_written']
+            NationalMapLogger._write_span(span)
+
+    @staticmethod
+    def add_rows(read=0, written=0):
+        """
+        Count rows read and written in the current span.
+        """
+        if NationalMapLogger.metrics_file is None:
+            return
+
+        stack = NationalMapLogger._get_span_stack()
+        if stack:
+            stack[-1]['rows_read'] += read
+            stack[-1]['rows_written'] += written
+
     @staticmethod
     def start_log_process(process_name):
         NationalMapLogger.logger.info(f'START {process_name}')
@@ -51,12 +178,12 @@ class NationalMapLogger:
 
     @staticmethod
     def show_message(message):
-        arcpy.AddMessage(message)
+        import_arcpy().AddMessage(message)
         NationalMapLogger.logger.info(message)
 
     @staticmethod
     def set_arcpy_progressor_label(label):
-        arcpy.SetProgressorLabel(label)
+        import_arcpy().SetProgressorLabel(label)
         NationalMapLogger.logger.debug(label)
 
     @staticmethod
@@ -87,36 +214,43 @@ class NationalMapLogger:
 
     @staticmethod
     def debug_decorator(func):
+        @functools.wraps(func)
         def wrap(*args, **kwargs):
             message = f'{func.__name__}'
             NationalMapLogger.debug(message)
-            result = func(*args, **kwargs)
+            with NationalMapLogger.span(func.__qualname__):
+                result = func(*args, **kwargs)
             return result
         return wrap
 
     @staticmethod
     def info_decorator(func):
+        @functools.wraps(func)
         def wrap(*args, **kwargs):
             message = f'{func.__name__}'
             NationalMapLogger.info(message)
-            result = func(*args, **kwargs)
+            with NationalMapLogger.span(func.__qualname__):
+                result = func(*args, **kwargs)
             return result
         return wrap
 
     @staticmethod
     def performance_decorator(func):
+        @functools.wraps(func)
         def wrap(*args, **kwargs):
-            start_memory, start_time = get_memory_usage(), time.time()
+            start_memory, start_time, start_cpu_time = get_memory_usage(), time.perf_counter(), time.process_time()
 
-            result = func(*args, **kwargs)
+            with NationalMapLogger.span(func.__qualname__):
+                result = func(*args, **kwargs)
 
-            end_memory, end_time = get_memory_usage(), time.time()
+            end_memory, end_time, end_cpu_time = get_memory_usage(), time.perf_counter(), time.process_time()
             result_memory = sys.getsizeof(result) / 1024.0 ** 2
             cost_memory = (end_memory - start_memory) / 1024.0 ** 2
-            cost_time = end_time - start_time
+            peak_memory = get_peak_memory_usage() / 1024.0 ** 2
 
-            message = f'{func.__name__}, cost time: {cost_time} sec., cost_memory: {cost_memory} MiB, result: {result_memory} MiB'
+            message = (f'{func.__name__}, cost time: {end_time - start_time:.3f} sec., '
+                       f'cpu time: {end_cpu_time - start_cpu_time:.3f} sec., cost_memory: {cost_memory:.1f} MiB, '
+                       f'peak memory: {peak_memory:.1f} MiB, result: {result_memory:.3f} MiB')
             print(message)
             return result
         return wrap
-
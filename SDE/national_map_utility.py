@@ -1,27 +1,63 @@
 import os
-import arcpy
+import numpy as np
 from typing import Literal
 
+from data_access import import_arcpy
+
 
 class NationalMapUtility:
 
     @staticmethod
     def ensure_path_exists(path) -> None:
         if not os.path.exists(path):
-            os.mkdir(path)
+            try:
+                os.mkdir(path)
+            except FileExistsError:
+                # created by another worker process in the meantime
+                pass
 
     @staticmethod
     def set_arcpy_workspace(workspace) -> None:
-        arcpy.env.workspace = workspace
+        import_arcpy().env.workspace = workspace
 
     @staticmethod
     def get_count(feature_class_or_table):
-        return arcpy.management.GetCount(feature_class_or_table)
+        return import_arcpy().management.GetCount(feature_class_or_table)
+
+    @staticmethod
+    def get_object_id_where_clauses(feature_class_or_table, chunk_size) -> list:
+        """
+        :return: where clauses which split the table into OBJECTID ranges of at most chunk_size rows
+        """
+        oid_field_name = import_arcpy().Describe(feature_class_or_table).OIDFieldName
+        object_ids = import_arcpy().da.TableToNumPyArray(feature_class_or_table, ['OID@'])['OID@']
+        object_ids.sort()
+
+        where_clauses = []
+        for start in range(0, len(object_ids), chunk_size):
+            first_oid = object_ids[start]
+            last_oid = object_ids[min(start + chunk_size, len(object_ids)) - 1]
+            where_clauses.append(f'{oid_field_name} >= {first_oid} AND {oid_field_name} <= {last_oid}')
+        return where_clauses
+
+    @staticmethod
+    def update_rows_by_object_id(feature_class_or_table, field_names, object_ids, rows, where_clause=None) -> None:
+        """
+        :param object_ids: numpy array of OBJECTID
+        :param rows: Sequence[tuple] of the field values, in the order of object_ids
+        """
+        order = np.argsort(object_ids)
+        sorted_object_ids = object_ids[order]
+        with import_arcpy().da.UpdateCursor(feature_class_or_table, ['OID@'] + field_names, where_clause) as cursor:
+            for row in cursor:
+                position = np.searchsorted(sorted_object_ids, row[0])
+                if position < len(sorted_object_ids) and sorted_object_ids[position] == row[0]:
+                    cursor.updateRow((row[0],) + tuple(rows[order[position]]))
 
     @staticmethod
     def is_field_exists(table_or_feature_class, field_name) -> bool:
         result = False
-        fields = arcpy.ListFields(table_or_feature_class)
+        fields = import_arcpy().ListFields(table_or_feature_class)
         for field in fields:
             if field.name == field_name:
                 result = True
@@ -32,16 +68,33 @@ class NationalMapUtility:
     def add_field(in_table, field_name, field_type, field_length=None, field_is_nullable='NULLABLE') -> bool:
         result = False
         if not NationalMapUtility.is_field_exists(in_table, field_name):
-            arcpy.management.AddField(in_table, field_name, field_type,
+            import_arcpy().management.AddField(in_table, field_name, field_type,
                                       field_length=field_length, field_is_nullable=field_is_nullable)
             result = True
 
         return result
 
+    @staticmethod
+    def is_index_exists(table_or_feature_class, index_name) -> bool:
+        indexes = import_arcpy().ListIndexes(table_or_feature_class)
+        return any(index.name.lower() == index_name.lower() for index in indexes)
+
+    @staticmethod
+    def add_index(in_table, fields, index_name) -> bool:
+        """
+        AddIndex unless the index exists, a resumed stage creates its indexes again.
+        """
+        result = False
+        if not NationalMapUtility.is_index_exists(in_table, index_name):
+            import_arcpy().management.AddIndex(in_table, fields, index_name)
+            result = True
+
+        return result
+
     @staticmethod
     def is_feature_dataset_exists(feature_dataset_name) -> bool:
         result = False
-        feature_datasets = arcpy.ListDatasets('*', 'Feature')
+        feature_datasets = import_arcpy().ListDatasets('*', 'Feature')
         if feature_datasets is None:
             return result
 
@@ -70,5 +123,5 @@ class NationalMapUtility:
 
     @staticmethod
     def is_feature_class(feature_class_or_table) -> bool:
-        desc = arcpy.Describe(feature_class_or_table)
+        desc = import_arcpy().Describe(feature_class_or_table)
         return hasattr(desc, 'featureType')
@@ -2,7 +2,11 @@ import os.path
 
 import arcpy
 
+from attribute_join import join_fields
+from data_access import DataAccess
+from local_id_lookup import MISSING_VALUE
 from national_gdb_data_factory import NationalGDBDataFactory
+from national_map_logger import NationalMapLogger
 from national_map_utility import NationalMapUtility
 import constants
 
@@ -12,6 +16,9 @@ EDGE_POSITION = 0.5
 PROHIBITED_TURN_FLAG = 1
 RESTRICTED_TURN_FLAG = 0
 
+# restriction groups resolved and inserted together, bounds the memory of the turn pipeline
+TURN_BATCH_SIZE = 10_000
+
 
 def get_turn_feature_template(restriction_id):
     union_geometry, edge_end = None, None
@@ -24,6 +31,39 @@ def get_turn_feature_template(restriction_id):
     return feature
 
 
+def iterate_restriction_groups(rows):
+    """
+    :param rows: (RESTRICTION_ID, SEQUENCE_NUM, FEATURE_ID, SHAPE), sorted by RESTRICTION_ID, SEQUENCE_NUM
+    :return: Iterator[(RESTRICTION_ID, [(SEQUENCE_NUM, FEATURE_ID, SHAPE)])], the final group included
+    """
+    key, group = None, []
+    for row in rows:
+        restriction_id, sequence_num, feature_id, geometry = row[0], row[1], row[2], row[3]
+        item = (sequence_num, feature_id, geometry)
+
+        if group and key != restriction_id:
+            yield key, group
+            group = []
+
+        key = restriction_id
+        group.append(item)
+
+    if group:
+        yield key, group
+
+
+def iterate_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
 def add_turn_fields(turn_feature_class):
     NationalMapUtility.add_field(turn_feature_class, 'RestrictionID', 'TEXT', 36)
     NationalMapUtility.add_field(turn_feature_class, 'ProhibitedTurnFlag', 'SHORT', field_is_nullable='NON_NULLABLE')
@@ -63,60 +103,50 @@ class NationalRestrictionTurnFactory(NationalGDBDataFactory):
         add_turn_fields(self.turn_feature_class)
 
     def _create_turn_features(self):
-        turn_features = self._generate_turn_features()
-        print(f'_create_turn_features: count - {len(turn_features)}')
-
         fields = ['SHAPE@', 'Edge1End']
         for i in range(MAX_TURN_EDGES):
             fields.extend([f'Edge{i + 1}FCID', f'Edge{i + 1}FID', f'Edge{i + 1}Pos'])
         fields.extend(['RestrictionID', 'ProhibitedTurnFlag', 'RestrictedTurnFlag'])
 
-        with arcpy.da.InsertCursor(self.turn_feature_class, fields) as cursor:
-            for feature in turn_features:
-                cursor.insertRow(feature)
+        count = DataAccess.insert_rows(self.turn_feature_class, fields,
+                                       (feature for turn_features in self._iterate_turn_feature_batches()
+                                        for feature in turn_features))
 
-    def _generate_turn_features(self):
-        turn_features = []
-        restriction_groups = self._generate_restriction_groups()
-        print(f'_generate_turn_features, restriction_groups count: {len(restriction_groups)}')
+        print(f'_create_turn_features: count - {count}')
+        NationalMapLogger.add_rows(written=count)
 
+    def _iterate_turn_feature_batches(self):
         feature_class_id = self.get_street_feature_class_id()
-        for group in restriction_groups:
-            restriction_id = list(group.keys())[0]
-            restriction_items = group[restriction_id]
-            feature = self._generate_prohibited_turn(feature_class_id, restriction_id, restriction_items)
-            if feature is not None:
-                turn_features.append(feature)
-
-        return turn_features
-
-    def _generate_restriction_groups(self):
-        print(f'_generate_restriction_groups')
+        restriction_groups = self._iterate_restriction_groups()
+
+        for groups in iterate_batches(restriction_groups, TURN_BATCH_SIZE):
+            # resolve the FEATURE_IDs of the whole batch at once
+            feature_ids = [item[1] for _, restriction_items in groups for item in restriction_items]
+            street_object_ids = self._get_street_object_ids(feature_ids)
+
+            turn_features = []
+            offset = 0
+            for restriction_id, restriction_items in groups:
+                edge_object_ids = street_object_ids[offset:offset + len(restriction_items)]
+                offset += len(restriction_items)
+                feature = self._generate_prohibited_turn(feature_class_id, restriction_id, restriction_items,
+                                                         edge_object_ids)
+                if feature is not None:
+                    turn_features.append(feature)
+
+            yield turn_features
+
+    def _iterate_restriction_groups(self):
+        print(f'_iterate_restriction_groups')
         restriction_feature_class = self._get_restriction_feature_class()
         fields = ['RESTRICTION_ID', 'SEQUENCE_NUM', 'FEATURE_ID', 'SHAPE@']
-        sql_clause = (None, 'ORDER BY RESTRICTION_ID, SEQUENCE_NUM')
-        groups = []
+        rows = DataAccess.search_rows(restriction_feature_class, fields, order_by=['RESTRICTION_ID', 'SEQUENCE_NUM'])
 
-        with arcpy.da.SearchCursor(restriction_feature_class, fields, sql_clause=sql_clause) as cursor:
-            key, group = None, []
+        for restriction_id, group in iterate_restriction_groups(rows):
+            if len(group) <= MAX_TURN_EDGES:
+                yield restriction_id, group
 
-            for row in cursor:
-                restriction_id, sequence_num, feature_id, geometry = row[0], row[1], row[2], row[3]
-                item = (sequence_num, feature_id, geometry)
-
-                if key is None or key == restriction_id:
-                    key = restriction_id
-                    group.append(item)
-                else:
-                    if len(group) <= MAX_TURN_EDGES:
-                        groups.append({
-                            key: group
-                        })
-                    key, group = restriction_id, [item]
-
-        return groups
-
-    def _generate_prohibited_turn(self, feature_class_id, restriction_id, restriction_items):
+    def _generate_prohibited_turn(self, feature_class_id, restriction_id, restriction_items, edge_object_ids):
         feature = get_turn_feature_template(restriction_id)
 
         union_geometry, edge_end = None, None
@@ -127,7 +157,8 @@ class NationalRestrictionTurnFactory(NationalGDBDataFactory):
 
             start_index = 2 + (sequence_num - 1) * 3
             feature[start_index] = feature_class_id
-            feature[start_index + 1] = self._get_street_object_id(feature_id)
+            edge_object_id = edge_object_ids[index]
+            feature[start_index + 1] = None if edge_object_id == MISSING_VALUE else int(edge_object_id)
             feature[start_index + 2] = EDGE_POSITION
 
             if union_geometry is None:
@@ -153,17 +184,16 @@ class NationalRestrictionTurnFactory(NationalGDBDataFactory):
     def _add_state_and_city(self):
         in_data = self._get_turn_feature_class()
         restriction_feature_class = self._get_restriction_feature_class()
-        arcpy.management.JoinField(
-            in_data=in_data,
-            in_field='RestrictionID',
-            join_table=restriction_feature_class,
-            join_field='RESTRICTION_ID',
-            fields='State;City'
-        )
-
-    def _drop_restriction_feature_class(self):
+        join_fields(in_data, 'RestrictionID', restriction_feature_class, 'RESTRICTION_ID', ['State', 'City'],
+                    self.configuration.is_join_engine_hash())
+
+    def drop_restriction_feature_class(self):
+        """
+        The restrictions are the input of run, they are dropped once the turns are complete.
+        """
         restriction_feature_class = self._get_restriction_feature_class()
-        arcpy.management.Delete(restriction_feature_class)
+        if arcpy.Exists(restriction_feature_class):
+            arcpy.management.Delete(restriction_feature_class)
 
     def _match_up_to_plus(self):
         turn_feature_class = self._get_turn_feature_class()
@@ -174,5 +204,4 @@ class NationalRestrictionTurnFactory(NationalGDBDataFactory):
         self._create_turn_feature_class()
         self._create_turn_features()
         self._add_state_and_city()
-        self._drop_restriction_feature_class()
         self._match_up_to_plus()
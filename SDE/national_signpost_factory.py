@@ -1,10 +1,16 @@
 import os
 import arcpy
 
+from attribute_join import join_fields
+from data_access import DataAccess
+from local_id_lookup import MISSING_VALUE
 from national_gdb_data_factory import NationalGDBDataFactory
 from national_map_logger import NationalMapLogger
+from national_map_utility import NationalMapUtility
 import constants
 
+EDGE_FEATURE_ID_CHUNK_SIZE = 500_000
+
 
 @NationalMapLogger.debug_decorator
 def _update_signpost_feature_class_id_in_file_gdb(national_signposts_table, feature_class_id):
@@ -43,12 +49,22 @@ class NationalSignpostFactory(NationalGDBDataFactory):
 
     @NationalMapLogger.debug_decorator
     def _update_signpost_edge_feature_id_in_file_gdb(self, national_signposts_table):
-        signposts_field_names = ['SegmentID', 'EdgeFID']
-        with arcpy.da.UpdateCursor(national_signposts_table, signposts_field_names) as cursor:
-            for row in cursor:
-                segment_id = row[0]
-                row[1] = self._get_street_object_id(segment_id)
-                cursor.updateRow(row)
+        where_clauses = NationalMapUtility.get_object_id_where_clauses(national_signposts_table,
+                                                                        EDGE_FEATURE_ID_CHUNK_SIZE)
+        for where_clause in where_clauses:
+            # resolve the SegmentIDs of the whole chunk at once
+            rows = list(DataAccess.search_rows(national_signposts_table, ['OID@', 'SegmentID'], where_clause))
+            edge_feature_ids = self._get_street_object_ids([row[1] for row in rows])
+            edge_feature_id_lookup = {
+                row[0]: None if edge_feature_id == MISSING_VALUE else int(edge_feature_id)
+                for row, edge_feature_id in zip(rows, edge_feature_ids)
+            }
+            del rows, edge_feature_ids
+
+            with arcpy.da.UpdateCursor(national_signposts_table, ['OID@', 'EdgeFID'], where_clause) as cursor:
+                for row in cursor:
+                    row[1] = edge_feature_id_lookup.get(row[0])
+                    cursor.updateRow(row)
 
     @NationalMapLogger.debug_decorator
     def _update_signpost_table_feature_class_id(self):
@@ -76,7 +92,7 @@ class NationalSignpostFactory(NationalGDBDataFactory):
 
         for index_filed in index_fields:
             field_name, index_name = index_filed
-            arcpy.management.AddIndex(national_signposts_table, [field_name], index_name)
+            NationalMapUtility.add_index(national_signposts_table, [field_name], index_name)
 
     @NationalMapLogger.debug_decorator
     def _add_state_and_city(self):
@@ -88,21 +104,11 @@ class NationalSignpostFactory(NationalGDBDataFactory):
         national_signposts_table = os.path.join(self.workspace, signposts_table_name)
 
         street_feature_class = self._get_street_feature_class()
-        arcpy.management.JoinField(
-            in_data=national_signposts_table,
-            in_field='SegmentID',
-            join_table=street_feature_class,
-            join_field='LocalId',
-            fields='State;City'
-        )
-
-        arcpy.management.JoinField(
-            in_data=self.signpost_feature_class,
-            in_field='SrcSignID',
-            join_table=national_signposts_table,
-            join_field='SrcSignID',
-            fields='State;City'
-        )
+        is_hash_join = self.configuration.is_join_engine_hash()
+        join_fields(national_signposts_table, 'SegmentID', street_feature_class, 'LocalId', ['State', 'City'],
+                    is_hash_join)
+        join_fields(self.signpost_feature_class, 'SrcSignID', national_signposts_table, 'SrcSignID',
+                    ['State', 'City'], is_hash_join)
 
     def run(self):
         self._update_signpost_table_edge_feature_id()
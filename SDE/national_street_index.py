@@ -0,0 +1,172 @@
+import json
+import os
+
+import arcpy
+import numpy as np
+
+from data_access import DataAccess
+from local_id_lookup import LocalIdLookup, LocalIdLookupBuilder, get_local_id_key
+from national_map_logger import NationalMapLogger
+from national_map_utility import NationalMapUtility
+
+OBJECT_ID_DTYPE = np.int64
+SIGNATURE_SAMPLE_SIZE = 64
+
+LOOKUP_ARRAY_NAMES = ['uuid_keys', 'uuid_values', 'other_keys', 'other_values']
+SIGNATURE_FILE_NAME = 'signature.json'
+
+
+def get_street_index_folder(configuration, workspace):
+    workspace_name = os.path.splitext(os.path.basename(workspace))[0]
+    return os.path.join(configuration.get_scratch_folder(), f'{workspace_name}_street_index')
+
+
+def create_street_local_id_and_oid_lookup(street_feature_class):
+    """
+    :return: LocalIdLookup[LocalId] = OBJECTID
+    """
+    builder = LocalIdLookupBuilder(OBJECT_ID_DTYPE)
+    for row in DataAccess.search_rows(street_feature_class, ['LocalId', 'OID@']):
+        builder.add(row[0], row[1])
+    return builder.build()
+
+
+def _get_lookup_sample(lookup, sample_size):
+    """
+    :return: [[OBJECTID, hex of the LocalId key]] spread over the lookup
+    """
+    sample = []
+    for keys, values in [(lookup.uuid_keys, lookup.uuid_values), (lookup.other_keys, lookup.other_values)]:
+        count = len(keys)
+        positions = np.unique(np.linspace(0, count - 1, num=min(count, sample_size), dtype=np.int64))
+        for position in positions:
+            # numpy drops the trailing zero bytes of a fixed width key
+            key = bytes(keys[position]).ljust(keys.dtype.itemsize, b'\0') if keys is lookup.uuid_keys \
+                else bytes(keys[position])
+            sample.append([int(values[position]), key.hex()])
+    return sample
+
+
+def _read_sample_local_id_keys(street_feature_class, sample_object_ids):
+    if len(sample_object_ids) == 0:
+        return {}
+
+    results = {}
+    for row in DataAccess.search_rows_by_object_ids(street_feature_class, ['OID@', 'LocalId'], sample_object_ids):
+        key = get_local_id_key(row[1])
+        results[row[0]] = None if key is None else key.hex()
+    return results
+
+
+class NationalStreetIndex:
+    """
+    LocalId -> OBJECTID index of the national streets, built once per workspace and shared by the factories.
+    The LocalIdLookup arrays are saved as .npy files and memory-mapped on reuse.
+    """
+    _instances = {}
+
+    def __init__(self, street_feature_class, index_folder):
+        self.street_feature_class = street_feature_class
+        self.index_folder = index_folder
+        self.lookup = None
+        self.signature = None
+
+    def __del__(self):
+        del self.street_feature_class
+        del self.index_folder
+        del self.lookup
+        del self.signature
+
+    @staticmethod
+    def get_index(street_feature_class, index_folder):
+        key = os.path.normcase(os.path.abspath(street_feature_class))
+        street_index = NationalStreetIndex._instances.get(key)
+        if street_index is None:
+            street_index = NationalStreetIndex(street_feature_class, index_folder)
+            NationalStreetIndex._instances[key] = street_index
+
+        street_index.ensure_current()
+        return street_index
+
+    def _get_file(self, file_name):
+        return os.path.join(self.index_folder, file_name)
+
+    def _describe_street_feature_class(self):
+        describe = arcpy.Describe(self.street_feature_class)
+        extent = describe.extent
+        return {
+            'dsid': describe.DSID,
+            'count': int(arcpy.management.GetCount(self.street_feature_class)[0]),
+            'extent': [extent.XMin, extent.YMin, extent.XMax, extent.YMax]
+        }
+
+    def _create_signature(self):
+        signature = self._describe_street_feature_class()
+        # a few (OBJECTID, LocalId) pairs detect a reload of the same data in a different order
+        signature['sample'] = _get_lookup_sample(self.lookup, SIGNATURE_SAMPLE_SIZE)
+        return signature
+
+    def _is_signature_current(self, signature):
+        if signature is None:
+            return False
+
+        if self._describe_street_feature_class() != {key: signature[key] for key in ['dsid', 'count', 'extent']}:
+            return False
+
+        sample = {item[0]: item[1] for item in signature['sample']}
+        return _read_sample_local_id_keys(self.street_feature_class, list(sample.keys())) == sample
+
+    def _load_signature(self):
+        signature_file = self._get_file(SIGNATURE_FILE_NAME)
+        if not os.path.exists(signature_file):
+            return None
+
+        try:
+            with open(signature_file, mode='r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            NationalMapLogger.warning(f'NationalStreetIndex, invalid signature {signature_file}: {e}')
+            return None
+
+    def _load(self):
+        arrays = [np.load(self._get_file(f'{name}.npy'), mmap_mode='r') for name in LOOKUP_ARRAY_NAMES]
+        self.lookup = LocalIdLookup(*arrays)
+
+    def _save(self):
+        NationalMapUtility.ensure_path_exists(self.index_folder)
+        for name in LOOKUP_ARRAY_NAMES:
+            temp_file = self._get_file(f'{name}.npy.tmp')
+            with open(temp_file, mode='wb') as file:
+                np.save(file, getattr(self.lookup, name))
+            os.replace(temp_file, self._get_file(f'{name}.npy'))
+
+        # written last, so an interrupted save is never reused
+        temp_file = self._get_file(f'{SIGNATURE_FILE_NAME}.tmp')
+        with open(temp_file, mode='w', encoding='utf-8') as file:
+            json.dump(self.signature, file)
+        os.replace(temp_file, self._get_file(SIGNATURE_FILE_NAME))
+
+    def _build(self):
+        NationalMapLogger.info(f'NationalStreetIndex, build {self.street_feature_class}')
+        self.lookup = create_street_local_id_and_oid_lookup(self.street_feature_class)
+        self.signature = self._create_signature()
+        self._save()
+        self._load()
+
+    def ensure_current(self):
+        if self.signature is not None and self._is_signature_current(self.signature):
+            return
+
+        signature = self._load_signature()
+        if self._is_signature_current(signature):
+            NationalMapLogger.debug(f'NationalStreetIndex, reuse {self.index_folder}')
+            self.signature = signature
+            self._load()
+        else:
+            self._build()
+
+    def get(self, local_id):
+        return self.lookup.get(local_id)
+
+    def get_many(self, local_ids):
+        return self.lookup.get_many(local_ids)
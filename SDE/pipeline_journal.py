@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+import arcpy
+
+from national_map_logger import NationalMapLogger
+from national_map_utility import NationalMapUtility
+
+
+def get_journal_file(configuration):
+    scratch_folder = os.path.normpath(configuration.get_scratch_folder())
+    return os.path.join(os.path.dirname(scratch_folder), f'{os.path.basename(scratch_folder)}_pipeline_journal.json')
+
+
+def get_state_stage(state):
+    return f'state:{state.upper()}'
+
+
+def _is_output_valid(output):
+    return os.path.exists(output) or arcpy.Exists(output)
+
+
+class PipelineJournal:
+    """
+    Completed stages of the national pipeline with their outputs, saved as JSON after every stage.
+    On resume, a completed stage is skipped while its outputs exist. The states are independent of each other,
+    but once any stage runs again, every national stage after it runs again too.
+    """
+
+    def __init__(self, journal_file, resume=False):
+        self.journal_file = journal_file
+        self.resume = resume
+        self.stages = self._load() if resume else {}
+        self.is_rerunning = False
+        self.save()
+
+    def __del__(self):
+        del self.journal_file
+        del self.resume
+        del self.stages
+        del self.is_rerunning
+
+    def _load(self):
+        if not os.path.exists(self.journal_file):
+            return {}
+
+        try:
+            with open(self.journal_file, mode='r', encoding='utf-8') as file:
+                return json.load(file)['stages']
+        except (OSError, ValueError, KeyError) as e:
+            NationalMapLogger.warning(f'PipelineJournal, invalid journal {self.journal_file}: {e}')
+            return {}
+
+    def save(self):
+        NationalMapUtility.ensure_path_exists(os.path.dirname(self.journal_file))
+        temp_file = f'{self.journal_file}.tmp'
+        with open(temp_file, mode='w', encoding='utf-8') as file:
+            json.dump({'stages': self.stages}, file, indent=2)
+        os.replace(temp_file, self.journal_file)
+
+    def is_completed(self, stage, is_state_stage=False):
+        if not self.resume or (self.is_rerunning and not is_state_stage):
+            return False
+
+        record = self.stages.get(stage)
+        if record is None:
+            return False
+
+        missing_outputs = [output for output in record['outputs'] if not _is_output_valid(output)]
+        if missing_outputs:
+            NationalMapLogger.warning(f'PipelineJournal, {stage} outputs missing: {";".join(missing_outputs)}')
+            return False
+        return True
+
+    def start(self, stage):
+        self.is_rerunning = True
+        self.stages.pop(stage, None)
+        self.save()
+
+    def complete(self, stage, outputs=None):
+        self.stages[stage] = {
+            'outputs': list(outputs or []),
+            'completed': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self.save()
+
+    def run_stage(self, stage, func, outputs=None):
+        """
+        Run func unless stage is completed already.
+        :param outputs: paths which must exist for the stage to be skipped on resume
+        :return: True when func ran
+        """
+        if self.is_completed(stage):
+            NationalMapLogger.info(f'PipelineJournal, skip completed {stage}')
+            return False
+
+        NationalMapLogger.info(f'PipelineJournal, run {stage}')
+        self.start(stage)
+        func()
+        self.complete(stage, outputs)
+        return True
@@ -1,10 +1,100 @@
 import os
+import posixpath
 import shutil
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import arcpy
 from zipfile import ZipFile
 
+from file_geodatabase_catalog import CATALOG_TABLE_NAME, read_catalog, select_table_prefixes
+from national_map_logger import NationalMapLogger
 from national_map_utility import NationalMapUtility
 
+# the source tables read by the state converters
+PRECISELY_TABLE_NAMES = [
+    'usa_{state}_streets', 'usa_{state}_nodes', 'usa_{state}_restrictions',
+    '{state}towns', '{state}counties', '{state}landmarks', '{state}landuse', '{state}airports',
+    '{state}postcodes', '{state}railroads', '{state}rivers', '{state}waterbodies',
+    '{state}signposts', '{state}signpostdestinations'
+]
+EXTRACT_BUFFER_SIZE = 1024 * 1024
+# how often a state waiting for an extraction slot checks whether the prefetcher shuts down
+EXTRACT_SLOT_WAIT_SECONDS = 1.0
+
+
+def get_precisely_table_names(state):
+    return [table_name.format(state=state.lower()) for table_name in PRECISELY_TABLE_NAMES]
+
+
+def get_precisely_zip_file(state, configuration):
+    settings = configuration.data['Precisely']
+    file_name = f'USA_{state.upper()}_NAVPREM_{settings["version"]}_FGDB.zip'
+    return os.path.join(settings['zip_location'], file_name)
+
+
+def get_zip_file_gdb(zip_file, gdb_name):
+    """
+    Find the File Geodatabase gdb_name inside the archive, at any folder depth.
+    :return: /vsizip/ path of the File Geodatabase, which GDAL reads without extracting it
+    """
+    with ZipFile(zip_file, mode='r') as archive:
+        for member_name in archive.namelist():
+            folders = member_name.split('/')[:-1]
+            for index, folder in enumerate(folders):
+                if folder.lower() == gdb_name.lower():
+                    gdb_folder = '/'.join(folders[:index + 1])
+                    return f'/vsizip/{zip_file.replace(os.sep, "/")}/{gdb_folder}'
+
+    raise ValueError(f'get_zip_file_gdb, no {gdb_name} in {zip_file}')
+
+
+def select_archive_members(archive, table_names):
+    """
+    Read the catalog of every File Geodatabase in the archive.
+    :return: the members of table_names and of the system tables, with every file which is not a table file
+    """
+    catalog_file_name = f'{CATALOG_TABLE_NAME}.gdbtable'
+    gdb_table_prefixes = {}
+    for member in archive.infolist():
+        if posixpath.basename(member.filename).lower() == catalog_file_name:
+            gdb_folder = posixpath.dirname(member.filename)
+            gdbtablx = archive.read(posixpath.join(gdb_folder, f'{CATALOG_TABLE_NAME}.gdbtablx'))
+            catalog = read_catalog(archive.read(member), gdbtablx)
+            gdb_table_prefixes[gdb_folder] = select_table_prefixes(catalog, table_names)
+
+    if not gdb_table_prefixes:
+        raise ValueError('no File Geodatabase catalog in the archive')
+
+    members = []
+    for member in archive.infolist():
+        file_name = posixpath.basename(member.filename).lower()
+        table_prefixes = gdb_table_prefixes.get(posixpath.dirname(member.filename))
+        is_table_file = file_name.startswith('a') and '.' in file_name
+        if table_prefixes is None or not is_table_file or file_name.split('.')[0] in table_prefixes:
+            members.append(member)
+    return members
+
+
+def extract_members(archive, members, target_folder):
+    """
+    Extract the members below target_folder, a member whose path leads outside of it, e.g. ../x or C:/x, is skipped.
+    """
+    target_folder = os.path.normcase(os.path.abspath(target_folder))
+    for member in members:
+        target_file = os.path.normcase(os.path.abspath(os.path.join(target_folder, *member.filename.split('/'))))
+        if not target_file.startswith(os.path.join(target_folder, '')):
+            NationalMapLogger.warning(f'extract_members, {member.filename} is outside of {target_folder}, skipped')
+            continue
+
+        if member.is_dir():
+            os.makedirs(target_file, exist_ok=True)
+            continue
+
+        os.makedirs(os.path.dirname(target_file), exist_ok=True)
+        with archive.open(member) as source, open(target_file, mode='wb') as target:
+            shutil.copyfileobj(source, target, EXTRACT_BUFFER_SIZE)
+
 
 def get_file_gdb(root_path: str) -> list:
     file_gdb_list = []
@@ -22,12 +112,18 @@ def get_file_gdb(root_path: str) -> list:
     return file_gdb_list
 
 
-def extract_file_gdb(root_folder, target_folder):
+def extract_file_gdb(root_folder, target_folder, in_background=False):
+    """
+    :param in_background: True in the prefetch thread, which must not call arcpy, the GDB is removed as a folder
+    """
     file_gdb_list = get_file_gdb(root_folder)
     for gdb in file_gdb_list:
         gdb_file_name = os.path.basename(gdb)
         target_gdb = os.path.join(target_folder, gdb_file_name)
-        if arcpy.Exists(target_gdb):
+        if in_background:
+            if os.path.exists(target_gdb):
+                shutil.rmtree(target_gdb)
+        elif arcpy.Exists(target_gdb):
             arcpy.management.Delete(target_gdb)
 
         shutil.move(gdb, target_folder)
@@ -35,44 +131,174 @@ def extract_file_gdb(root_folder, target_folder):
 
 
 class PreciselyDataExtract:
-    def __init__(self, state: str, configuration):
+    def __init__(self, state: str, configuration, in_background=False):
         self.state = state
         self.settings = configuration.data['Precisely']
         self.zip_location = self.settings['zip_location']
         self.fgdb_location = self.settings['fgdb_location']
+        self.selective_extraction = configuration.is_selective_extraction()
+        self.read_from_zip = configuration.is_read_from_zip()
+        self.configuration = configuration
+        self.in_background = in_background
 
     def __del__(self):
         del self.state
         del self.settings
         del self.zip_location
         del self.fgdb_location
+        del self.selective_extraction
+        del self.read_from_zip
+        del self.configuration
+        del self.in_background
 
     def _get_zip_file(self):
+        return get_precisely_zip_file(self.state, self.configuration)
+
+    def _get_temp_folder(self):
+        # one temp folder per state, so concurrent extractions never touch each other's files
+        return os.path.join(self.fgdb_location, f'temp_{self.state.lower()}')
+
+    def get_file_gdb(self):
         version = self.settings['version']
-        file_name = f'USA_{self.state.upper()}_NAVPREM_{version}_FGDB.zip'
-        return os.path.join(self.zip_location, file_name)
+        gdb_name = f'usa_{self.state.lower()}_navprem_{version}.gdb'
+        return os.path.join(self.fgdb_location, gdb_name)
 
     def _extract_zip(self, src_zip_file: str):
         # print(f'Extract {src_zip_file}')
         dist_gdb_folder = self.fgdb_location
         NationalMapUtility.ensure_path_exists(dist_gdb_folder)
 
-        tmp_folder = os.path.join(dist_gdb_folder, 'temp')
+        tmp_folder = self._get_temp_folder()
         NationalMapUtility.ensure_path_exists(tmp_folder)
 
         with ZipFile(src_zip_file, mode='r') as archive:
             file_name = os.path.splitext(os.path.basename(archive.filename))[0]
             dist_folder = os.path.join(tmp_folder, file_name)
             NationalMapUtility.ensure_path_exists(dist_folder)
-            archive.extractall(dist_folder)
+            if self.selective_extraction:
+                self._extract_selected_members(archive, dist_folder)
+            else:
+                archive.extractall(dist_folder)
         del archive
 
-        extract_file_gdb(tmp_folder, dist_gdb_folder)
+        extract_file_gdb(tmp_folder, dist_gdb_folder, self.in_background)
         shutil.rmtree(tmp_folder, ignore_errors=True)
 
+    def _extract_selected_members(self, archive, dist_folder):
+        try:
+            members = select_archive_members(archive, get_precisely_table_names(self.state))
+        except (ValueError, KeyError, IndexError, struct.error, UnicodeDecodeError) as e:
+            NationalMapLogger.warning(f'_extract_selected_members, {archive.filename} extract all files: {e}')
+            archive.extractall(dist_folder)
+            return
+
+        NationalMapLogger.debug(f'_extract_selected_members, {archive.filename}: '
+                                f'{len(members)} of {len(archive.infolist())} files')
+        extract_members(archive, members, dist_folder)
+
     def run(self):
         src_zip_file = self._get_zip_file()
+        if self.read_from_zip:
+            # the converters read the archive in place through /vsizip/
+            NationalMapLogger.debug(f'PreciselyDataExtract, {self.state} read from {src_zip_file}')
+            if not os.path.exists(src_zip_file):
+                raise FileNotFoundError(f'PreciselyDataExtract, no archive {src_zip_file}')
+            return
+
         self._extract_zip(src_zip_file)
 
     def dispose(self):
-        shutil.rmtree(self.fgdb_location, ignore_errors=True)
+        shutil.rmtree(self.get_file_gdb(), ignore_errors=True)
+        shutil.rmtree(self._get_temp_folder(), ignore_errors=True)
+
+
+class PreciselyDataPrefetcher:
+    """
+    Extract the archives of the next states in a background thread while the current state converts.
+    At most max_extracted_states GDBs exist at once, a state frees its slot when it is released.
+    """
+
+    def __init__(self, states, configuration):
+        self.states = list(states)
+        self.configuration = configuration
+        self.prefetch_states = configuration.get_prefetch_states()
+        self.extract_slots = threading.Semaphore(max(configuration.get_max_extracted_states(), 1))
+        # one extraction thread, so the states take the slots in order and never wait for a later state
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='precisely_prefetch')
+        self.futures = {}
+        self.extracts = {}
+        self.stop_event = threading.Event()
+
+    def __del__(self):
+        del self.states
+        del self.configuration
+        del self.prefetch_states
+        del self.extract_slots
+        del self.executor
+        del self.futures
+        del self.extracts
+        del self.stop_event
+
+    def _acquire_extract_slot(self, state):
+        """
+        Wait for a free extraction slot, or raise once the prefetcher shuts down, no slot is freed after that.
+        """
+        while not self.stop_event.is_set():
+            if self.extract_slots.acquire(timeout=EXTRACT_SLOT_WAIT_SECONDS):
+                return
+        raise RuntimeError(f'PreciselyDataPrefetcher, {state} not extracted, the prefetcher shuts down')
+
+    def _extract(self, precisely_data_extract):
+        self._acquire_extract_slot(precisely_data_extract.state)
+        try:
+            NationalMapLogger.debug(f'PreciselyDataPrefetcher, extract {precisely_data_extract.state}')
+            precisely_data_extract.run()
+        except Exception:
+            precisely_data_extract.dispose()
+            self.extract_slots.release()
+            raise
+        return precisely_data_extract
+
+    def _submit(self, state):
+        if state in self.futures:
+            return
+
+        precisely_data_extract = PreciselyDataExtract(state, self.configuration, in_background=True)
+        self.extracts[state] = precisely_data_extract
+        self.futures[state] = self.executor.submit(self._extract, precisely_data_extract)
+
+    def get(self, state):
+        """
+        Wait for the extraction of state and schedule the next prefetch_states states.
+        :return: PreciselyDataExtract of state, to be released by release(state)
+        """
+        index = self.states.index(state)
+        for next_state in self.states[index:index + self.prefetch_states + 1]:
+            self._submit(next_state)
+
+        return self.futures[state].result()
+
+    def release(self, state):
+        """
+        Remove the extracted GDB of state, its scratch output is done.
+        """
+        future = self.futures.pop(state, None)
+        precisely_data_extract = self.extracts.pop(state, None)
+        if future is None:
+            return
+
+        if future.done() and future.exception() is None:
+            precisely_data_extract.dispose()
+            self.extract_slots.release()
+
+    def shutdown(self):
+        # a state waiting for a slot stops, the slots of the states being converted are not released before this
+        self.stop_event.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for state in list(self.futures.keys()):
+            future = self.futures[state]
+            if future.cancelled():
+                self.futures.pop(state)
+                self.extracts.pop(state)
+            else:
+                self.release(state)
@@ -8,12 +8,14 @@ class StateConverter:
             data = {}
 
         self.state = data_settings.state
+        self.configuration = data_settings.configuration
         self.settings = data_settings.data
         self.exporter = state_exporter
         self.data = data
 
     def __del__(self):
         del self.state
+        del self.configuration
         del self.settings
         del self.exporter
         del self.data
@@ -1,6 +1,7 @@
 import os
 
 from national_map_utility import NationalMapUtility
+from precisely_data_extract import get_precisely_zip_file, get_zip_file_gdb
 
 
 class StateDataSettings:
@@ -31,7 +32,11 @@ class StateDataSettings:
         fgdb_location = self.configuration.data['Precisely']['fgdb_location']
         version = self.configuration.data['Precisely']['version']
         precisely_gdb_name = f'usa_{self.state}_navprem_{version}.gdb'
-        precisely_geodatabase = os.path.join(fgdb_location, precisely_gdb_name)
+        if self.configuration.is_read_from_zip():
+            zip_file = get_precisely_zip_file(self.state, self.configuration)
+            precisely_geodatabase = get_zip_file_gdb(zip_file, precisely_gdb_name)
+        else:
+            precisely_geodatabase = os.path.join(fgdb_location, precisely_gdb_name)
         self.data['precisely_geodatabase'] = precisely_geodatabase
         return precisely_geodatabase
 
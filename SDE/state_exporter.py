@@ -1,22 +1,44 @@
 import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 import arcpy
 
+from data_access import DataAccess, SHAPE_TOKEN, read_gdal_layer_info
+from field_mapping import FieldMap, convert_field_value, get_field_maps_of_columns, parse_field_mapping
+from map_convertor_configuration import MapConvertorConfiguration
 from national_map_logger import NationalMapLogger
 from national_map_utility import NationalMapUtility
+from state_data_settings import StateDataSettings
 import constants
 
 
+# keep consistent with plus
+EDITABLE_FIELDS = [['LastUpdated', 'DATE'], ['LastUpdatedBy', 'LONG'], ['CreatedOn', 'DATE'], ['CreatedBy', 'LONG']]
+STYLE_FIELD = ['Style', 'TEXT', 255]
+XY_TOLERANCE = '0.001 Meters'
+TEMP_TOWN_FEATURES_NAME = 'temp_town_features'
+# the mapped fields of the landmark layers
+LANDMARK_FIELD_MAPS = [FieldMap('Name', 'TEXT', 255, 'Name', 0, 99), FieldMap('LocalId', 'TEXT', 255, 'ID', 0, 35)]
+
+# task: (StateExporter method, tasks it waits for), every task writes its own scratch feature classes, in its own
+# File GDB, a File GDB takes no schema changes from several processes at once
+EXPORT_TASKS = {
+    'landmarks': ('_export_state_landmarks', []),
+    'railroads': ('_export_state_railroads', []),
+    'towns': ('_export_state_towns', []),
+    'postcodes': ('_export_state_postcodes', ['towns']),
+    'rivers': ('_export_state_rivers', []),
+    'water_bodies': ('_export_state_water_bodies', [])
+}
+
+
 def add_editable_fields(layer):
-    # keep consistent with plus
-    NationalMapUtility.add_field(layer, 'LastUpdated', 'DATE')
-    NationalMapUtility.add_field(layer, 'LastUpdatedBy', 'LONG')
-    NationalMapUtility.add_field(layer, 'CreatedOn', 'DATE')
-    NationalMapUtility.add_field(layer, 'CreatedBy', 'LONG')
+    for field_name, field_type in EDITABLE_FIELDS:
+        NationalMapUtility.add_field(layer, field_name, field_type)
 
 
 def add_style_field(out_features):
-    NationalMapUtility.add_field(out_features, 'Style', 'TEXT', 255)
+    NationalMapUtility.add_field(out_features, *STYLE_FIELD)
 
 
 def add_local_id_field(out_features):
@@ -27,6 +49,58 @@ def add_name_field(out_features):
     NationalMapUtility.add_field(out_features, 'Name', 'TEXT', 255)
 
 
+def get_basemap_field_descriptions(field_maps):
+    """
+    :return: AddFields descriptions of the mapped fields, the Style field and the editable fields
+    """
+    descriptions = [
+        [field_map.name, field_map.field_type, field_map.name, field_map.length] for field_map in field_maps
+    ]
+    descriptions.append([STYLE_FIELD[0], STYLE_FIELD[1], STYLE_FIELD[0], STYLE_FIELD[2]])
+    descriptions.extend([field_name, field_type, field_name, None] for field_name, field_type in EDITABLE_FIELDS)
+    return descriptions
+
+
+def get_arcpy_geometry_type(gdal_geometry_type):
+    geometry_type = gdal_geometry_type.upper()
+    if 'POLYGON' in geometry_type:
+        return 'POLYGON'
+    if 'LINESTRING' in geometry_type:
+        return 'POLYLINE'
+    if 'MULTIPOINT' in geometry_type:
+        return 'MULTIPOINT'
+    return 'POINT'
+
+
+def _export_task_in_worker(state, configuration_file, task, task_geodatabase):
+    configuration = MapConvertorConfiguration(configuration_file)
+    NationalMapLogger.init(configuration, log_suffix=f'{state}_{task}')
+    MapConvertorConfiguration.set_arcpy_environment()
+    DataAccess.init(configuration)
+
+    try:
+        exporter = StateExporter(StateDataSettings(state, configuration))
+        # written by the towns task and moved to the state scratch GDB before the postcodes task starts
+        exporter.temp_town_features = exporter._get_scratch_feature_class(TEMP_TOWN_FEATURES_NAME)
+        exporter.settings['scratch_geodatabase'] = task_geodatabase
+        with NationalMapLogger.span(f'StateExporter {task}', state=state):
+            getattr(exporter, EXPORT_TASKS[task][0])()
+    except Exception as e:
+        NationalMapLogger.error(f'_export_task_in_worker failed, {state}, {task}: {e}')
+        return str(e)
+
+    return None
+
+
+def get_arcpy_spatial_reference(crs):
+    if crs.upper().startswith('EPSG:'):
+        return arcpy.SpatialReference(int(crs.split(':')[1]))
+
+    spatial_reference = arcpy.SpatialReference()
+    spatial_reference.loadFromString(crs)
+    return spatial_reference
+
+
 class StateExporter:
     """
     Convert US State basemap data to routefinder plus data format.
@@ -36,19 +110,108 @@ class StateExporter:
     def __init__(self, data_settings):
         self.state = data_settings.state
         self.settings = data_settings.data
+        self.configuration = data_settings.configuration
+        self.read_from_zip = data_settings.configuration.is_read_from_zip()
+        self.fused_state_export = data_settings.configuration.is_fused_state_export()
         self.temp_town_features = None
 
     def __del__(self):
         del self.state
         del self.settings
+        del self.configuration
+        del self.read_from_zip
+        del self.fused_state_export
         del self.temp_town_features
 
     def export_state_data_template(self, in_name, out_scratch_name, where_clause='#',
                                    use_field_alias_as_name='#', field_mapping='#', sort_field='#'):
         in_features = self.get_precisely_feature_path(in_name)
         out_features = self._get_scratch_feature_class(out_scratch_name)
-        arcpy.conversion.ExportFeatures(in_features, out_features, where_clause,
-                                        use_field_alias_as_name, field_mapping, sort_field)
+        if self.read_from_zip:
+            self._stream_state_data(in_features, out_features, where_clause, field_mapping)
+        else:
+            arcpy.conversion.ExportFeatures(in_features, out_features, where_clause,
+                                            use_field_alias_as_name, field_mapping, sort_field)
+        return out_features
+
+    def _stream_state_data(self, in_features, out_features, where_clause, field_mapping):
+        """
+        ExportFeatures of a source GDAL reads in place, e.g. through /vsizip/, which arcpy cannot open.
+        The features are read through GDAL and inserted into a feature class created with the mapped fields.
+        """
+        NationalMapLogger.debug(f'_stream_state_data, {self.state}, {in_features}')
+        layer_info = read_gdal_layer_info(in_features)
+        if field_mapping == '#':
+            field_maps = get_field_maps_of_columns(layer_info['fields'], layer_info['dtypes'])
+        else:
+            field_maps = parse_field_mapping(field_mapping)
+
+        out_path, out_name = os.path.split(out_features)
+        arcpy.management.CreateFeatureclass(out_path, out_name,
+                                            geometry_type=get_arcpy_geometry_type(layer_info['geometry_type']),
+                                            spatial_reference=get_arcpy_spatial_reference(layer_info['crs']))
+        arcpy.management.AddFields(out_features, [
+            [field_map.name, field_map.field_type, field_map.name, field_map.length] for field_map in field_maps
+        ])
+
+        self._insert_mapped_rows(in_features, out_features, field_maps, where_clause)
+
+    @staticmethod
+    def _insert_mapped_rows(in_features, out_features, field_maps, where_clause='#', spatial_reference=None):
+        """
+        Insert the source features with the values of the field maps.
+        :param spatial_reference: of out_features, the geometries are projected while they are read
+        """
+        source_fields = [SHAPE_TOKEN]
+        source_fields.extend({field_map.source_field: None for field_map in field_maps}.keys())
+        source_indexes = [source_fields.index(field_map.source_field) for field_map in field_maps]
+        rows = DataAccess.search_rows(in_features, source_fields, None if where_clause == '#' else where_clause,
+                                      spatial_reference=spatial_reference)
+
+        out_rows = (
+            [row[0]] + [convert_field_value(field_map, row[index])
+                        for field_map, index in zip(field_maps, source_indexes)]
+            for row in rows
+        )
+        out_fields = [SHAPE_TOKEN] + [field_map.name for field_map in field_maps]
+        count = DataAccess.insert_rows(out_features, out_fields, out_rows)
+        NationalMapLogger.add_rows(read=count, written=count)
+
+    def _get_source_geometry_type(self, in_features):
+        if DataAccess.is_gdal_path(in_features):
+            return get_arcpy_geometry_type(read_gdal_layer_info(in_features)['geometry_type'])
+        return arcpy.Describe(in_features).shapeType.upper()
+
+    def export_fused_state_layer(self, sources, out_name, geometry_type=None, empty_field_maps=None):
+        """
+        Write a basemap layer in one pass: the Web Mercator feature class is created with the mapped, Style and
+        editable fields, and the source features are projected while they are read into it.
+        :param sources: [(precisely feature name, field mapping)] appended in order, with the same mapped fields
+        :param geometry_type: of the layer, the geometry type of the first source by default
+        :param empty_field_maps: List[FieldMap] of the mapped fields when there is no source, the layer is empty
+        :return: the projected feature class, as project_state_data writes it
+        """
+        message = f'export_fused_state_layer, {self.state}, {out_name}'
+        NationalMapLogger.debug(message)
+
+        out_features = self._get_scratch_feature_class(out_name)
+        sources = [(self.get_precisely_feature_path(in_name), field_mapping) for in_name, field_mapping in sources]
+        if not sources and (geometry_type is None or empty_field_maps is None):
+            raise ValueError(f'{message}, no source for the geometry type and the fields')
+        if geometry_type is None:
+            geometry_type = self._get_source_geometry_type(sources[0][0])
+
+        arcpy.env.XYTolerance = XY_TOLERANCE
+        arcpy.management.CreateFeatureclass(self.settings['scratch_geodatabase'], out_name,
+                                            geometry_type=geometry_type,
+                                            spatial_reference=constants.SR_WEB_MERCATOR)
+        field_maps_of_sources = [parse_field_mapping(field_mapping) for _, field_mapping in sources]
+        mapped_fields = field_maps_of_sources[0] if field_maps_of_sources else empty_field_maps
+        arcpy.management.AddFields(out_features, get_basemap_field_descriptions(mapped_fields))
+
+        for (in_features, _), field_maps in zip(sources, field_maps_of_sources):
+            self._insert_mapped_rows(in_features, out_features, field_maps,
+                                     spatial_reference=constants.SR_WEB_MERCATOR)
         return out_features
 
     def project_state_data(self, in_feature_class, out_name):
@@ -57,7 +220,7 @@ class StateExporter:
 
         out_features = os.path.join(self.settings['scratch_geodatabase'], out_name)
 
-        arcpy.env.XYTolerance = '0.001 Meters'
+        arcpy.env.XYTolerance = XY_TOLERANCE
         arcpy.management.Project(in_feature_class, out_features, constants.SR_WEB_MERCATOR)
 
     def _get_scratch_feature_class(self, scratch_name):
@@ -74,7 +237,7 @@ class StateExporter:
         return os.path.join(precisely_gdb, feature_name)
 
     def _export_temp_town_features(self):
-        scratch_name = 'temp_town_features'
+        scratch_name = TEMP_TOWN_FEATURES_NAME
         town_name = f'{self.state}towns'
         in_features = self.get_precisely_feature_path(town_name)
         field_mapping = (
@@ -94,6 +257,16 @@ class StateExporter:
     def _join_county_fields(self, input_table):
         county_name = f'{self.state}counties'
         join_table = self.get_precisely_feature_path(county_name)
+        if self.read_from_zip:
+            # JoinField needs a table arcpy opens, the two join fields of the counties are exported first
+            join_table = self.export_state_data_template(
+                county_name,
+                out_scratch_name='temp_county_join_features',
+                field_mapping=(
+                    f'A2_Code "A2_Code" true true false 5 Text 0 0,First,#,{join_table},A2_Code,0,4;'
+                    f'Name "Name" true true false 255 Text 0 0,First,#,{join_table},Name,0,99'
+                )
+            )
 
         arcpy.management.JoinField(
             in_data=input_table,
@@ -107,6 +280,8 @@ class StateExporter:
         )
 
         arcpy.management.DeleteField(input_table, ['A2_Code'])
+        if self.read_from_zip:
+            arcpy.management.Delete(join_table)
 
     def _export_state_towns(self):
         out_features = self._export_temp_town_features()
@@ -128,6 +303,11 @@ class StateExporter:
             f'County "County" true true false 255 Text 0 0,First,#,{in_features},Name,0,99;'
             f'LocalId "LocalId" true true false 255 Text 0 0,First,#,{in_features},ID,0,35'
         )
+        if self.fused_state_export:
+            self.export_fused_state_layer([(counties_name, field_mapping)],
+                                          constants.GDB_ITEMS_DICT['STATE']['counties_name'])
+            return
+
         out_features = self.export_state_data_template(
             counties_name,
             out_scratch_name=scratch_name,
@@ -147,6 +327,11 @@ class StateExporter:
             f'Name "Name" true true false 255 Text 0 0,First,#,{in_features},Name,0,99;'
             f'LocalId "LocalId" true true false 255 Text 0 0,First,#,{in_features},ID,0,35'
         )
+        if self.fused_state_export:
+            out_name = constants.GDB_ITEMS_DICT['STATE']['waterbody_name']
+            self.export_fused_state_layer([(waterbodies_name, field_mapping)], out_name)
+            return
+
         out_features = self.export_state_data_template(
             waterbodies_name,
             out_scratch_name=scratch_name,
@@ -165,6 +350,11 @@ class StateExporter:
             f'Name "Name" true true false 255 Text 0 0,First,#,{in_features},Name,0,99;'
             f'LocalId "LocalId" true true false 255 Text 0 0,First,#,{in_features},ID,0,35'
         )
+        if self.fused_state_export:
+            out_name = constants.GDB_ITEMS_DICT['STATE']['river_name']
+            self.export_fused_state_layer([(rivers_name, field_mapping)], out_name)
+            return
+
         out_features = self.export_state_data_template(
             rivers_name,
             out_scratch_name=scratch_name,
@@ -185,6 +375,11 @@ class StateExporter:
             f'FromElevation "FromElevation" true true false 4 Long 0 0,First,#,{in_features},BeginGradeLevel,-1,-1;'
             f'ToElevation "ToElevation" true true false 4 Long 0 0,First,#,{in_features},EndGradeLevel,-1,-1'
         )
+        if self.fused_state_export:
+            out_name = constants.GDB_ITEMS_DICT['STATE']['railroad_name']
+            self.export_fused_state_layer([(railroads_name, field_mapping)], out_name)
+            return
+
         out_features = self.export_state_data_template(
             railroads_name,
             out_scratch_name=scratch_name,
@@ -196,16 +391,25 @@ class StateExporter:
 
         self.project_state_data(out_features, constants.GDB_ITEMS_DICT['STATE']['railroad_name'])
 
-    def _export_state_landuse(self):
-        scratch_name = 'temp_landuse_features'
+    def _get_landuse_source(self):
+        """
+        :return: [(precisely feature name, field mapping)], empty when the state has no landuse
+        """
         landuse_name = f'{self.state}landuse'
         in_features = self.get_precisely_feature_path(landuse_name)
+        if not DataAccess.exists(in_features):
+            return []
+
+        field_mapping = (
+            f'Name "Name" true true false 255 Text 0 0,First,#,{in_features},Name,0,99;'
+            f'LocalId "LocalId" true true false 255 Text 0 0,First,#,{in_features},ID,0,35;'
+        )
+        return [(landuse_name, field_mapping)]
+
+    def _export_state_landuse(self):
+        scratch_name = 'temp_landuse_features'
         out_features = None
-        if arcpy.Exists(in_features):
-            field_mapping = (
-                f'Name "Name" true true false 255 Text 0 0,First,#,{in_features},Name,0,99;'
-                f'LocalId "LocalId" true true false 255 Text 0 0,First,#,{in_features},ID,0,35;'
-            )
+        for landuse_name, field_mapping in self._get_landuse_source():
             out_features = self.export_state_data_template(
                 landuse_name,
                 out_scratch_name=scratch_name,
@@ -216,16 +420,25 @@ class StateExporter:
             add_editable_fields(out_features)
         return out_features
 
-    def _export_state_airports(self):
-        scratch_name = 'temp_airports_features'
+    def _get_airports_source(self):
+        """
+        :return: [(precisely feature name, field mapping)], empty when the state has no airports
+        """
         airports_name = f'{self.state}airports'
         in_features = self.get_precisely_feature_path(airports_name)
+        if not DataAccess.exists(in_features):
+            return []
+
+        field_mapping = (
+            f'Name "Name" true true false 255 Text 0 0,First,#,{in_features},Name,0,99;'
+            f'LocalId "LocalId" true true false 255 Text 0 0,First,#,{in_features},ID,0,35;'
+        )
+        return [(airports_name, field_mapping)]
+
+    def _export_state_airports(self):
+        scratch_name = 'temp_airports_features'
         out_features = None
-        if arcpy.Exists(in_features):
-            field_mapping = (
-                f'Name "Name" true true false 255 Text 0 0,First,#,{in_features},Name,0,99;'
-                f'LocalId "LocalId" true true false 255 Text 0 0,First,#,{in_features},ID,0,35;'
-            )
+        for airports_name, field_mapping in self._get_airports_source():
             out_features = self.export_state_data_template(
                 airports_name,
                 out_scratch_name=scratch_name,
@@ -237,6 +450,15 @@ class StateExporter:
         return out_features
 
     def _export_state_landmarks_polygon(self):
+        if self.fused_state_export:
+            sources = self._get_landuse_source() + self._get_airports_source()
+            if not sources:
+                NationalMapLogger.warning(f'_export_state_landmarks_polygon, {self.state}, no landuse and no airports, '
+                                          f'the layer is empty')
+            self.export_fused_state_layer(sources, constants.GDB_ITEMS_DICT['STATE']['landmark_polygon_name'],
+                                          geometry_type='POLYGON', empty_field_maps=LANDMARK_FIELD_MAPS)
+            return
+
         scratch_name = 'temp_landmarks_polygon_features'
         out_features = self._get_scratch_feature_class(scratch_name)
 
@@ -270,6 +492,11 @@ class StateExporter:
             f'Name "Name" true true false 255 Text 0 0,First,#,{in_features},Name,0,99;'
             f'LocalId "LocalId" true true false 255 Text 0 0,First,#,{in_features},ID,0,35;'
         )
+        if self.fused_state_export:
+            out_name = constants.GDB_ITEMS_DICT['STATE']['landmark_name']
+            self.export_fused_state_layer([(landmarks_name, field_mapping)], out_name)
+            return
+
         out_features = self.export_state_data_template(
             landmarks_name,
             out_scratch_name=scratch_name,
@@ -331,12 +558,88 @@ class StateExporter:
 
         self.project_state_data(out_features, constants.GDB_ITEMS_DICT['STATE']['postcode_name'])
 
+    def _create_task_geodatabase(self, task):
+        """
+        :return: the scratch File GDB of an export task, empty
+        """
+        scratch_folder = self.settings['scratch_folder']
+        task_geodatabase = os.path.join(scratch_folder, f'{self.state}_{task}.gdb')
+        if arcpy.Exists(task_geodatabase):
+            arcpy.management.Delete(task_geodatabase)
+        arcpy.management.CreateFileGDB(scratch_folder, os.path.basename(task_geodatabase))
+        return task_geodatabase
+
+    def _move_task_outputs(self, task_geodatabase):
+        """
+        Copy the feature classes of a task to the state scratch GDB, one task after another, and delete its GDB.
+        """
+        workspace = arcpy.env.workspace
+        arcpy.env.workspace = task_geodatabase
+        names = (arcpy.ListFeatureClasses() or []) + (arcpy.ListTables() or [])
+        arcpy.env.workspace = workspace
+
+        for name in names:
+            out_features = self._get_scratch_feature_class(name)
+            if arcpy.Exists(out_features):
+                arcpy.management.Delete(out_features)
+            arcpy.management.Copy(os.path.join(task_geodatabase, name), out_features)
+        arcpy.management.Delete(task_geodatabase)
+
+    def _run_export_tasks_in_parallel(self, export_workers):
+        """
+        Run the export tasks in a process pool, a task is submitted once the tasks it waits for succeeded.
+        Every task writes its own File GDB, its outputs are moved to the state scratch GDB once it succeeded.
+        """
+        NationalMapLogger.info(f'_run_export_tasks_in_parallel, {self.state}, workers: {export_workers}')
+        pending_tasks = dict(EXPORT_TASKS)
+        succeeded_tasks, failed_tasks = set(), []
+        with ProcessPoolExecutor(max_workers=export_workers) as executor:
+            futures, task_geodatabases = {}, {}
+            while True:
+                for task, (_, dependencies) in list(pending_tasks.items()):
+                    if all(dependency in succeeded_tasks for dependency in dependencies):
+                        pending_tasks.pop(task)
+                        task_geodatabases[task] = self._create_task_geodatabase(task)
+                        futures[executor.submit(_export_task_in_worker, self.state,
+                                                self.configuration.configuration_file, task,
+                                                task_geodatabases[task])] = task
+                if not futures:
+                    break
+
+                done_futures, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done_futures:
+                    task = futures.pop(future)
+                    try:
+                        error = future.result()
+                    except Exception as e:
+                        # the worker process itself died
+                        error = str(e)
+
+                    if error:
+                        failed_tasks.append(f'{task}: {error}')
+                        continue
+
+                    try:
+                        self._move_task_outputs(task_geodatabases[task])
+                        succeeded_tasks.add(task)
+                    except Exception as e:
+                        failed_tasks.append(f'{task}: {e}')
+
+        # the tasks waiting for a failed task never run
+        failed_tasks.extend(f'{task}: not run' for task in pending_tasks)
+        if failed_tasks:
+            message = f'_run_export_tasks_in_parallel failed, {self.state}: {"; ".join(failed_tasks)}'
+            NationalMapLogger.error(message)
+            raise RuntimeError(message)
+
+        self.temp_town_features = self._get_scratch_feature_class(TEMP_TOWN_FEATURES_NAME)
+
     def run(self):
         self._create_scratch_file_geodatabase()
-        self._export_state_landmarks()
-        self._export_state_railroads()
-        self._export_state_towns()
-        self._export_state_postcodes()
-        self._export_state_rivers()
-        self._export_state_water_bodies()
+        export_workers = self.configuration.get_export_workers()
+        if export_workers > 1:
+            self._run_export_tasks_in_parallel(export_workers)
+        else:
+            for method_name, _ in EXPORT_TASKS.values():
+                getattr(self, method_name)()
         # self._export_state_counties()
@@ -1,6 +1,7 @@
 import arcpy
 import constants
 
+from attribute_join import join_fields
 from state_converter import StateConverter
 
 
@@ -31,13 +32,8 @@ class StateRestrictionConverter(StateConverter):
     def _add_state_and_city(self):
         in_data = self.data['state_restriction_feature_class']
         street_feature_class = self.data['state_street_feature_class']
-        arcpy.management.JoinField(
-            in_data=in_data,
-            in_field='FEATURE_ID',
-            join_table=street_feature_class,
-            join_field='LocalId',
-            fields='State;City'
-        )
+        join_fields(in_data, 'FEATURE_ID', street_feature_class, 'LocalId', ['State', 'City'],
+                    self.configuration.is_join_engine_hash())
 
     def _project_state_restriction(self):
         out_features = self.data['state_restriction_feature_class']
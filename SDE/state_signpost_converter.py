@@ -1,8 +1,15 @@
+import itertools
+
 import arcpy
+import numpy as np
 import constants
 
-from state_converter import StateConverter
+from data_access import DataAccess
+from local_id_lookup import MISSING_VALUE
+from national_map_logger import NationalMapLogger
 from national_map_utility import NationalMapUtility
+from state_converter import StateConverter
+from street_geometry_cache import StreetEndpointCache
 
 MAX_SIGNPOST_EDGES = 10
 
@@ -18,42 +25,45 @@ EDGE_POSITION_DICT = {
 }
 
 
-def create_street_local_id_and_oid_geometry_lookup(street_feature_class):
-    """
-    :param street_feature_class:
-    :return: Dict[LocalId] = (OBJECTID, SHAPE)
-    """
-    return {
-        (item[0]): (item[1], item[2])
-        for item in arcpy.da.SearchCursor(street_feature_class, ['LocalId', 'OID@', 'SHAPE@'])
-    }
+def _null_first_sort_key(item):
+    # keep the order of the former 'GROUP BY ... ORDER BY ...' queries, NULL values first
+    return tuple((value is not None, value) for value in item)
 
 
-def create_street_id_and_sequence_lookup(signpost_destinations_table, signpost_id):
-    results = []
-    fields = ['StreetID', 'StreetSeq']
-    where_clause = f"SignpostID = '{signpost_id}'"
-    sql_clause = (None, 'GROUP BY StreetID, StreetSeq ORDER BY StreetID, StreetSeq')
-    with arcpy.da.SearchCursor(signpost_destinations_table, fields, where_clause, sql_clause=sql_clause) as cursor:
-        for row in cursor:
-            street_id, sequence = row[0], row[1]
-            results.append((street_id, sequence))
+def group_signpost_destinations(rows):
+    """
+    :param rows: (SignpostID, StreetID, StreetSeq, Connection, DestinationSeq, DestinationName), sorted by SignpostID
+    :return: Iterator[(SignpostID, [(StreetID, StreetSeq)], [(Connection, DestinationSeq, DestinationName)])]
+    """
+    key, street_items, destination_items = None, set(), set()
+    for row in rows:
+        signpost_id = row[0]
+        if street_items and key != signpost_id:
+            yield (key, sorted(street_items, key=_null_first_sort_key),
+                   sorted(destination_items, key=_null_first_sort_key))
+            street_items, destination_items = set(), set()
 
-    return results
+        key = signpost_id
+        street_items.add((row[1], row[2]))
+        destination_items.add((row[3], row[4], row[5]))
 
+    if street_items:
+        yield (key, sorted(street_items, key=_null_first_sort_key),
+               sorted(destination_items, key=_null_first_sort_key))
 
-def create_connection_sequence_and_name_lookup(signpost_destinations_table, signpost_id):
-    results = []
-    fields = ['Connection', 'DestinationSeq', 'DestinationName']
-    where_clause = f"SignpostID = '{signpost_id}'"
-    sql_clause = (None, 'GROUP BY Connection, DestinationSeq, DestinationName '
-                        'ORDER BY Connection, DestinationSeq, DestinationName')
-    with arcpy.da.SearchCursor(signpost_destinations_table, fields, where_clause, sql_clause=sql_clause) as cursor:
-        for row in cursor:
-            connection, destination_set, destination_name = row[0], row[1], row[2]
-            results.append((connection, destination_set, destination_name))
 
-    return results
+def create_signpost_destination_lookup(signpost_destinations_table):
+    """
+    Read the destinations table once and group it by SignpostID.
+    :param signpost_destinations_table:
+    :return: Dict[SignpostID] = (street_lookup, destination_lookup)
+    """
+    fields = ['SignpostID', 'StreetID', 'StreetSeq', 'Connection', 'DestinationSeq', 'DestinationName']
+    rows = DataAccess.search_rows(signpost_destinations_table, fields, order_by=['SignpostID'])
+    return {
+        signpost_id: (street_lookup, destination_lookup)
+        for signpost_id, street_lookup, destination_lookup in group_signpost_destinations(rows)
+    }
 
 
 def create_sign_id_and_oid_lookup(signpost_feature_class):
@@ -63,7 +73,7 @@ def create_sign_id_and_oid_lookup(signpost_feature_class):
     """
     return {
         (item[0]): item[1]
-        for item in arcpy.da.SearchCursor(signpost_feature_class, ['SrcSignID', 'OID@'])
+        for item in DataAccess.search_rows(signpost_feature_class, ['SrcSignID', 'OID@'])
     }
 
 
@@ -125,38 +135,49 @@ def get_signpost_oid(lookup, signpost_id):
         return None
 
 
-def reverse_edge_end(edge_end):
-    if edge_end == 'Y':
-        result = 'N'
-    else:
-        result = 'Y'
-    return result
-
-
 class StateSignpostConverter(StateConverter):
     def __init__(self, data_settings, state_exporter, data):
         super().__init__(data_settings, state_exporter, data)
         self.unique_signpost_id = None
-        self.street_local_id_oid_shape_lookup = None
+        self.signpost_destination_lookup = None
+        self.street_endpoint_cache = None
+        self.street_geometry_lookup = None
         self._init_street_lookup()
 
     def __del__(self):
         super().__del__()
         del self.unique_signpost_id
-        del self.street_local_id_oid_shape_lookup
+        del self.signpost_destination_lookup
+        del self.street_endpoint_cache
+        del self.street_geometry_lookup
 
     def _init_street_lookup(self):
-        if self.street_local_id_oid_shape_lookup:
+        if self.street_endpoint_cache:
             return
 
         street_feature_class = self.data['state_street_feature_class']
-        self.street_local_id_oid_shape_lookup = create_street_local_id_and_oid_geometry_lookup(street_feature_class)
-
-    def _get_street_object_id_and_shape(self, local_id):
+        self.street_endpoint_cache = StreetEndpointCache(street_feature_class)
+
+    def _init_street_geometry_lookup(self):
+        # full geometries of the streets which are referenced by a signpost only
+        local_ids = [
+            item[0]
+            for signpost_id in self.unique_signpost_id
+            for item in self._get_signpost_destinations(signpost_id)[0]
+        ]
+        street_indexes = self.street_endpoint_cache.get_street_indexes(local_ids)
+        self.street_geometry_lookup = self.street_endpoint_cache.read_geometries(street_indexes)
+
+    def _get_signpost_destinations(self, signpost_id):
         try:
-            return self.street_local_id_oid_shape_lookup[local_id]
+            return self.signpost_destination_lookup[signpost_id]
         except Exception as e:
-            return None
+            return [], []
+
+    def _init_signpost_destination_lookup(self):
+        table_name = f'{self.state}signpostdestinations'
+        destinations_table = self.exporter.get_precisely_feature_path(table_name)
+        self.signpost_destination_lookup = create_signpost_destination_lookup(destinations_table)
 
     def _create_signpost_feature_class(self):
         scratch_gdb = self.settings['scratch_geodatabase']
@@ -176,7 +197,9 @@ class StateSignpostConverter(StateConverter):
         self.data['state_signpost_table'] = signpost_table
 
     def _create_signpost_features(self):
+        self._init_street_geometry_lookup()
         signpost_features = self._generate_signpost_features()
+        self.street_geometry_lookup = None
         print(f'_create_signpost_features: count - {len(signpost_features)}')
 
         feature_class = self.data['state_signpost_feature_class']
@@ -186,57 +209,33 @@ class StateSignpostConverter(StateConverter):
             fields.extend(signpost_i)
         fields.append('SrcSignID')
 
-        with arcpy.da.InsertCursor(feature_class, fields) as cursor:
-            for feature in signpost_features:
-                cursor.insertRow(feature)
+        count = DataAccess.insert_rows(feature_class, fields, signpost_features)
+        NationalMapLogger.add_rows(written=count)
 
     def _get_unique_signpost_id(self):
-        results = []
         signposts_name = f'{self.state}signposts'
         signposts_feature_class = self.exporter.get_precisely_feature_path(signposts_name)
-        memory_layer = self.create_memory_layer()
-        arcpy.management.MakeFeatureLayer(signposts_feature_class, memory_layer)
-
-        fields = ['SignpostID']
-        sql_clause = (None, 'GROUP BY SignpostID ORDER BY SignpostID')
-        with arcpy.da.SearchCursor(memory_layer, fields, sql_clause=sql_clause) as cursor:
-            process_signposts_id = None
-
-            for row in cursor:
-                signpost_id = row[0]
-                if process_signposts_id == signpost_id:
-                    message = f'duplicate signpost_id {signpost_id}'
-                    print(message)
-                    continue
-                process_signposts_id = signpost_id
-                results.append(signpost_id)
-
-        self.dispose_memory_layer()
-        return results
+
+        rows = DataAccess.search_rows(signposts_feature_class, ['SignpostID'], order_by=['SignpostID'])
+        return [signpost_id for signpost_id, _ in itertools.groupby(row[0] for row in rows)]
 
     def _generate_signpost_features(self):
         features = []
 
-        table_name = f'{self.state}signpostdestinations'
-        destinations_table = self.exporter.get_precisely_feature_path(table_name)
-
         for signpost_id in self.unique_signpost_id:
-            street_lookup = create_street_id_and_sequence_lookup(destinations_table, signpost_id)
+            street_lookup, destination_lookup = self._get_signpost_destinations(signpost_id)
             if len(street_lookup) <= MAX_SIGNPOST_EDGES:
                 signpost_geometry = self._generate_signpost_geometry(street_lookup)
                 if signpost_geometry is not None:
-                    destination_lookup = create_connection_sequence_and_name_lookup(destinations_table, signpost_id)
                     if len(destination_lookup) <= MAX_SIGNPOST_EDGES:
                         signpost_feature = create_signpost_feature(signpost_id, signpost_geometry, destination_lookup)
                         features.append(signpost_feature)
                     else:
                         pass
-                    del destination_lookup
                 else:
                     pass
             else:
                 pass
-            del street_lookup
 
         return features
 
@@ -246,51 +245,58 @@ class StateSignpostConverter(StateConverter):
 
         table = self.data['state_signpost_table']
         fields = ['SignpostID', 'Sequence', 'EdgeFCID', 'EdgeFID', 'EdgeFrmPos', 'EdgeToPos', 'SegmentID', 'SrcSignID']
-        with arcpy.da.InsertCursor(table, fields) as cursor:
-            for record in signpost_records:
-                cursor.insertRow(record)
+        count = DataAccess.insert_rows(table, fields, signpost_records)
+        NationalMapLogger.add_rows(written=count)
 
     def _generate_signpost_table_records(self):
-        results = []
         signpost_feature_class = self.data['state_signpost_feature_class']
         sign_id_and_oid_lookup = create_sign_id_and_oid_lookup(signpost_feature_class)
 
-        table_name = f'{self.state}signpostdestinations'
-        destinations_table = self.exporter.get_precisely_feature_path(table_name)
-
+        signpost_oids, signpost_ids, street_ids, street_sequences = [], [], [], []
+        neighbor_positions, is_last_streets = [], []
         for signpost_id in self.unique_signpost_id:
             signpost_feature_oid = get_signpost_oid(sign_id_and_oid_lookup, signpost_id)
             if signpost_feature_oid is None:
                 continue
 
-            street_lookup = create_street_id_and_sequence_lookup(destinations_table, signpost_id)
-            if len(street_lookup) <= MAX_SIGNPOST_EDGES:
-                records = self._generate_signpost_records(signpost_feature_oid, signpost_id, street_lookup)
-                if len(records) > 0:
-                    results[len(results):] = records
-            else:
-                pass
-            del street_lookup
+            street_lookup, _ = self._get_signpost_destinations(signpost_id)
+            if len(street_lookup) > MAX_SIGNPOST_EDGES:
+                continue
+
+            offset, street_count = len(street_ids), len(street_lookup)
+            for index, item in enumerate(street_lookup):
+                # the last street is compared with the previous street (itself for a single street)
+                is_last_street = index == street_count - 1
+                neighbor_index = (index - 1) % street_count if is_last_street else index + 1
+
+                signpost_oids.append(signpost_feature_oid)
+                signpost_ids.append(signpost_id)
+                street_ids.append(item[0])
+                street_sequences.append(item[1])
+                neighbor_positions.append(offset + neighbor_index)
+                is_last_streets.append(is_last_street)
 
-        return results
+        return self._generate_signpost_records(signpost_oids, signpost_ids, street_ids, street_sequences,
+                                               neighbor_positions, is_last_streets)
 
     def _export_state_signposts(self):
         self._create_signpost_feature_class()
         self._create_signpost_table()
 
         self.unique_signpost_id = self._get_unique_signpost_id()
+        self._init_signpost_destination_lookup()
         self._create_signpost_features()
         self._create_signpost_records()
 
     def _generate_signpost_geometry(self, street_id_and_sequence_lookup):
         union_geometry = None
-        for item in street_id_and_sequence_lookup:
-            street_id = item[0]
-            street_oid_and_shape = self._get_street_object_id_and_shape(street_id)
-            if street_oid_and_shape is None:
+        street_ids = [item[0] for item in street_id_and_sequence_lookup]
+        street_indexes = self.street_endpoint_cache.get_street_indexes(street_ids)
+        for street_index in street_indexes:
+            if street_index == MISSING_VALUE:
                 continue
 
-            street_geometry = street_oid_and_shape[1]
+            street_geometry = self.street_geometry_lookup.get(int(street_index))
 
             if street_geometry is None:
                 union_geometry = None
@@ -302,42 +308,28 @@ class StateSignpostConverter(StateConverter):
                 union_geometry = union_geometry | street_geometry
         return union_geometry
 
-    def _generate_signpost_records(self, signpost_feature_oid, signpost_id, street_lookup):
-        records = []
+    def _generate_signpost_records(self, signpost_oids, signpost_ids, street_ids, street_sequences,
+                                   neighbor_positions, is_last_streets):
+        if len(street_ids) == 0:
+            return []
 
         edge_feature_class_id = -1
-        street_count = len(street_lookup)
-        for index in range(street_count):
-            item = street_lookup[index]
-            street_id, street_sequence = item[0], item[1]
+        street_indexes = self.street_endpoint_cache.get_street_indexes(street_ids)
+        neighbor_street_indexes = street_indexes[np.array(neighbor_positions, dtype=np.int64)]
+        is_valid = (street_indexes != MISSING_VALUE) & (neighbor_street_indexes != MISSING_VALUE)
 
-            is_last_street: bool = index == street_count - 1
+        # edge end of every street against its neighbor street in one vectorized comparison
+        is_edge_end = self.street_endpoint_cache.is_edge_end(np.where(is_valid, street_indexes, 0),
+                                                             np.where(is_valid, neighbor_street_indexes, 0))
+        is_edge_end = np.where(np.array(is_last_streets, dtype=bool), ~is_edge_end, is_edge_end)
+        edge_feature_ids = self.street_endpoint_cache.get_object_ids(street_indexes)
 
-            result = self._get_street_object_id_and_shape(street_id)
-            if result is None:
-                continue
-            edge_feature_id, street_geometry = result[0], result[1]
-
-            if is_last_street:
-                previous_item = street_lookup[index - 1]
-                previous_street_id = previous_item[0]
-                previous_result = self._get_street_object_id_and_shape(previous_street_id)
-                if previous_result is None:
-                    continue
-                previous_geometry = previous_result[1]
-                edge_end = NationalMapUtility.get_edge_end(street_geometry, previous_geometry)
-                edge_end = reverse_edge_end(edge_end)
-            else:
-                next_item = street_lookup[index + 1]
-                next_street_id = next_item[0]
-                next_result = self._get_street_object_id_and_shape(next_street_id)
-                if next_result is None:
-                    continue
-                next_geometry = next_result[1]
-                edge_end = NationalMapUtility.get_edge_end(street_geometry, next_geometry)
-
-            record = [signpost_feature_oid, street_sequence, edge_feature_class_id, edge_feature_id,
-                      EDGE_POSITION_DICT[edge_end]['FROM'], EDGE_POSITION_DICT[edge_end]['TO'], street_id, signpost_id]
+        records = []
+        for position in np.flatnonzero(is_valid):
+            edge_end = 'Y' if is_edge_end[position] else 'N'
+            record = [signpost_oids[position], street_sequences[position], edge_feature_class_id,
+                      int(edge_feature_ids[position]), EDGE_POSITION_DICT[edge_end]['FROM'],
+                      EDGE_POSITION_DICT[edge_end]['TO'], street_ids[position], signpost_ids[position]]
             records.append(record)
 
         return records
@@ -1,9 +1,15 @@
 import os
 import arcpy
+import numpy as np
 import constants
 
+from data_access import DataAccess
 from state_converter import StateConverter
 from national_map_logger import NationalMapLogger
+from national_map_utility import NationalMapUtility
+from local_id_lookup import LocalIdLookupBuilder, MISSING_VALUE
+from street_attribute_classifier import NULL_TEXT, calculate_street_attributes
+from street_group_builder import calculate_street_group_ids
 
 
 def _get_street_mapping_fields(source: str) -> str:
@@ -81,23 +87,40 @@ def _get_plus_street_mapping_fields(source: str) -> str:
     )
 
 
-global_group_id = 1
 DEFAULT_ARCPY_WORKSPACE = None
-BUFFER_DISTANCE = '500 Meters'
+GROUP_BUFFER_METERS = 500
+BUFFER_DISTANCE = f'{GROUP_BUFFER_METERS} Meters'
+# every state numbers its groups in its own range, so states do not share a counter
+STATE_GROUP_ID_RANGE = 10_000_000
 
+STREET_FIELD_CHUNK_SIZE = 50_000
+STREET_FIELD_NULL_VALUES = {
+    'Street': NULL_TEXT, 'Fromleft': NULL_TEXT, 'Toleft': NULL_TEXT, 'Fromright': NULL_TEXT, 'Toright': NULL_TEXT,
+    'ROAD_CLASS': '', 'streettype': 0, 'SPEED': 0, 'Oneway': '', 'LENGTH_GEO': 0.0,
+    'ROUGHRD': 0, 'Postcode_Left': NULL_TEXT, 'Postcode_Right': NULL_TEXT
+}
 
-def set_street_group_id(feature_class, where_clause=''):
-    global global_group_id
+
+def get_state_first_group_id(state):
+    return constants.US_STATES.index(state.upper()) * STATE_GROUP_ID_RANGE + 1
+
+
+def set_street_group_id(feature_class, first_group_id, where_clause=''):
+    """
+    :return: the GroupID after the last one set
+    """
+    group_id = first_group_id
     with arcpy.da.UpdateCursor(feature_class, ['GroupID'], where_clause) as cursor:
         for row in cursor:
-            row[0] = global_group_id
+            row[0] = group_id
             cursor.updateRow(row)
-            global_group_id += 1
+            group_id += 1
+    return group_id
 
 
 @NationalMapLogger.debug_decorator
-def set_empty_street_group_id(feature_class):
-    set_street_group_id(feature_class, "Street = ''")
+def set_empty_street_group_id(feature_class, first_group_id):
+    return set_street_group_id(feature_class, first_group_id, "Street = ''")
 
 
 @NationalMapLogger.debug_decorator
@@ -215,16 +238,76 @@ class StateStreetConverter(StateConverter):
 
     @NationalMapLogger.debug_decorator
     def _add_group_id(self):
+        if self.configuration.is_street_group_engine_graph():
+            self._add_group_id_with_graph()
+        else:
+            self._add_group_id_with_buffer()
+
+    def _read_street_nodes(self):
+        """
+        :return: LocalIdLookup[FEATURE_ID] = source index, START_NODE list, END_NODE list
+        """
+        in_features = self.exporter.get_precisely_feature_path(f'usa_{self.state}_streets')
+        builder = LocalIdLookupBuilder(np.int64)
+        start_nodes, end_nodes = [], []
+        for row in DataAccess.search_rows(in_features, ['FEATURE_ID', 'START_NODE', 'END_NODE'], "ROAD_CLASS <> 'H'"):
+            builder.add(row[0], len(start_nodes))
+            start_nodes.append(row[1])
+            end_nodes.append(row[2])
+
+        return builder.build(), start_nodes, end_nodes
+
+    def _add_group_id_with_graph(self):
+        street_feature_class = self.data['state_street_feature_class']
+        arcpy.management.AddField(street_feature_class, 'GroupID', 'DOUBLE')
+
+        object_ids, local_ids, streets, coordinates = [], [], [], []
+        nan_coordinates = (np.nan, np.nan, np.nan, np.nan)
+        for row in DataAccess.search_rows(street_feature_class, ['OID@', 'LocalId', 'Street', 'SHAPE@']):
+            object_ids.append(row[0])
+            local_ids.append(row[1])
+            streets.append(row[2])
+            geometry = row[3]
+            if geometry is None:
+                coordinates.append(nan_coordinates)
+            else:
+                first_point, last_point = geometry.firstPoint, geometry.lastPoint
+                coordinates.append((first_point.X, first_point.Y, last_point.X, last_point.Y))
+
+        node_lookup, source_start_nodes, source_end_nodes = self._read_street_nodes()
+        positions = node_lookup.get_many(local_ids)
+        start_nodes = [None if position == MISSING_VALUE else source_start_nodes[position] for position in positions]
+        end_nodes = [None if position == MISSING_VALUE else source_end_nodes[position] for position in positions]
+        del node_lookup, source_start_nodes, source_end_nodes, local_ids
+
+        # the order of OBJECTID keeps the GroupID stable between runs
+        object_ids = np.array(object_ids, dtype=np.int64)
+        order = np.argsort(object_ids)
+        coordinates = np.array(coordinates, dtype=np.float64).reshape(-1, 4)[order]
+        is_geographic = arcpy.Describe(street_feature_class).spatialReference.type == 'Geographic'
+        group_ids = calculate_street_group_ids(
+            np.array(streets, dtype=object)[order],
+            np.array(start_nodes, dtype=object)[order],
+            np.array(end_nodes, dtype=object)[order],
+            coordinates[:, 0], coordinates[:, 1], coordinates[:, 2], coordinates[:, 3],
+            distance=2 * GROUP_BUFFER_METERS,
+            first_group_id=get_state_first_group_id(self.state),
+            is_geographic=is_geographic
+        )
+        NationalMapUtility.update_rows_by_object_id(street_feature_class, ['GroupID'], object_ids[order],
+                                                    [(group_id,) for group_id in group_ids.tolist()])
+
+    def _add_group_id_with_buffer(self):
         out_state_file_gdb = self.settings['scratch_geodatabase']
         arcpy.env.workspace = out_state_file_gdb
 
         street_feature_class = self.data['state_street_feature_class']
         arcpy.management.AddField(street_feature_class, 'GroupID', 'DOUBLE')
-        set_empty_street_group_id(street_feature_class)
+        next_group_id = set_empty_street_group_id(street_feature_class, get_state_first_group_id(self.state))
 
         out_streets_group = self._create_street_group(street_feature_class)
         arcpy.management.AddField(out_streets_group, 'GroupID', 'DOUBLE')
-        set_street_group_id(out_streets_group)
+        set_street_group_id(out_streets_group, next_group_id)
 
         calculate_group_id(street_feature_class, out_streets_group)
         arcpy.management.Delete(out_streets_group)
@@ -285,6 +368,33 @@ class StateStreetConverter(StateConverter):
 
     @NationalMapLogger.debug_decorator
     def _calculate_street_fields(self):
+        if self.configuration.is_street_field_calculation_vectorized():
+            self._calculate_street_fields_vectorized()
+        else:
+            self._calculate_street_fields_with_cursor()
+
+    def _calculate_street_fields_vectorized(self):
+        street_feature_class = self.data['state_street_feature_class']
+        state_value = self.state.upper()
+
+        selected_fields = list(STREET_FIELD_NULL_VALUES.keys())
+        update_fields = None
+        for where_clause in NationalMapUtility.get_object_id_where_clauses(street_feature_class,
+                                                                            STREET_FIELD_CHUNK_SIZE):
+            columns = DataAccess.read_columns(street_feature_class, ['OID@'] + selected_fields, where_clause,
+                                              null_values=STREET_FIELD_NULL_VALUES)
+            object_ids = columns.pop('OID@')
+            results = calculate_street_attributes(state_value, columns)
+            update_fields = update_fields or list(results.keys())
+
+            NationalMapLogger.add_rows(read=len(object_ids), written=len(object_ids))
+            values = list(zip(*[results[field_name].tolist() for field_name in update_fields]))
+            del columns, results
+
+            NationalMapUtility.update_rows_by_object_id(street_feature_class, update_fields, object_ids, values,
+                                                        where_clause)
+
+    def _calculate_street_fields_with_cursor(self):
         street_feature_class = self.data['state_street_feature_class']
         prohibit_crosser_default_value = 0
 
@@ -0,0 +1,144 @@
+import numpy as np
+
+ADDRESS_VALUE = '0'
+EMPTY_ADDRESS_VALUE = '-1'
+PROHIBIT_CROSSER_DEFAULT_VALUE = 0
+WALK_SPEED = 84.0
+METER_TO_MILE = 0.000621371192
+POSTAL_CODE_LENGTH = 5
+# read in place of the NULL texts which the row by row logic keeps NULL, no street attribute holds this character
+NULL_TEXT = '\x1f'
+
+STAIRS_STREET_TYPE = 28019
+ROUNDABOUT_STREET_TYPE = 4
+RAMP_STREET_TYPES = [10, 510]
+PEDESTRIAN_STREET_TYPES = [26014, 27014, 27514, 28014, 28015, 29016, 28515, 29116, 29216]
+PEDESTRIAN_ROAD_CLASS = 'Z'
+MAJOR_ROAD_CLASSES = ['S', 'T', 'P', 'Q']
+HIGHWAY_ROAD_CLASSES = ['M', 'N', 'G', 'I']
+
+ROAD_CLASS_STAIRS = 12
+ROAD_CLASS_ROUNDABOUT = 5
+ROAD_CLASS_RAMP = 3
+ROAD_CLASS_PEDESTRIAN = 10
+ROAD_CLASS_MAJOR_ROAD = 6
+ROAD_CLASS_HIGHWAY = 2
+ROAD_CLASS_DEFAULT = 1
+
+HIERARCHY_LOOKUP = [
+    (['M', 'N', 'G', 'I'], 1),
+    (['P', 'Q'], 2),
+    (['S', 'T'], 3),
+    (['C', 'F'], 4)
+]
+HIERARCHY_DEFAULT = 5
+
+# the row by row logic compares the text ROAD_CLASS with these numbers, kept as is
+NOT_TRAVERSABLE_ROAD_CLASSES = [10, 12]
+NOT_TRAVERSABLE_ONEWAY = '4'
+ROUGH_ROAD = 1
+ONEWAY_NO_LEFT = '2'
+ONEWAY_NO_RIGHT = '3'
+
+
+def is_ramp_street(street_type):
+    return np.isin(np.remainder(street_type, 1000), RAMP_STREET_TYPES)
+
+
+def classify_road_class(road_class, street_type):
+    is_ramp = is_ramp_street(street_type)
+    conditions = [
+        street_type == STAIRS_STREET_TYPE,
+        np.remainder(street_type, 1000) == ROUNDABOUT_STREET_TYPE,
+        is_ramp,
+        (road_class == PEDESTRIAN_ROAD_CLASS) & np.isin(street_type, PEDESTRIAN_STREET_TYPES),
+        np.isin(road_class, MAJOR_ROAD_CLASSES),
+        np.isin(road_class, HIGHWAY_ROAD_CLASSES)
+    ]
+    choices = [ROAD_CLASS_STAIRS, ROAD_CLASS_ROUNDABOUT, ROAD_CLASS_RAMP, ROAD_CLASS_PEDESTRIAN,
+               ROAD_CLASS_MAJOR_ROAD, ROAD_CLASS_HIGHWAY]
+    return np.select(conditions, choices, default=ROAD_CLASS_DEFAULT).astype(np.int32)
+
+
+def classify_hierarchy(road_class):
+    conditions = [np.isin(road_class, road_classes) for road_classes, _ in HIERARCHY_LOOKUP]
+    choices = [hierarchy for _, hierarchy in HIERARCHY_LOOKUP]
+    return np.select(conditions, choices, default=HIERARCHY_DEFAULT).astype(np.int16)
+
+
+def calculate_travel_time(length, speed):
+    time = np.zeros(len(length), dtype=np.float64)
+    has_speed = speed != 0
+    # same operation order as the row by row logic, so the results are identical
+    time[has_speed] = (length[has_speed] / speed[has_speed]) * METER_TO_MILE * 60
+    return time
+
+
+def restore_null_text(values, column):
+    """
+    :param column: text column read with NULL_TEXT in place of NULL
+    :return: object array of values, None where column is NULL
+    """
+    values = np.array(values, dtype=object)
+    values[np.asarray(column) == NULL_TEXT] = None
+    return values
+
+
+def fill_street_name(street, street_type):
+    unnamed = np.where(is_ramp_street(street_type), 'Ramp', 'Unnamed')
+    return restore_null_text(np.where(street == '', unnamed, street), street)
+
+
+def fill_address(address):
+    return restore_null_text(np.where(address == EMPTY_ADDRESS_VALUE, ADDRESS_VALUE, address), address)
+
+
+def truncate_postal_code(postal_code):
+    return restore_null_text(np.asarray(postal_code).astype(f'U{POSTAL_CODE_LENGTH}'), postal_code)
+
+
+def classify_traversable_by_vehicle(road_class, oneway, roughrd):
+    road_class_matches = np.isin(np.asarray(road_class, dtype=object), NOT_TRAVERSABLE_ROAD_CLASSES)
+    is_not_traversable = ((oneway == NOT_TRAVERSABLE_ONEWAY) & road_class_matches) | (roughrd == ROUGH_ROAD)
+    return np.where(is_not_traversable, 'F', 'T')
+
+
+def calculate_street_attributes(state, columns):
+    """
+    :param state: upper case state abbreviation
+    :param columns: Dict[field name] = numpy array of 'Street', 'Fromleft', 'Toleft', 'Fromright', 'Toright',
+        'ROAD_CLASS', 'streettype', 'SPEED', 'Oneway', 'LENGTH_GEO', 'ROUGHRD', 'Postcode_Left', 'Postcode_Right',
+        the NULL texts of 'Street', the addresses and the postal codes read as NULL_TEXT
+    :return: Dict[field name] = numpy array of every edited and duplicated street field
+    """
+    road_class, street_type = columns['ROAD_CLASS'], columns['streettype']
+    speed, oneway, length = columns['SPEED'], columns['Oneway'], columns['LENGTH_GEO'].astype(np.float64)
+    count = len(road_class)
+
+    road_class_value = classify_road_class(road_class, street_type)
+    speed_left = np.where(oneway == ONEWAY_NO_LEFT, 0, speed)
+    speed_right = np.where(oneway == ONEWAY_NO_RIGHT, 0, speed)
+
+    return {
+        'State': np.full(count, state),
+        'Street': fill_street_name(columns['Street'], street_type),
+        'Fromleft': fill_address(columns['Fromleft']),
+        'Toleft': fill_address(columns['Toleft']),
+        'Fromright': fill_address(columns['Fromright']),
+        'Toright': fill_address(columns['Toright']),
+        'RoadClass': road_class_value,
+        'Hierarchy': classify_hierarchy(road_class),
+        'Speedleft': speed_left,
+        'Speedright': speed_right,
+        'WALK_TIME': length / WALK_SPEED,
+        'LEFT_TIME': calculate_travel_time(length, speed_left),
+        'RIGHT_TIME': calculate_travel_time(length, speed_right),
+        'TraversableByVehicle': classify_traversable_by_vehicle(road_class, oneway, columns['ROUGHRD']),
+        'TraversableByWalkers': np.full(count, 'T'),
+        'ProhibitCrosser': np.full(count, PROHIBIT_CROSSER_DEFAULT_VALUE, dtype=np.int16),
+        'PostedLeft': speed_left,
+        'PostedRight': speed_right,
+        'LeftPostalCode': truncate_postal_code(columns['Postcode_Left']),
+        'RightPostalCode': truncate_postal_code(columns['Postcode_Right']),
+        'Cfcc': road_class_value.astype(str)
+    }
@@ -0,0 +1,83 @@
+import numpy as np
+
+from data_access import DataAccess
+from local_id_lookup import LocalIdLookupBuilder, MISSING_VALUE
+
+
+class StreetEndpointCache:
+    """
+    First and last point of every street in flat float64 arrays, indexed by the street index of a LocalIdLookup.
+    Full geometries are only read for the streets which are actually referenced.
+    """
+
+    def __init__(self, street_feature_class):
+        self.street_feature_class = street_feature_class
+        self.street_lookup = None
+        self.object_ids = None
+        self.first_x, self.first_y = None, None
+        self.last_x, self.last_y = None, None
+        self._read_street_endpoints()
+
+    def __del__(self):
+        del self.street_feature_class
+        del self.street_lookup
+        del self.object_ids
+        del self.first_x, self.first_y
+        del self.last_x, self.last_y
+
+    def _read_street_endpoints(self):
+        builder = LocalIdLookupBuilder(np.int64)
+        object_ids, coordinates = [], []
+        nan_coordinates = (np.nan, np.nan, np.nan, np.nan)
+
+        for row in DataAccess.search_rows(self.street_feature_class, ['LocalId', 'OID@', 'SHAPE@']):
+            local_id, object_id, geometry = row[0], row[1], row[2]
+            builder.add(local_id, len(object_ids))
+            object_ids.append(object_id)
+            if geometry is None:
+                coordinates.append(nan_coordinates)
+            else:
+                first_point, last_point = geometry.firstPoint, geometry.lastPoint
+                coordinates.append((first_point.X, first_point.Y, last_point.X, last_point.Y))
+
+        self.street_lookup = builder.build()
+        self.object_ids = np.array(object_ids, dtype=np.int64)
+        coordinates = np.array(coordinates, dtype=np.float64).reshape(-1, 4)
+        self.first_x, self.first_y = coordinates[:, 0].copy(), coordinates[:, 1].copy()
+        self.last_x, self.last_y = coordinates[:, 2].copy(), coordinates[:, 3].copy()
+
+    def get_street_indexes(self, local_ids):
+        """
+        :return: numpy array of the street indexes, MISSING_VALUE for the unknown LocalIds
+        """
+        return self.street_lookup.get_many(local_ids)
+
+    def get_object_ids(self, street_indexes):
+        return np.where(street_indexes == MISSING_VALUE, MISSING_VALUE,
+                        self.object_ids[np.maximum(street_indexes, 0)])
+
+    def is_edge_end(self, street_indexes, other_street_indexes):
+        """
+        Vectorized NationalMapUtility.get_edge_end,
+        'Y' (True) unless the first point of the street is one of the end points of the other street.
+        """
+        first_x, first_y = self.first_x[street_indexes], self.first_y[street_indexes]
+        same_as_other_start = ((first_x == self.first_x[other_street_indexes]) &
+                               (first_y == self.first_y[other_street_indexes]))
+        same_as_other_end = ((first_x == self.last_x[other_street_indexes]) &
+                             (first_y == self.last_y[other_street_indexes]))
+        return ~(same_as_other_start | same_as_other_end)
+
+    def read_geometries(self, street_indexes):
+        """
+        :return: Dict[street index] = SHAPE, for the given street indexes only
+        """
+        street_indexes = np.unique(street_indexes[street_indexes != MISSING_VALUE])
+        street_index_lookup = {int(self.object_ids[index]): int(index) for index in street_indexes}
+
+        geometries = {}
+        for row in DataAccess.search_rows_by_object_ids(self.street_feature_class, ['OID@', 'SHAPE@'],
+                                                         list(street_index_lookup.keys())):
+            geometries[street_index_lookup[row[0]]] = row[1]
+
+        return geometries
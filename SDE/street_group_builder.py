@@ -0,0 +1,193 @@
+import numpy as np
+
+METERS_PER_DEGREE_LATITUDE = 110_574.0
+METERS_PER_DEGREE_LONGITUDE = 111_320.0
+
+# cells of distance / sqrt(2), so the points of one cell are always within distance of each other
+CELL_SIZE_RATIO = 1.0 / np.sqrt(2.0)
+# half of the cells within distance, the other half is covered by symmetry
+NEIGHBOR_CELL_OFFSETS = [(offset_x, offset_y) for offset_x in range(0, 3) for offset_y in range(-2, 3)
+                         if offset_x > 0 or offset_y > 0]
+PAIR_BATCH_SIZE = 1_000_000
+
+
+def connected_components(count, first, second):
+    """
+    Union-find over arrays, hooking the larger root onto the smaller one and compressing until stable.
+    :return: component label of every element, the smallest element index of its component
+    """
+    labels = np.arange(count, dtype=np.int64)
+    first, second = np.asarray(first, dtype=np.int64), np.asarray(second, dtype=np.int64)
+
+    while len(first) > 0:
+        first_labels, second_labels = labels[first], labels[second]
+        is_different = first_labels != second_labels
+        if not is_different.any():
+            break
+
+        first, second = first[is_different], second[is_different]
+        low = np.minimum(first_labels[is_different], second_labels[is_different])
+        high = np.maximum(first_labels[is_different], second_labels[is_different])
+        np.minimum.at(labels, high, low)
+
+        while True:
+            parents = labels[labels]
+            if np.array_equal(parents, labels):
+                break
+            labels = parents
+
+    return labels
+
+
+def to_meters(x, y, is_geographic):
+    if not is_geographic:
+        return x, y
+
+    # local equirectangular approximation around the middle latitude of the data
+    valid_y = y[~np.isnan(y)]
+    reference_latitude = np.radians((valid_y.min() + valid_y.max()) / 2.0) if len(valid_y) > 0 else 0.0
+    return x * METERS_PER_DEGREE_LONGITUDE * np.cos(reference_latitude), y * METERS_PER_DEGREE_LATITUDE
+
+
+def create_shared_node_edges(name_codes, start_node_codes, end_node_codes):
+    """
+    :return: (first, second) street index pairs of the same name which share a START_NODE/END_NODE
+    """
+    count = len(name_codes)
+    street_indexes = np.concatenate([np.arange(count), np.arange(count)])
+    node_codes = np.concatenate([start_node_codes, end_node_codes])
+    names = np.concatenate([name_codes, name_codes])
+
+    is_valid = node_codes >= 0
+    street_indexes, node_codes, names = street_indexes[is_valid], node_codes[is_valid], names[is_valid]
+
+    order = np.lexsort((street_indexes, node_codes, names))
+    street_indexes, node_codes, names = street_indexes[order], node_codes[order], names[order]
+
+    # chain the streets of every (name, node) run, which is enough for the components
+    is_same = (node_codes[1:] == node_codes[:-1]) & (names[1:] == names[:-1])
+    return street_indexes[:-1][is_same], street_indexes[1:][is_same]
+
+
+def _are_cells_near(cell_starts, cell_counts, x, y, cells, neighbors, distance):
+    """
+    Exact check of the point pairs of every (cell, neighbor) pair, in batches of at most PAIR_BATCH_SIZE point pairs.
+    :param x, y: point coordinates sorted by cell
+    :return: numpy bool array, True when any point of the cell is within distance of any point of the neighbor
+    """
+    results = np.zeros(len(cells), dtype=bool)
+    pair_sizes = cell_counts[cells] * cell_counts[neighbors]
+    pair_ends = np.cumsum(pair_sizes)
+
+    start = 0
+    while start < len(cells):
+        batch_offset = pair_ends[start] - pair_sizes[start]
+        end = max(int(np.searchsorted(pair_ends, batch_offset + PAIR_BATCH_SIZE, side='right')), start + 1)
+        batch_sizes = pair_sizes[start:end]
+        batch_pairs = np.repeat(np.arange(start, end), batch_sizes)
+        pair_offsets = np.arange(len(batch_pairs)) - np.repeat(pair_ends[start:end] - batch_sizes - batch_offset,
+                                                               batch_sizes)
+
+        neighbor_counts = cell_counts[neighbors[batch_pairs]]
+        first = cell_starts[cells[batch_pairs]] + pair_offsets // neighbor_counts
+        second = cell_starts[neighbors[batch_pairs]] + pair_offsets % neighbor_counts
+        is_near = np.hypot(x[first] - x[second], y[first] - y[second]) <= distance
+        results[batch_pairs[is_near]] = True
+        start = end
+
+    return results
+
+
+def create_proximity_edges(name_codes, point_street_indexes, x, y, distance):
+    """
+    Spatial grid proximity of the street end points of the same name.
+    The points of one cell are connected, neighbor cells are connected when any two of their points are within distance.
+    :return: (first, second) pairs over street indexes followed by cell indexes (count + cell index), cell count
+    """
+    count = len(name_codes)
+    is_valid = ~(np.isnan(x) | np.isnan(y))
+    point_street_indexes, x, y = point_street_indexes[is_valid], x[is_valid], y[is_valid]
+    if len(x) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0
+
+    cell_size = distance * CELL_SIZE_RATIO
+    cell_x = np.floor((x - x.min()) / cell_size).astype(np.int64) + 2
+    cell_y = np.floor((y - y.min()) / cell_size).astype(np.int64) + 2
+    cell_y_count = int(cell_y.max()) + 3
+    cell_x_count = int(cell_x.max()) + 3
+    cell_keys = (name_codes[point_street_indexes] * cell_x_count + cell_x) * cell_y_count + cell_y
+
+    unique_keys, cell_indexes, cell_counts = np.unique(cell_keys, return_inverse=True, return_counts=True)
+    cell_count = len(unique_keys)
+    cell_starts = np.cumsum(cell_counts) - cell_counts
+    order = np.argsort(cell_indexes, kind='stable')
+    sorted_x, sorted_y = x[order], y[order]
+
+    firsts = [point_street_indexes]
+    seconds = [count + cell_indexes]
+    for offset_x, offset_y in NEIGHBOR_CELL_OFFSETS:
+        neighbor_keys = unique_keys + offset_x * cell_y_count + offset_y
+        positions = np.minimum(np.searchsorted(unique_keys, neighbor_keys), cell_count - 1)
+        has_neighbor = unique_keys[positions] == neighbor_keys
+
+        cells, neighbors = np.flatnonzero(has_neighbor), positions[has_neighbor]
+        is_near = _are_cells_near(cell_starts, cell_counts, sorted_x, sorted_y, cells, neighbors, distance)
+        firsts.append(count + cells[is_near])
+        seconds.append(count + neighbors[is_near])
+
+    return np.concatenate(firsts), np.concatenate(seconds), cell_count
+
+
+def encode_values(values, empty_values=(None, '')):
+    """
+    :return: integer code of every value, -1 for the empty values
+    """
+    values = np.asarray(values, dtype=object)
+    is_empty = np.array([value in empty_values for value in values], dtype=bool)
+    codes = np.full(len(values), -1, dtype=np.int64)
+    if (~is_empty).any():
+        _, codes[~is_empty] = np.unique(values[~is_empty].astype(str), return_inverse=True)
+    return codes
+
+
+def calculate_street_group_ids(streets, start_nodes, end_nodes, first_x, first_y, last_x, last_y,
+                               distance, first_group_id, is_geographic=True):
+    """
+    Group the streets of the same name which are connected by a shared node or within distance of each other.
+    Every unnamed street gets its own group, numbered first.
+    :param distance: meters between two street end points of the same group, twice the former buffer distance
+    :param first_group_id: first GroupID of the state range
+    :return: numpy float64 array of GroupID, in the order of the input streets
+    """
+    count = len(streets)
+    name_codes = encode_values(streets)
+    is_named = name_codes >= 0
+
+    group_ids = np.zeros(count, dtype=np.float64)
+    unnamed_indexes = np.flatnonzero(~is_named)
+    group_ids[unnamed_indexes] = first_group_id + np.arange(len(unnamed_indexes))
+    next_group_id = first_group_id + len(unnamed_indexes)
+
+    named_indexes = np.flatnonzero(is_named)
+    if len(named_indexes) == 0:
+        return group_ids
+
+    names = name_codes[named_indexes]
+    node_codes = encode_values(np.concatenate([np.asarray(start_nodes, dtype=object)[named_indexes],
+                                               np.asarray(end_nodes, dtype=object)[named_indexes]]))
+    start_node_codes, end_node_codes = node_codes[:len(named_indexes)], node_codes[len(named_indexes):]
+    node_first, node_second = create_shared_node_edges(names, start_node_codes, end_node_codes)
+
+    x, y = to_meters(np.concatenate([first_x[named_indexes], last_x[named_indexes]]),
+                     np.concatenate([first_y[named_indexes], last_y[named_indexes]]), is_geographic)
+    point_street_indexes = np.concatenate([np.arange(len(named_indexes)), np.arange(len(named_indexes))])
+    cell_first, cell_second, cell_count = create_proximity_edges(names, point_street_indexes, x, y, distance)
+
+    labels = connected_components(len(named_indexes) + cell_count,
+                                  np.concatenate([node_first, cell_first]),
+                                  np.concatenate([node_second, cell_second]))
+
+    # components numbered in the order of their first street, deterministic for the same input
+    _, component_indexes = np.unique(labels[:len(named_indexes)], return_inverse=True)
+    group_ids[named_indexes] = next_group_id + component_indexes
+    return group_ids
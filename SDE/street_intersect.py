@@ -0,0 +1,207 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+import constants
+from data_access import DataAccess, import_arcpy, OID_TOKEN, SHAPE_TOKEN, WkbGeometry
+from map_convertor_configuration import MapConvertorConfiguration
+from national_map_logger import NationalMapLogger
+from national_map_utility import NationalMapUtility
+
+# streets per tile, the national streets are appended state by state, so an OBJECTID range covers one region
+STREET_TILE_SIZE = 500_000
+# meters, the XY tolerance of the national data, crossings on the same grid cells are identical
+CROSSING_GRID_SIZE = 0.001
+AT_GRADE_WHERE_CLAUSE = 'FromElevation = ToElevation'
+SHAPELY_POINT_TYPE_ID = 0
+
+# RailroadIndex of a worker process, built once by _init_intersect_worker
+_worker_railroad_index = None
+
+
+def import_shapely():
+    try:
+        import shapely
+    except ImportError as e:
+        raise RuntimeError(f'the tiled engines need shapely: {e}')
+    return shapely
+
+
+def _get_crossing_key(coordinates):
+    """
+    :param coordinates: numpy array of the (x, y) points of a crossing
+    :return: hashable key of the points, equal for the crossings DeleteIdentical deletes
+    """
+    cells = np.round(coordinates / CROSSING_GRID_SIZE).astype(np.int64)
+    return tuple(sorted(map(tuple, cells.tolist())))
+
+
+def _get_crossing_points(shapely, intersections):
+    """
+    :return: (multipoints, positions of their intersections), the line overlaps are not crossings
+    """
+    parts, part_positions = shapely.get_parts(intersections, return_index=True)
+    is_point = shapely.get_type_id(parts) == SHAPELY_POINT_TYPE_ID
+    parts, part_positions = parts[is_point], part_positions[is_point]
+    if len(parts) == 0:
+        return [], np.zeros(0, dtype=np.int64)
+
+    positions, indices = np.unique(part_positions, return_inverse=True)
+    return shapely.multipoints(parts, indices=indices.ravel()), positions
+
+
+class RailroadIndex:
+    """
+    STRtree of the at grade railroads, the street crossings are only computed for the railroads whose bounding box
+    intersects the street and whose elevation equals the street elevation.
+    """
+
+    def __init__(self, geometries, elevations):
+        self.geometries = geometries
+        self.elevations = elevations
+        self.tree = import_shapely().STRtree(geometries)
+
+    def __del__(self):
+        del self.geometries
+        del self.elevations
+        del self.tree
+
+    def __len__(self):
+        return len(self.geometries)
+
+    @staticmethod
+    def build(railroad_feature_class):
+        shapely = import_shapely()
+        rows = [row for row in DataAccess.search_rows(railroad_feature_class, [SHAPE_TOKEN, 'FromElevation'],
+                                                      AT_GRADE_WHERE_CLAUSE) if row[0] is not None]
+        geometries = shapely.from_wkb([bytes(row[0].WKB) for row in rows])
+        elevations = np.array([row[1] for row in rows], dtype=np.int64)
+        return RailroadIndex(geometries, elevations)
+
+    def intersect_streets(self, street_feature_class, where_clause):
+        """
+        :param where_clause: OBJECTID range of the street tile
+        :return: [(street OBJECTID, crossing key, multipoint WKB)], one crossing per street and railroad
+        """
+        shapely = import_shapely()
+        rows = [row for row in DataAccess.search_rows(street_feature_class, [OID_TOKEN, SHAPE_TOKEN, 'FromElevation'],
+                                                      f'({where_clause}) AND {AT_GRADE_WHERE_CLAUSE}')
+                if row[1] is not None]
+        if not rows or len(self) == 0:
+            return []
+
+        street_object_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        street_geometries = shapely.from_wkb([bytes(row[1].WKB) for row in rows])
+        street_elevations = np.array([row[2] for row in rows], dtype=np.int64)
+        del rows
+
+        street_positions, railroad_positions = self.tree.query(street_geometries)
+        is_at_grade = street_elevations[street_positions] == self.elevations[railroad_positions]
+        street_positions, railroad_positions = street_positions[is_at_grade], railroad_positions[is_at_grade]
+        intersections = shapely.intersection(street_geometries[street_positions],
+                                             self.geometries[railroad_positions])
+
+        multipoints, positions = _get_crossing_points(shapely, intersections)
+        crossings = []
+        for multipoint, position in zip(multipoints, positions.tolist()):
+            crossings.append((int(street_object_ids[street_positions[position]]),
+                              _get_crossing_key(shapely.get_coordinates(multipoint)),
+                              shapely.to_wkb(multipoint)))
+        return crossings
+
+
+def _init_intersect_worker(configuration_file, railroad_feature_class):
+    global _worker_railroad_index
+    configuration = MapConvertorConfiguration(configuration_file)
+    NationalMapLogger.init(configuration, log_suffix=f'street_intersect_{os.getpid()}')
+    DataAccess.init(configuration)
+    # a GDAL worker runs without arcpy
+    if not DataAccess.is_gdal:
+        MapConvertorConfiguration.set_arcpy_environment()
+    _worker_railroad_index = RailroadIndex.build(railroad_feature_class)
+
+
+def _intersect_streets_in_worker(street_feature_class, where_clause):
+    """
+    :return: (where_clause, crossings, error)
+    """
+    try:
+        return where_clause, _worker_railroad_index.intersect_streets(street_feature_class, where_clause), None
+    except Exception as e:
+        NationalMapLogger.error(f'_intersect_streets_in_worker failed, {where_clause}: {e}')
+        return where_clause, [], str(e)
+
+
+def _intersect_tiles_in_parallel(configuration, street_feature_class, railroad_feature_class, where_clauses):
+    workers = configuration.get_street_intersect_workers()
+    NationalMapLogger.info(f'_intersect_tiles_in_parallel, workers: {workers}, tiles: {len(where_clauses)}')
+
+    crossings, failed_tiles = [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_intersect_worker,
+                             initargs=(configuration.configuration_file, railroad_feature_class)) as executor:
+        futures = [executor.submit(_intersect_streets_in_worker, street_feature_class, where_clause)
+                   for where_clause in where_clauses]
+        for future in as_completed(futures):
+            try:
+                where_clause, tile_crossings, error = future.result()
+            except Exception as e:
+                # the worker process itself died
+                where_clause, tile_crossings, error = None, [], str(e)
+
+            if error:
+                failed_tiles.append(f'{where_clause}: {error}')
+            crossings.extend(tile_crossings)
+
+    if failed_tiles:
+        message = f'_intersect_tiles_in_parallel failed: {"; ".join(failed_tiles)}'
+        NationalMapLogger.error(message)
+        raise RuntimeError(message)
+    return crossings
+
+
+def _delete_identical_crossings(crossings):
+    """
+    DeleteIdentical on SHAPE, the crossing of the first street is kept.
+    """
+    crossings = sorted(crossings, key=lambda crossing: crossing[0])
+    unique_crossings = {}
+    for street_object_id, key, wkb in crossings:
+        unique_crossings.setdefault(key, (street_object_id, wkb))
+    return list(unique_crossings.values())
+
+
+@NationalMapLogger.debug_decorator
+def generate_street_intersect(configuration, street_feature_class, railroad_feature_class, out_feature_class):
+    """
+    STREETINTERSECTR without the national PairwiseIntersect: the at grade crossings of the street tiles with the
+    railroads, deleted identical on their points.
+    :return: count of the crossings
+    """
+    start_time = time.time()
+    where_clauses = NationalMapUtility.get_object_id_where_clauses(street_feature_class, STREET_TILE_SIZE)
+    if configuration.get_street_intersect_workers() > 1 and len(where_clauses) > 1:
+        crossings = _intersect_tiles_in_parallel(configuration, street_feature_class, railroad_feature_class,
+                                                 where_clauses)
+    else:
+        railroad_index = RailroadIndex.build(railroad_feature_class)
+        crossings = [crossing for where_clause in where_clauses
+                     for crossing in railroad_index.intersect_streets(street_feature_class, where_clause)]
+        del railroad_index
+
+    crossing_count = len(crossings)
+    crossings = _delete_identical_crossings(crossings)
+
+    arcpy = import_arcpy()
+    out_workspace, out_name = os.path.split(out_feature_class)
+    fid_field_name = f"FID_{constants.GDB_ITEMS_DICT['NATIONAL']['DATASET']['street_name']}"
+    arcpy.management.CreateFeatureclass(out_workspace, out_name, geometry_type='MULTIPOINT',
+                                        spatial_reference=constants.SR_WEB_MERCATOR)
+    arcpy.management.AddField(out_feature_class, fid_field_name, 'LONG')
+    count = DataAccess.insert_rows(out_feature_class, [fid_field_name, SHAPE_TOKEN],
+                                   ((street_object_id, WkbGeometry(wkb)) for street_object_id, wkb in crossings))
+
+    NationalMapLogger.info(f'generate_street_intersect, {out_feature_class}: {count} crossings, '
+                           f'{crossing_count - count} identical, {time.time() - start_time:.1f} sec.')
+    NationalMapLogger.add_rows(written=count)
+    return count
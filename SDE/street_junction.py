@@ -0,0 +1,114 @@
+import os
+import time
+import numpy as np
+
+import constants
+from data_access import DataAccess, import_arcpy, OID_TOKEN, SHAPE_TOKEN
+from national_map_logger import NationalMapLogger
+from national_map_utility import NationalMapUtility
+
+JUNCTION_STREET_COUNT = 3
+# meters, the XY tolerance of the national data
+ENDPOINT_GRID_SIZE = 0.001
+STREET_ENDPOINT_CHUNK_SIZE = 1_000_000
+
+
+def get_cell_keys(points):
+    """
+    :param points: numpy array of (x, y) rows
+    :return: numpy array of one 16-byte key per grid cell of the points
+    """
+    cells = np.ascontiguousarray(np.round(points / ENDPOINT_GRID_SIZE), dtype='>i8')
+    return cells.view('S16').ravel()
+
+
+class EndpointCounter:
+    """
+    Count the streets which end at every node, the street chunks are matched with the sorted grid cells of the nodes.
+    Nodes on one cell, a node on a state border imported with both states, get the same count.
+    """
+
+    def __init__(self, node_points):
+        self.node_keys, self.node_positions = np.unique(get_cell_keys(node_points), return_inverse=True)
+        self.node_positions = self.node_positions.ravel()
+        self.counts = np.zeros(len(self.node_keys), dtype=np.int64)
+
+    def __del__(self):
+        del self.node_keys
+        del self.node_positions
+        del self.counts
+
+    def add_streets(self, first_points, last_points):
+        """
+        :param first_points: numpy array of the (x, y) first points of the streets
+        :param last_points: numpy array of the (x, y) last points of the streets
+        """
+        if len(self.node_keys) == 0:
+            return
+
+        first_keys, last_keys = get_cell_keys(first_points), get_cell_keys(last_points)
+        # a street with both ends at one node counts once
+        keys = np.concatenate([first_keys, last_keys[last_keys != first_keys]])
+        positions = np.minimum(np.searchsorted(self.node_keys, keys), len(self.node_keys) - 1)
+        is_node = self.node_keys[positions] == keys
+        self.counts += np.bincount(positions[is_node], minlength=len(self.node_keys))
+
+    def get_node_counts(self):
+        """
+        :return: numpy array of the street count of every node, in the order of node_points
+        """
+        return self.counts[self.node_positions]
+
+
+def _read_points(feature_class, where_clause=None):
+    """
+    :return: numpy arrays of the OBJECTID, the (x, y) first points and the (x, y) last points
+    """
+    object_ids, points = [], []
+    for row in DataAccess.search_rows(feature_class, [OID_TOKEN, SHAPE_TOKEN], where_clause):
+        if row[1] is None:
+            continue
+        first_point, last_point = row[1].firstPoint, row[1].lastPoint
+        object_ids.append(row[0])
+        points.append((first_point.X, first_point.Y, last_point.X, last_point.Y))
+
+    points = np.array(points, dtype=np.float64).reshape(-1, 4)
+    return np.array(object_ids, dtype=np.int64), points[:, :2], points[:, 2:]
+
+
+@NationalMapLogger.debug_decorator
+def generate_t_junctions(street_feature_class, node_feature_class, out_feature_class):
+    """
+    Junctions without the national SpatialJoin: the nodes where 3 streets of any state end, with ELEVATION as ZELEV.
+    :return: count of the junctions
+    """
+    start_time = time.time()
+    node_object_ids, node_points, _ = _read_points(node_feature_class)
+    endpoint_counter = EndpointCounter(node_points)
+    del node_points
+
+    street_count = 0
+    for where_clause in NationalMapUtility.get_object_id_where_clauses(street_feature_class,
+                                                                        STREET_ENDPOINT_CHUNK_SIZE):
+        _, first_points, last_points = _read_points(street_feature_class, where_clause)
+        endpoint_counter.add_streets(first_points, last_points)
+        street_count += len(first_points)
+        del first_points, last_points
+
+    junction_object_ids = set(node_object_ids[endpoint_counter.get_node_counts() == JUNCTION_STREET_COUNT].tolist())
+    del endpoint_counter
+
+    arcpy = import_arcpy()
+    out_workspace, out_name = os.path.split(out_feature_class)
+    arcpy.management.CreateFeatureclass(out_workspace, out_name, geometry_type='POINT',
+                                        spatial_reference=constants.SR_WEB_MERCATOR)
+    arcpy.management.AddField(out_feature_class, 'ZELEV', 'LONG')
+    count = DataAccess.insert_rows(
+        out_feature_class, [SHAPE_TOKEN, 'ZELEV'],
+        (row[1:] for row in DataAccess.search_rows(node_feature_class, [OID_TOKEN, SHAPE_TOKEN, 'ELEVATION'])
+         if row[0] in junction_object_ids))
+
+    NationalMapLogger.info(f'generate_t_junctions, {out_feature_class}: {count} of {len(node_object_ids)} nodes, '
+                           f'{street_count} streets, {time.time() - start_time:.1f} sec.')
+    NationalMapLogger.add_rows(read=len(node_object_ids) * 2 + street_count, written=count)
+    return count
@@ -0,0 +1,357 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+import constants
+from data_access import DataAccess, import_arcpy, OID_TOKEN, SHAPE_TOKEN, WkbGeometry
+from map_convertor_configuration import MapConvertorConfiguration
+from national_map_logger import NationalMapLogger
+from national_map_utility import NationalMapUtility
+from street_group_builder import connected_components
+from street_intersect import import_shapely
+
+STREET_READ_CHUNK_SIZE = 500_000
+# bytes of a street vertex in a worker: the lines, their noded union and the polygons
+BYTES_PER_STREET_VERTEX = 400
+MAX_TILE_DEPTH = 16
+
+
+def _grow_extent(extent, ratio):
+    x_min, y_min, x_max, y_max = extent
+    x_margin, y_margin = (x_max - x_min) * ratio, (y_max - y_min) * ratio
+    return x_min - x_margin, y_min - y_margin, x_max + x_margin, y_max + y_margin
+
+
+def _is_in_extent(points, extent):
+    """
+    :param points: numpy array of (x, y) rows
+    :return: numpy bool array, the maximum edges are not part of the extent, so a point is in one tile only
+    """
+    x_min, y_min, x_max, y_max = extent
+    return (points[:, 0] >= x_min) & (points[:, 0] < x_max) & (points[:, 1] >= y_min) & (points[:, 1] < y_max)
+
+
+def _is_intersecting_extent(bounds, extent):
+    x_min, y_min, x_max, y_max = extent
+    return (bounds[:, 0] <= x_max) & (bounds[:, 2] >= x_min) & (bounds[:, 1] <= y_max) & (bounds[:, 3] >= y_min)
+
+
+def get_street_extent(street_bounds):
+    """
+    :return: extent of the streets grown by 0.1%, no street reaches its edges
+    """
+    street_extent = (street_bounds[:, 0].min(), street_bounds[:, 1].min(),
+                     street_bounds[:, 2].max(), street_bounds[:, 3].max())
+    return tuple(float(value) for value in _grow_extent(street_extent, 0.001))
+
+
+class StreetTile:
+    """
+    Quadtree cell of the street extent with the streets which intersect it. The tile polygonizes its streets
+    clipped by its extent: a piece off the extent edges is a whole polygon, the other pieces are parts of polygons
+    which cross the tiles, whatever their size, and are stitched afterwards.
+    """
+
+    def __init__(self, extent, street_positions):
+        self.extent = extent
+        self.street_positions = street_positions
+
+    def __del__(self):
+        del self.extent
+        del self.street_positions
+
+
+def split_into_tiles(street_bounds, vertex_counts, max_tile_vertices):
+    """
+    Split the street extent until the streets of every tile have at most max_tile_vertices vertices.
+    :param street_bounds: numpy array of the (x min, y min, x max, y max) rows of the streets
+    :return: List[StreetTile], the tiles without streets too, they cover the whole extent
+    """
+    tiles = []
+    pending = [(get_street_extent(street_bounds), 0, np.arange(len(street_bounds)))]
+    while pending:
+        extent, depth, candidates = pending.pop()
+        street_positions = candidates[_is_intersecting_extent(street_bounds[candidates], extent)]
+        if depth == MAX_TILE_DEPTH or int(vertex_counts[street_positions].sum()) <= max_tile_vertices:
+            tiles.append(StreetTile(extent, street_positions))
+            continue
+
+        x_min, y_min, x_max, y_max = extent
+        x_middle, y_middle = (x_min + x_max) / 2.0, (y_min + y_max) / 2.0
+        for quadrant in [(x_min, y_min, x_middle, y_middle), (x_middle, y_min, x_max, y_middle),
+                         (x_min, y_middle, x_middle, y_max), (x_middle, y_middle, x_max, y_max)]:
+            pending.append((quadrant, depth + 1, street_positions))
+    return tiles
+
+
+def _read_street_bounds(street_feature_class):
+    """
+    :return: OBJECTID, bounds and vertex count of the streets, the bounds are float32 rounded outwards
+    """
+    shapely = import_shapely()
+    object_ids, bounds, vertex_counts = [], [], []
+    for where_clause in NationalMapUtility.get_object_id_where_clauses(street_feature_class, STREET_READ_CHUNK_SIZE):
+        rows = [row for row in DataAccess.search_rows(street_feature_class, [OID_TOKEN, SHAPE_TOKEN], where_clause)
+                if row[1] is not None]
+        geometries = shapely.from_wkb([bytes(row[1].WKB) for row in rows])
+        chunk_bounds = shapely.bounds(geometries)
+        chunk_bounds_32 = chunk_bounds.astype(np.float32)
+        chunk_bounds_32[:, :2] = np.nextafter(chunk_bounds_32[:, :2], np.float32(-np.inf))
+        chunk_bounds_32[:, 2:] = np.nextafter(chunk_bounds_32[:, 2:], np.float32(np.inf))
+
+        object_ids.append(np.array([row[0] for row in rows], dtype=np.int64))
+        bounds.append(chunk_bounds_32)
+        vertex_counts.append(shapely.get_num_coordinates(geometries).astype(np.int32))
+        del rows, geometries, chunk_bounds
+
+    if not object_ids:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int32)
+    return np.concatenate(object_ids), np.concatenate(bounds), np.concatenate(vertex_counts)
+
+
+def _polygonize_streets(street_feature_class, object_ids, extra_lines=()):
+    """
+    FeatureToPolygon of the streets: the faces of the noded lines.
+    :param extra_lines: lines noded with the streets, the tile edges
+    :return: numpy array of the normalized polygons
+    """
+    shapely = import_shapely()
+    lines = shapely.from_wkb([bytes(row[0].WKB) for row in
+                              DataAccess.search_rows_by_object_ids(street_feature_class, [SHAPE_TOKEN], object_ids)
+                              if row[0] is not None])
+    if len(lines) == 0:
+        return np.zeros(0, dtype=object)
+
+    lines = np.concatenate([shapely.get_parts(lines), np.array(extra_lines, dtype=object)])
+    noded_lines = shapely.get_parts(shapely.node(shapely.multilinestrings(lines)))
+    polygons = shapely.get_parts(shapely.polygonize(noded_lines))
+    return shapely.normalize(polygons)
+
+
+def polygonize_tile(street_feature_class, object_ids, extent, street_extent):
+    """
+    :param object_ids: OBJECTID of the streets which intersect the extent
+    :param street_extent: extent of all the streets, a piece on its edges lies outside of every polygon
+    :return: (WKB of the polygons off the extent edges,
+              WKB of the pieces of the polygons which cross the extent edges)
+    """
+    shapely = import_shapely()
+    extent_box = shapely.box(*extent)
+    pieces = _polygonize_streets(street_feature_class, object_ids, [shapely.get_exterior_ring(extent_box)])
+    if len(pieces) == 0:
+        return [], []
+
+    pieces = pieces[_is_in_extent(shapely.get_coordinates(shapely.point_on_surface(pieces)), extent)]
+    is_final = shapely.contains_properly(extent_box, pieces)
+    is_outside = shapely.intersects(pieces, shapely.get_exterior_ring(shapely.box(*street_extent)))
+    return shapely.to_wkb(pieces[is_final]).tolist(), shapely.to_wkb(pieces[~is_final & ~is_outside]).tolist()
+
+
+def _init_polygon_worker(configuration_file):
+    configuration = MapConvertorConfiguration(configuration_file)
+    NationalMapLogger.init(configuration, log_suffix=f'street_polygon_{os.getpid()}')
+    DataAccess.init(configuration)
+    # a GDAL worker runs without arcpy
+    if not DataAccess.is_gdal:
+        MapConvertorConfiguration.set_arcpy_environment()
+
+
+def stitch_pieces(street_feature_class, object_ids, pieces):
+    """
+    Polygonize the streets which intersect a cluster of crossing pieces once more, together. Every street of a
+    polygon touches one of its pieces, so the polygon whose point on surface lies on a piece, or on a tile without
+    streets which such a polygon covers, is complete.
+    :param pieces: WKB of the pieces and of the tiles without streets of the cluster
+    :return: WKB of the stitched polygons
+    """
+    shapely = import_shapely()
+    polygons = _polygonize_streets(street_feature_class, object_ids)
+    if len(polygons) == 0:
+        return []
+
+    # a point on surface on the edge of two tiles intersects the pieces of both
+    piece_tree = shapely.STRtree(shapely.from_wkb(pieces))
+    is_stitched = np.zeros(len(polygons), dtype=bool)
+    is_stitched[np.unique(piece_tree.query(shapely.point_on_surface(polygons), predicate='intersects')[0])] = True
+    return shapely.to_wkb(polygons[is_stitched]).tolist()
+
+
+def _run_polygon_task_in_worker(function, arguments):
+    """
+    :return: (result, error)
+    """
+    try:
+        return function(*arguments), None
+    except Exception as e:
+        NationalMapLogger.error(f'_run_polygon_task_in_worker, {function.__name__} failed: {e}')
+        return None, str(e)
+
+
+def _run_polygon_tasks(configuration, function, tasks):
+    """
+    :param tasks: List[tuple] of the arguments of function
+    :return: Iterator[(position of the task, result of function)], in any order
+    """
+    workers = configuration.get_street_polygon_workers()
+    NationalMapLogger.info(f'_run_polygon_tasks, {function.__name__}, workers: {workers}, tasks: {len(tasks)}')
+    if workers == 1 or len(tasks) < 2:
+        for position, arguments in enumerate(tasks):
+            yield position, function(*arguments)
+        return
+
+    failed_tasks = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_polygon_worker,
+                             initargs=(configuration.configuration_file,)) as executor:
+        futures = {executor.submit(_run_polygon_task_in_worker, function, arguments): position
+                   for position, arguments in enumerate(tasks)}
+        for future in as_completed(futures):
+            try:
+                result, error = future.result()
+            except Exception as e:
+                # the worker process itself died
+                result, error = None, str(e)
+
+            if error:
+                failed_tasks.append(f'{futures[future]}: {error}')
+                continue
+            yield futures[future], result
+
+    if failed_tasks:
+        message = f'_run_polygon_tasks, {function.__name__} failed: {"; ".join(failed_tasks)}'
+        NationalMapLogger.error(message)
+        raise RuntimeError(message)
+
+
+def cluster_crossing_pieces(pieces, piece_tiles):
+    """
+    Connect the pieces of two tiles which share a stretch of tile edge, the pieces of a polygon end up in one
+    cluster. A street along a tile edge joins the clusters of two polygons, which is only slower.
+    :param pieces: numpy array of the crossing pieces and of the tiles without streets
+    :param piece_tiles: numpy array of the tile position of every piece
+    :return: numpy array of the cluster label of every piece
+    """
+    shapely = import_shapely()
+    first, second = shapely.STRtree(pieces).query(pieces, predicate='intersects')
+    is_pair = (first < second) & (piece_tiles[first] != piece_tiles[second])
+    first, second = first[is_pair], second[is_pair]
+    is_shared_edge = shapely.relate_pattern(pieces[first], pieces[second], '****1****')
+    return connected_components(len(pieces), first[is_shared_edge], second[is_shared_edge])
+
+
+def plan_stitch_tasks(street_bounds, vertex_counts, pieces, labels, max_task_vertices):
+    """
+    Pack the clusters into tasks whose streets have at most max_task_vertices vertices. A cluster above it is one
+    polygon, or polygons joined along a tile edge, it is a task alone.
+    :return: List[(street positions, piece positions)] of the tasks
+    """
+    shapely = import_shapely()
+    piece_tree = shapely.STRtree(pieces)
+    street_clusters = []
+    for start in range(0, len(street_bounds), STREET_READ_CHUNK_SIZE):
+        chunk_bounds = street_bounds[start:start + STREET_READ_CHUNK_SIZE].astype(np.float64)
+        boxes = shapely.box(chunk_bounds[:, 0], chunk_bounds[:, 1], chunk_bounds[:, 2], chunk_bounds[:, 3])
+        street_positions, piece_positions = piece_tree.query(boxes, predicate='intersects')
+        street_clusters.append(np.unique(np.stack([labels[piece_positions], street_positions + start], axis=1),
+                                         axis=0).reshape(-1, 2))
+    street_clusters = np.concatenate(street_clusters)
+
+    cluster_labels, piece_clusters = np.unique(labels, return_inverse=True)
+    street_cluster_positions = np.searchsorted(cluster_labels, street_clusters[:, 0])
+    cluster_vertices = np.bincount(street_cluster_positions, weights=vertex_counts[street_clusters[:, 1]],
+                                   minlength=len(cluster_labels))
+
+    # the clusters are numbered by their first piece, in the order of the tiles, so a task stays in one region
+    cluster_tasks = np.zeros(len(cluster_labels), dtype=np.int64)
+    task, task_vertices = 0, 0
+    for position, vertices in enumerate(cluster_vertices.tolist()):
+        if task_vertices > 0 and task_vertices + vertices > max_task_vertices:
+            task, task_vertices = task + 1, 0
+        cluster_tasks[position] = task
+        task_vertices += vertices
+    if cluster_vertices.max(initial=0) > max_task_vertices:
+        NationalMapLogger.warning(f'plan_stitch_tasks, a cluster has {int(cluster_vertices.max())} vertices, '
+                                  f'above the {max_task_vertices} of a worker')
+
+    street_tasks = cluster_tasks[street_cluster_positions]
+    piece_tasks = cluster_tasks[piece_clusters.ravel()]
+    return [(np.unique(street_clusters[street_tasks == position, 1]), np.flatnonzero(piece_tasks == position))
+            for position in range(task + 1)]
+
+
+def _plan_stitch(street_bounds, vertex_counts, tiles, street_extent, crossing_pieces, piece_tiles,
+                 max_task_vertices):
+    """
+    :param piece_tiles: tile position of every crossing piece
+    :return: List[(street positions, WKB of the pieces)] of the stitch tasks
+    """
+    if not crossing_pieces:
+        return []
+
+    shapely = import_shapely()
+    # a tile without streets lies in one polygon, or outside of all when it is on the edge of the street extent
+    empty_extents = np.array([tile.extent for tile in tiles if len(tile.street_positions) == 0],
+                             dtype=np.float64).reshape(-1, 4)
+    empty_boxes = shapely.box(empty_extents[:, 0], empty_extents[:, 1], empty_extents[:, 2], empty_extents[:, 3])
+    empty_boxes = empty_boxes[~shapely.intersects(empty_boxes, shapely.get_exterior_ring(shapely.box(*street_extent)))]
+    pieces = np.concatenate([shapely.from_wkb(crossing_pieces), empty_boxes])
+    piece_tiles = np.concatenate([np.array(piece_tiles, dtype=np.int64), len(tiles) + np.arange(len(empty_boxes))])
+
+    labels = cluster_crossing_pieces(pieces, piece_tiles)
+    tasks = plan_stitch_tasks(street_bounds, vertex_counts, pieces, labels, max_task_vertices)
+    NationalMapLogger.info(f'_plan_stitch, pieces: {len(pieces)}, clusters: {len(np.unique(labels))}, '
+                           f'tasks: {len(tasks)}')
+    return [(street_positions, shapely.to_wkb(pieces[piece_positions])) for street_positions, piece_positions in tasks]
+
+
+def _create_polygon_feature_class(out_feature_class):
+    arcpy = import_arcpy()
+    out_workspace, out_name = os.path.split(out_feature_class)
+    arcpy.management.CreateFeatureclass(out_workspace, out_name, geometry_type='POLYGON',
+                                        spatial_reference=constants.SR_WEB_MERCATOR)
+
+
+def _insert_polygons(out_feature_class, polygons):
+    return DataAccess.insert_rows(out_feature_class, [SHAPE_TOKEN], ((WkbGeometry(wkb),) for wkb in polygons))
+
+
+@NationalMapLogger.debug_decorator
+def generate_street_polygon(configuration, street_feature_class, out_feature_class):
+    """
+    FeatureToPolygon of the national streets in tiles, the streets of a tile fit the memory of a worker.
+    :return: count of the polygons
+    """
+    start_time = time.time()
+    object_ids, street_bounds, vertex_counts = _read_street_bounds(street_feature_class)
+    _create_polygon_feature_class(out_feature_class)
+    if len(object_ids) == 0:
+        return 0
+
+    max_tile_vertices = configuration.get_street_polygon_worker_memory_mb() * 1024 ** 2 // BYTES_PER_STREET_VERTEX
+    tiles = split_into_tiles(street_bounds, vertex_counts, max_tile_vertices)
+    street_extent = get_street_extent(street_bounds)
+    tile_tasks = [(street_feature_class, object_ids[tile.street_positions], tile.extent, street_extent)
+                  for tile in tiles if len(tile.street_positions) > 0]
+
+    count, crossing_pieces, piece_tiles = 0, [], []
+    for position, (final_polygons, tile_crossing_pieces) in _run_polygon_tasks(configuration, polygonize_tile,
+                                                                               tile_tasks):
+        count += _insert_polygons(out_feature_class, final_polygons)
+        crossing_pieces.extend(tile_crossing_pieces)
+        piece_tiles.extend([position] * len(tile_crossing_pieces))
+    tile_count = count
+    del tile_tasks
+
+    stitch_tasks = [(street_feature_class, object_ids[street_positions], pieces)
+                    for street_positions, pieces in _plan_stitch(street_bounds, vertex_counts, tiles, street_extent,
+                                                                 crossing_pieces, piece_tiles, max_tile_vertices)]
+    del vertex_counts, crossing_pieces, piece_tiles
+
+    for _, stitched_polygons in _run_polygon_tasks(configuration, stitch_pieces, stitch_tasks):
+        count += _insert_polygons(out_feature_class, stitched_polygons)
+
+    NationalMapLogger.info(f'generate_street_polygon, {out_feature_class}: {count} polygons, {len(tiles)} tiles, '
+                           f'{count - tile_count} stitched in {len(stitch_tasks)} tasks, '
+                           f'{time.time() - start_time:.1f} sec.')
+    NationalMapLogger.add_rows(read=len(object_ids), written=count)
+    return count
@@ -0,0 +1,31 @@
+"""
+The tests run without ArcGIS Pro, through the fake_arcpy stand-in of the benchmarks.
+
+    python -m pytest -q tests
+"""
+import logging
+import os
+import sys
+
+import pytest
+
+SDE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SDE_FOLDER)
+sys.path.insert(0, os.path.join(SDE_FOLDER, 'benchmarks'))
+
+import fake_arcpy  # noqa: E402
+
+fake_arcpy.install()
+
+from data_access import DataAccess  # noqa: E402
+from national_map_logger import NationalMapLogger  # noqa: E402
+
+# the converters log through NationalMapLogger, which is set up by national_main otherwise
+NationalMapLogger.logger = logging.getLogger('tests')
+
+
+@pytest.fixture(autouse=True)
+def reset_fake_arcpy():
+    yield
+    fake_arcpy.reset()
+    DataAccess.is_gdal = False
@@ -0,0 +1,76 @@
+import fake_arcpy
+
+from attribute_join import join_fields
+from local_id_lookup import LocalIdLookup, LocalIdLookupBuilder
+
+STREET_TABLE = 'C:/national.gdb/STREET'
+SIGNPOST_TABLE = 'C:/national.gdb/SIGNPOST_TABLE'
+
+UUID_1 = '0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0'
+UUID_2 = '11111111-2222-3333-4444-555555555555'
+
+STREET_ROWS = [
+    # LocalId, State, City
+    (UUID_1, 'CO', 'Denver'),
+    ('S2', 'CO', 'Boulder'),
+    (UUID_1, 'UT', 'Ogden'),
+    ('S2', 'WY', None),
+    (None, 'NM', 'Taos'),
+    (UUID_2, None, 'Provo'),
+    ('S3', 'AZ', 'Mesa'),
+    (UUID_2, 'UT', 'Provo'),
+]
+SIGNPOST_KEYS = [UUID_1, 'S2', 'S9', None, UUID_2, 'S3', UUID_1, 'S2']
+
+
+def _create_tables(street_rows, signpost_keys):
+    columns = list(zip(*street_rows))
+    fake_arcpy.create_table(STREET_TABLE, {
+        'LocalId': ('TEXT', list(columns[0])), 'State': ('TEXT', list(columns[1])), 'City': ('TEXT', list(columns[2]))
+    }, geometry_type='POLYLINE')
+    fake_arcpy.create_table(SIGNPOST_TABLE, {'SegmentID': ('TEXT', list(signpost_keys))})
+
+
+def _join(is_hash_join, street_rows=STREET_ROWS, signpost_keys=SIGNPOST_KEYS):
+    _create_tables(street_rows, signpost_keys)
+    join_fields(SIGNPOST_TABLE, 'SegmentID', STREET_TABLE, 'LocalId', ['State', 'City'], is_hash_join)
+    table = fake_arcpy.get_table(SIGNPOST_TABLE)
+    rows = list(zip(table.get_column('SegmentID'), table.get_column('State'), table.get_column('City')))
+    fake_arcpy.reset()
+    return rows
+
+
+def test_hash_join_is_identical_to_join_field_with_duplicate_keys():
+    expected = _join(is_hash_join=False)
+
+    assert _join(is_hash_join=True) == expected
+    assert expected[:4] == [(UUID_1, 'CO', 'Denver'), ('S2', 'CO', 'Boulder'), ('S9', None, None), (None, None, None)]
+
+
+def test_builder_keeps_the_first_or_the_last_value_of_a_duplicated_key():
+    items = [(UUID_1, 1), ('S2', 2), (UUID_1, 3), ('S2', 4), ('S3', 5)]
+    builder = LocalIdLookupBuilder()
+    for local_id, value in items:
+        builder.add(local_id, value)
+
+    assert builder.build(keep_first=True).get_many([UUID_1, 'S2', 'S3']).tolist() == [1, 2, 5]
+    assert LocalIdLookup.from_items(items).get_many([UUID_1, 'S2', 'S3']).tolist() == [3, 4, 5]
+
+
+
+def test_lookup_matches_the_exact_text_of_a_uuid():
+    lookup = LocalIdLookup.from_items([(UUID_1, 1), (UUID_1.upper(), 2), (f'{{{UUID_1}}}', 3)])
+
+    assert lookup.get_many([UUID_1, UUID_1.upper(), f'{{{UUID_1}}}', UUID_1.replace('-', ''),
+                            UUID_1[:9] + UUID_1[9:].upper()]).tolist() == [1, 2, 3, -1, -1]
+    assert len(lookup.uuid_keys) == 2
+
+
+def test_hash_join_matches_the_exact_text_of_a_uuid_as_join_field():
+    street_rows = [(UUID_1.upper(), 'CO', 'Denver')]
+    signpost_keys = [UUID_1, UUID_1.upper(), f'{{{UUID_1}}}', UUID_1.replace('-', '').upper()]
+
+    expected = _join(False, street_rows, signpost_keys)
+
+    assert _join(True, street_rows, signpost_keys) == expected
+    assert [row[1] for row in expected] == [None, 'CO', None, None]
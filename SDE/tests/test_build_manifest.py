@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import pytest
+
+from build_manifest import STATE_OUTPUT_PERFORMANCE_SETTINGS, get_configuration_hash
+
+PERFORMANCE = {
+    'state_workers': 1, 'street_field_calculation': 'CURSOR', 'street_group_engine': 'BUFFER',
+    'join_engine': 'JOIN_FIELD', 'data_access_backend': 'ARCPY', 'read_from_zip': False,
+    'selective_extraction': False, 'fused_state_export': False, 'export_workers': 1
+}
+CHANGED_VALUES = {
+    'street_field_calculation': 'VECTORIZED', 'street_group_engine': 'GRAPH', 'join_engine': 'HASH',
+    'data_access_backend': 'GDAL', 'read_from_zip': True, 'selective_extraction': True, 'fused_state_export': True
+}
+
+
+def _get_configuration(**performance):
+    return SimpleNamespace(data={'Precisely': {'version': '2024.06'}, 'Outputs': {'format': 'FILEGDB'},
+                                 'Performance': dict(PERFORMANCE, **performance)})
+
+
+@pytest.mark.parametrize('name', STATE_OUTPUT_PERFORMANCE_SETTINGS)
+def test_output_settings_change_the_configuration_hash(name):
+    assert get_configuration_hash(_get_configuration(**{name: CHANGED_VALUES[name]})) != \
+        get_configuration_hash(_get_configuration())
+
+
+def test_worker_counts_keep_the_configuration_hash():
+    assert get_configuration_hash(_get_configuration(state_workers=8, export_workers=4)) == \
+        get_configuration_hash(_get_configuration())
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from data_access import DataAccess, WkbGeometry
+
+pyogrio = pytest.importorskip('pyogrio')
+
+# WKB of POINT (1 2)
+POINT_WKB = bytes.fromhex('0101000000000000000000f03f0000000000000040')
+
+
+def test_gdal_insert_writes_typed_numbers_and_nulls(tmp_path):
+    workspace = str(tmp_path / 'national.gpkg')
+    pyogrio.raw.write(workspace, np.array([POINT_WKB], dtype=object),
+                      [np.array([1], dtype=np.int32), np.array([0.5]), np.array(['a'], dtype=object)],
+                      ['Speed', 'Length', 'Name'], layer='streets', driver='GPKG', geometry_type='Point',
+                      crs='EPSG:3857')
+    DataAccess.is_gdal = True
+
+    count = DataAccess.insert_rows(f'{workspace}/streets', ['Speed', 'SHAPE@', 'Length', 'Name'],
+                                   [(2, WkbGeometry(POINT_WKB), None, 'b'), (None, WkbGeometry(POINT_WKB), 1.5, None)])
+
+    info = pyogrio.read_info(workspace, layer='streets')
+    assert count == 2
+    assert info['dtypes'].tolist() == ['int32', 'float64', 'object']
+    assert list(DataAccess.search_rows(f'{workspace}/streets', ['Speed', 'Length', 'Name'])) == [
+        (1, 0.5, 'a'), (2, None, 'b'), (None, 1.5, None)]
@@ -0,0 +1,45 @@
+import pytest
+
+from field_mapping import FieldMap, convert_field_value, parse_field_mapping
+
+SOURCE = 'C:/precisely/usa_co_navprem.gdb/Streets'
+
+
+def test_parse_field_mapping_reads_every_field_type():
+    field_mapping = (
+        f'Street "Street" true true false 100 Text 0 0,First,#,{SOURCE},STREET,0,99;'
+        f'Fromleft "Fromleft" true true false 4 Long 0 0,First,#,{SOURCE},FROMLEFT,-1,-1;'
+        f'Speed "Speed" true true false 2 Short 0 0,First,#,{SOURCE},SPEED,-1,-1;'
+        f'Length "Length" true true false 8 Double 0 0,First,#,{SOURCE},LENGTH,-1,-1;'
+    )
+
+    assert parse_field_mapping(field_mapping) == [
+        FieldMap('Street', 'TEXT', 100, 'STREET', 0, 99),
+        FieldMap('Fromleft', 'LONG', 4, 'FROMLEFT', -1, -1),
+        FieldMap('Speed', 'SHORT', 2, 'SPEED', -1, -1),
+        FieldMap('Length', 'DOUBLE', 8, 'LENGTH', -1, -1)
+    ]
+
+
+def test_parse_field_mapping_keeps_the_commas_of_the_source_path():
+    field_map, = parse_field_mapping('Name "Name" true true false 50 Text 0 0,First,#,C:/a,b/c.gdb/Towns,NAME,2,5')
+
+    assert field_map == FieldMap('Name', 'TEXT', 50, 'NAME', 2, 5)
+
+
+def test_parse_field_mapping_rejects_an_unsupported_field_map():
+    with pytest.raises(ValueError):
+        parse_field_mapping(f'Street "Street" true true false 100 Text 0 0,Join,",",{SOURCE},STREET')
+
+
+def test_convert_field_value_slices_text_from_start_to_end():
+    assert convert_field_value(FieldMap('Name', 'TEXT', 50, 'NAME', 2, 5), 'Colorado') == 'lora'
+    assert convert_field_value(FieldMap('Name', 'TEXT', 3, 'NAME', 0, 99), 'Colorado') == 'Col'
+    assert convert_field_value(FieldMap('Name', 'TEXT', 50, 'NAME', -1, -1), 12.0) == '12'
+
+
+def test_convert_field_value_casts_numbers_and_keeps_null():
+    assert convert_field_value(FieldMap('Fromleft', 'LONG', 4, 'FROMLEFT', -1, -1), 12.0) == 12
+    assert convert_field_value(FieldMap('Length', 'DOUBLE', 8, 'LENGTH', -1, -1), 3) == 3.0
+    assert convert_field_value(FieldMap('Length', 'DOUBLE', 8, 'LENGTH', -1, -1), float('nan')) is None
+    assert convert_field_value(FieldMap('Street', 'TEXT', 100, 'STREET', 0, 99), None) is None
@@ -0,0 +1,54 @@
+"""
+The modules of the tile workers import arcpy on first use, a GDAL worker runs them without arcpy.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+SDE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_without_arcpy(script):
+    # None in sys.modules makes every import of arcpy fail, as on a host without ArcGIS Pro
+    script = f'import sys\nsys.modules["arcpy"] = None\nsys.path.insert(0, {SDE_FOLDER!r})\n' + textwrap.dedent(script)
+    return subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+
+
+def test_worker_modules_import_without_arcpy():
+    result = _run_without_arcpy('''
+        import constants, data_access, map_convertor_configuration, national_map_logger, national_map_utility
+        import street_intersect, street_junction, street_polygon
+        try:
+            constants.SR_WEB_MERCATOR
+        except ImportError:
+            print('no arcpy')
+    ''')
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'no arcpy'
+
+
+def test_gdal_worker_polygonizes_a_tile_without_arcpy(tmp_path):
+    pytest.importorskip('shapely')
+    pytest.importorskip('pyogrio')
+    result = _run_without_arcpy(f'''
+        import numpy as np, pyogrio, shapely
+        from data_access import DataAccess
+        from street_polygon import polygonize_tile
+
+        lines = [shapely.linestrings([(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]),
+                 shapely.linestrings([(5, -5), (5, 15)])]
+        workspace = {str(tmp_path / 'national.gpkg')!r}
+        pyogrio.raw.write(workspace, np.array(shapely.to_wkb(lines), dtype=object), [], [], layer='streets',
+                          driver='GPKG', geometry_type='LineString', crs='EPSG:3857')
+        DataAccess.is_gdal = True
+        final_polygons, crossing_pieces = polygonize_tile(workspace + '/streets', [1, 2], (-20, -20, 20, 20),
+                                                          (-20, -20, 20, 20))
+        print(len(final_polygons), len(crossing_pieces))
+    ''')
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '2 0'
@@ -0,0 +1,47 @@
+import fake_arcpy
+
+from national_data_importer import _convert_feature_class_to_workspace
+
+SOURCE_FEATURE_CLASS = 'C:/scratch/co.gdb/NATIONAL_DATASET/STREET'
+SOURCE_TABLE = 'C:/scratch/co.gdb/SIGNPOST_TABLE'
+TARGET_FEATURE_CLASS = 'C:/national.gdb/NATIONAL_DATASET/STREET'
+TARGET_TABLE = 'C:/national.gdb/SIGNPOST_TABLE'
+
+
+def _create_sources():
+    fake_arcpy.create_table(SOURCE_FEATURE_CLASS, {
+        'Shape': ('GEOMETRY', [fake_arcpy.Polyline([i, 0, i + 1, 1]) for i in range(7)]),
+        'LocalId': ('TEXT', [f'S{i}' for i in range(7)]),
+        'Speedleft': ('LONG', [10, None, 30, 40, 50, 60, 70])
+    }, geometry_type='POLYLINE')
+    fake_arcpy.create_table(SOURCE_TABLE, {
+        'SignpostID': ('TEXT', ['P1', 'P2', None, 'P4', 'P5']),
+        'Sequence': ('LONG', [1, 2, 3, None, 5])
+    })
+    # the national layers already hold the rows of a previous state
+    fake_arcpy.create_table(TARGET_FEATURE_CLASS, {
+        'Shape': ('GEOMETRY', [fake_arcpy.Polyline([-1, 0, 0, 0])]),
+        'LocalId': ('TEXT', ['S-1']),
+        'Speedleft': ('LONG', [5])
+    }, geometry_type='POLYLINE')
+    fake_arcpy.create_table(TARGET_TABLE, {'SignpostID': ('TEXT', ['P0']), 'Sequence': ('LONG', [0])})
+
+
+def _import(batch_size):
+    _create_sources()
+    counts = (_convert_feature_class_to_workspace(SOURCE_FEATURE_CLASS, TARGET_FEATURE_CLASS, batch_size),
+              _convert_feature_class_to_workspace(SOURCE_TABLE, TARGET_TABLE, batch_size))
+    tables = [fake_arcpy.get_table(path) for path in (TARGET_FEATURE_CLASS, TARGET_TABLE)]
+    rows = [(table.object_ids, {name: [value.coordinates if name == 'Shape' else value for value in column]
+                                for name, column in table.columns.items()}) for table in tables]
+    fake_arcpy.reset()
+    return counts, rows
+
+
+def test_bulk_import_is_identical_to_the_cursor():
+    expected_counts, expected_rows = _import(None)
+
+    for batch_size in (1, 2, 100):
+        counts, rows = _import(batch_size)
+        assert counts == expected_counts == (7, 5)
+        assert rows == expected_rows
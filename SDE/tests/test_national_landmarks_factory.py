@@ -0,0 +1,82 @@
+import math
+import struct
+
+import numpy as np
+import pytest
+
+from data_access import DataAccess, WkbGeometry
+from national_landmarks_factory import StreetSegments
+
+# OBJECTID: parts of the street
+STREETS = {
+    1: [[(0, 0), (10, 0), (10, 10)]],
+    # the parts are 100 m apart, the gap between them is not measured
+    2: [[(0, 0), (0, 5)], [(100, 0), (100, 20), (110, 20)]],
+    3: [[(5, 5), (5, 5)]],
+    # a U, (5, 5) is 5 m from all of its segments
+    4: [[(0, 0), (10, 0), (10, 10), (0, 10)]]
+}
+
+
+def _get_line_wkb(part):
+    return struct.pack(f'<BII{2 * len(part)}d', 1, 2, len(part), *[value for point in part for value in point])
+
+
+def _get_wkb(parts):
+    if len(parts) == 1:
+        return _get_line_wkb(parts[0])
+    return struct.pack('<BII', 1, 5, len(parts)) + b''.join(_get_line_wkb(part) for part in parts)
+
+
+def _get_reference_position(parts, point):
+    """
+    measureOnLine(point, True) of arcpy: the measure of the closest point on the first closest segment, divided by the
+    street length.
+    """
+    segments = [(start, end) for part in parts for start, end in zip(part[:-1], part[1:])]
+    closest_distance, closest_measure, measure = math.inf, 0.0, 0.0
+    for (x0, y0), (x1, y1) in segments:
+        length = math.hypot(x1 - x0, y1 - y0)
+        ratio = 0.0 if length == 0 else min(max(((point[0] - x0) * (x1 - x0) + (point[1] - y0) * (y1 - y0)) /
+                                                 length ** 2, 0.0), 1.0)
+        distance = math.hypot(x0 + ratio * (x1 - x0) - point[0], y0 + ratio * (y1 - y0) - point[1])
+        if distance < closest_distance:
+            closest_distance, closest_measure = distance, measure + ratio * length
+        measure += length
+    return closest_measure / measure if measure > 0 else 0.0
+
+
+@pytest.fixture
+def street_segments(monkeypatch):
+    def search_rows_by_object_ids(feature_class, field_names, object_ids):
+        return [(object_id, WkbGeometry(_get_wkb(STREETS[object_id]))) for object_id in object_ids]
+
+    monkeypatch.setattr(DataAccess, 'search_rows_by_object_ids', staticmethod(search_rows_by_object_ids))
+    return StreetSegments.build('streets', [4, 2, 1, 3])
+
+
+@pytest.mark.parametrize('object_id, point', [
+    (1, (4, 3)), (1, (12, 7)), (1, (-5, -5)), (1, (20, 20)),
+    (2, (1, 2)), (2, (95, 10)), (2, (105, 25)), (2, (50, 3)),
+    (3, (7, 7)),
+    (4, (5, 5)), (4, (11, 2))
+])
+def test_get_positions_equal_the_measure_on_line(street_segments, object_id, point):
+    streets = street_segments.find_streets(np.array([object_id]))
+
+    positions = street_segments.get_positions(streets, np.array([point], dtype=np.float64))
+
+    assert positions[0] == pytest.approx(_get_reference_position(STREETS[object_id], point))
+
+
+def test_get_positions_of_many_points(street_segments):
+    object_ids = np.array([4, 1, 3, 2, 4])
+    points = np.array([(5, 5), (4, 3), (7, 7), (105, 25), (1, 9)], dtype=np.float64)
+
+    positions = street_segments.get_positions(street_segments.find_streets(object_ids), points)
+
+    assert positions.tolist() == pytest.approx([_get_reference_position(STREETS[object_id], point)
+                                                for object_id, point in zip(object_ids.tolist(), points.tolist())])
+    # the first closest segment of the U
+    assert positions[0] == pytest.approx(5 / 30)
+    assert positions[2] == 0.0
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import national_map_logger
+from national_map_logger import NationalMapLogger
+
+
+def _create_configuration(folder, tracing):
+    return SimpleNamespace(data={'Outputs': {'log_folder': str(folder), 'log': str(folder / 'national.log')},
+                                 'Logging': {'log_level': 'INFO', 'tracing': tracing}})
+
+
+def test_performance_decorator_prints_the_timing(capsys):
+    @NationalMapLogger.performance_decorator
+    def create_lookup():
+        return {}
+
+    assert create_lookup() == {}
+    assert capsys.readouterr().out.startswith('create_lookup, cost time: ')
+
+
+def test_trace_files_are_rotated_when_a_run_starts(tmp_path, monkeypatch):
+    logger = NationalMapLogger.logger
+    monkeypatch.setattr(national_map_logger, 'TRACE_FILE_MAX_BYTES', 10)
+    metrics_file, trace_file = tmp_path / 'national.log_metrics.jsonl', tmp_path / 'national.log_trace.json'
+    metrics_file.write_text('{"name": "previous run"}\n')
+    trace_file.write_text('[\n{"name": "previous run"},\n')
+    try:
+        NationalMapLogger.init(_create_configuration(tmp_path, tracing=True))
+        with NationalMapLogger.span('stage'):
+            pass
+        NationalMapLogger.close_logger()
+    finally:
+        NationalMapLogger.logger, NationalMapLogger.metrics_file, NationalMapLogger.trace_file = logger, None, None
+
+    assert (tmp_path / 'national.log_metrics.jsonl.1').read_text() == '{"name": "previous run"}\n'
+    assert trace_file.read_text().startswith('[\n{"name": "stage"')
+    assert metrics_file.read_text().count('\n') == 1
@@ -0,0 +1,22 @@
+import os
+
+import fake_arcpy
+
+import constants
+from national_signpost_factory import NationalSignpostFactory
+
+WORKSPACE = 'C:/national/national.gdb'
+
+
+def test_resumed_signpost_stage_keeps_the_indexes():
+    table_path = os.path.join(WORKSPACE, constants.GDB_ITEMS_DICT['NATIONAL']['signpost_table_name'])
+    fake_arcpy.create_table(table_path, {name: ('LONG', []) for name in
+                                         ['SignpostID', 'Sequence', 'EdgeFCID', 'EdgeFID']})
+    factory = NationalSignpostFactory(None, WORKSPACE)
+
+    factory._add_signpost_table_index()
+    # --resume runs the stage again after a failure past the indexes
+    factory._add_signpost_table_index()
+
+    assert sorted(fake_arcpy.get_table(table_path).indexes) == ['IDX_EdgeFCID', 'IDX_EdgeFID', 'IDX_Sequence',
+                                                                'IDX_SignpostID']
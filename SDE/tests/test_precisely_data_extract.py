@@ -0,0 +1,106 @@
+import os
+import threading
+from types import SimpleNamespace
+from zipfile import ZipFile
+
+import arcpy
+import pytest
+
+import precisely_data_extract as precisely_data_extract_module
+from precisely_data_extract import PreciselyDataPrefetcher, extract_members, get_zip_file_gdb
+
+VERSION = '2024_Q1'
+
+
+def _create_configuration(folder):
+    settings = {'version': VERSION, 'zip_location': str(folder / 'zip'), 'fgdb_location': str(folder / 'fgdb')}
+    return SimpleNamespace(data={'Precisely': settings}, is_selective_extraction=lambda: False,
+                           is_read_from_zip=lambda: False, get_prefetch_states=lambda: 1,
+                           get_max_extracted_states=lambda: 2)
+
+
+def _create_archive(configuration, state, content):
+    os.makedirs(configuration.data['Precisely']['zip_location'], exist_ok=True)
+    zip_file = os.path.join(configuration.data['Precisely']['zip_location'],
+                            f'USA_{state}_NAVPREM_{VERSION}_FGDB.zip')
+    with ZipFile(zip_file, mode='w') as archive:
+        archive.writestr(f'USA_{state}/usa_{state.lower()}_navprem_{VERSION}.gdb/a00000001.gdbtable', content)
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError('arcpy called in the prefetch thread')
+
+
+def test_prefetch_replaces_the_extracted_gdb_without_arcpy(tmp_path, monkeypatch):
+    configuration = _create_configuration(tmp_path)
+    _create_archive(configuration, 'CO', b'new')
+    stale_gdb = tmp_path / 'fgdb' / f'usa_co_navprem_{VERSION}.gdb'
+    stale_gdb.mkdir(parents=True)
+    (stale_gdb / 'a00000002.gdbtable').write_bytes(b'old')
+    monkeypatch.setattr(arcpy, 'Exists', _fail)
+    monkeypatch.setattr(arcpy.management, 'Delete', _fail)
+
+    prefetcher = PreciselyDataPrefetcher(['CO'], configuration)
+    try:
+        precisely_data_extract = prefetcher.get('CO')
+        assert precisely_data_extract.get_file_gdb() == str(stale_gdb)
+        assert sorted(os.listdir(stale_gdb)) == ['a00000001.gdbtable']
+        assert (stale_gdb / 'a00000001.gdbtable').read_bytes() == b'new'
+    finally:
+        prefetcher.shutdown()
+
+    assert not stale_gdb.exists()
+
+
+
+def test_shutdown_stops_a_state_waiting_for_a_slot(tmp_path, monkeypatch):
+    configuration = _create_configuration(tmp_path)
+    configuration.get_max_extracted_states = lambda: 1
+    _create_archive(configuration, 'CO', b'co')
+    _create_archive(configuration, 'UT', b'ut')
+    monkeypatch.setattr(precisely_data_extract_module, 'EXTRACT_SLOT_WAIT_SECONDS', 0.01)
+    prefetcher = PreciselyDataPrefetcher(['CO', 'UT'], configuration)
+    # UT waits for the slot of CO, which a failed conversion never releases
+    prefetcher.get('CO')
+
+    shutdown_thread = threading.Thread(target=prefetcher.shutdown, daemon=True)
+    shutdown_thread.start()
+    shutdown_thread.join(timeout=10)
+
+    assert not shutdown_thread.is_alive()
+    assert os.listdir(tmp_path / 'fgdb') == []
+
+def _create_gdb_archive(folder, member_names):
+    zip_file = str(folder / 'archive.zip')
+    with ZipFile(zip_file, mode='w') as archive:
+        for member_name in member_names:
+            archive.writestr(member_name, b'')
+    return zip_file
+
+
+def test_get_zip_file_gdb_at_any_folder_depth(tmp_path):
+    gdb_name = f'usa_co_navprem_{VERSION}.gdb'
+    for folder in ['', 'USA_CO/', 'data/USA_CO/FGDB/']:
+        zip_file = _create_gdb_archive(tmp_path, ['readme.txt', f'{folder}{gdb_name.upper()}/a00000001.gdbtable'])
+
+        assert get_zip_file_gdb(zip_file, gdb_name) == f'/vsizip/{zip_file}/{folder}{gdb_name.upper()}'
+
+
+def test_get_zip_file_gdb_without_the_gdb(tmp_path):
+    zip_file = _create_gdb_archive(tmp_path, ['USA_CO/usa_co_other.gdb/a00000001.gdbtable'])
+
+    with pytest.raises(ValueError):
+        get_zip_file_gdb(zip_file, f'usa_co_navprem_{VERSION}.gdb')
+
+
+def test_extract_members_skips_the_paths_outside_of_the_target_folder(tmp_path):
+    zip_file = _create_gdb_archive(tmp_path, ['USA_CO/usa_co.gdb/a00000001.gdbtable', '../escaped.txt',
+                                              'USA_CO/../../escaped.txt', '/absolute.txt'])
+    target_folder = tmp_path / 'target'
+
+    with ZipFile(zip_file, mode='r') as archive:
+        extract_members(archive, archive.infolist(), str(target_folder))
+
+    assert not (tmp_path / 'escaped.txt').exists()
+    assert sorted(str(path.relative_to(target_folder)) for path in target_folder.rglob('*') if path.is_file()) == [
+        'USA_CO/usa_co.gdb/a00000001.gdbtable', 'absolute.txt']
@@ -0,0 +1,102 @@
+import os
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import arcpy
+import fake_arcpy
+import pytest
+
+import constants
+import state_exporter
+from data_access import DataAccess
+from state_exporter import EDITABLE_FIELDS, EXPORT_TASKS, StateExporter, TEMP_TOWN_FEATURES_NAME
+
+SCRATCH_FOLDER = 'C:/scratch'
+STATE_GEODATABASE = os.path.join(SCRATCH_FOLDER, 'CO.gdb')
+PRECISELY_GEODATABASE = 'C:/precisely/usa_co_navprem.gdb'
+
+
+class ExportConfiguration:
+    configuration_file = None
+
+    def __init__(self, fused_state_export=False):
+        self.fused_state_export = fused_state_export
+
+    def is_read_from_zip(self):
+        return False
+
+    def is_fused_state_export(self):
+        return self.fused_state_export
+
+
+def _get_exporter(fused_state_export=False):
+    data_settings = types.SimpleNamespace(state='CO', configuration=ExportConfiguration(fused_state_export),
+                                          data={'scratch_folder': SCRATCH_FOLDER,
+                                                'scratch_geodatabase': STATE_GEODATABASE,
+                                                'precisely_geodatabase': PRECISELY_GEODATABASE})
+    return StateExporter(data_settings)
+
+
+def test_parallel_export_tasks_write_their_own_geodatabases(monkeypatch):
+    task_geodatabases = {}
+
+    def export_task(state, configuration_file, task, task_geodatabase):
+        task_geodatabases[task] = task_geodatabase
+        if task == 'postcodes' and not arcpy.Exists(os.path.join(STATE_GEODATABASE, TEMP_TOWN_FEATURES_NAME)):
+            return 'the town features are not in the state scratch GDB'
+        fake_arcpy.create_table(os.path.join(task_geodatabase, f'{task}_features'), {}, geometry_type='POINT')
+        if task == 'towns':
+            fake_arcpy.create_table(os.path.join(task_geodatabase, TEMP_TOWN_FEATURES_NAME), {},
+                                    geometry_type='POLYGON')
+        return None
+
+    monkeypatch.setattr(state_exporter, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(state_exporter, '_export_task_in_worker', export_task)
+    arcpy.management.CreateFileGDB(SCRATCH_FOLDER, 'CO')
+    exporter = _get_exporter()
+
+    exporter._run_export_tasks_in_parallel(3)
+
+    assert len(set(task_geodatabases.values())) == len(EXPORT_TASKS)
+    assert not any(arcpy.Exists(task_geodatabase) for task_geodatabase in task_geodatabases.values())
+    monkeypatch.setattr(arcpy.env, 'workspace', STATE_GEODATABASE)
+    assert sorted(arcpy.ListFeatureClasses()) == sorted([f'{task}_features' for task in EXPORT_TASKS] +
+                                                        [TEMP_TOWN_FEATURES_NAME])
+    assert exporter.temp_town_features == os.path.join(STATE_GEODATABASE, TEMP_TOWN_FEATURES_NAME)
+
+
+@pytest.fixture
+def search_spatial_references(monkeypatch):
+    spatial_references = []
+    search_rows = DataAccess.search_rows
+
+    def search_projected_rows(*args, spatial_reference=None, **kwargs):
+        spatial_references.append(spatial_reference)
+        return search_rows(*args, spatial_reference=spatial_reference, **kwargs)
+
+    monkeypatch.setattr(DataAccess, 'search_rows', staticmethod(search_projected_rows))
+    return spatial_references
+
+
+@pytest.mark.parametrize('has_landuse', [True, False])
+def test_fused_landmarks_polygon_has_the_legacy_schema(search_spatial_references, has_landuse):
+    if has_landuse:
+        fake_arcpy.create_table(os.path.join(PRECISELY_GEODATABASE, 'COlanduse'), {
+            'Shape': ('GEOMETRY', [fake_arcpy.Polygon([0, 0, 1, 0, 1, 1])]),
+            'Name': ('TEXT', ['City Park']),
+            'ID': ('TEXT', ['5f4dcc3b-5aa7-65d6-1d83-27deb882cf99-extra'])
+        }, geometry_type='POLYGON')
+
+    _get_exporter(fused_state_export=True)._export_state_landmarks_polygon()
+
+    out_features = os.path.join(STATE_GEODATABASE, constants.GDB_ITEMS_DICT['STATE']['landmark_polygon_name'])
+    table = fake_arcpy.get_table(out_features)
+    assert list(table.field_types) == ['OBJECTID', 'Shape', 'Name', 'LocalId', 'Style'] + [
+        field_name for field_name, _ in EDITABLE_FIELDS]
+    assert table.spatial_reference.factoryCode == 3857
+    if has_landuse:
+        assert search_spatial_references == [constants.SR_WEB_MERCATOR]
+        assert table.columns['Name'] == ['City Park']
+        assert table.columns['LocalId'] == ['5f4dcc3b-5aa7-65d6-1d83-27deb882cf99']
+    else:
+        assert len(table) == 0
@@ -0,0 +1,91 @@
+import arcpy
+import fake_arcpy
+
+from state_signpost_converter import create_signpost_destination_lookup, group_signpost_destinations
+
+DESTINATIONS_TABLE = 'C:/precisely/RIsignpostdestinations'
+
+
+def _create_street_id_and_sequence_lookup(signpost_destinations_table, signpost_id):
+    # the query per SignpostID which create_signpost_destination_lookup replaced
+    fields = ['StreetID', 'StreetSeq']
+    where_clause = f"SignpostID = '{signpost_id}'"
+    sql_clause = (None, 'GROUP BY StreetID, StreetSeq ORDER BY StreetID, StreetSeq')
+    with arcpy.da.SearchCursor(signpost_destinations_table, fields, where_clause, sql_clause=sql_clause) as cursor:
+        return [(row[0], row[1]) for row in cursor]
+
+
+def _create_connection_sequence_and_name_lookup(signpost_destinations_table, signpost_id):
+    fields = ['Connection', 'DestinationSeq', 'DestinationName']
+    where_clause = f"SignpostID = '{signpost_id}'"
+    sql_clause = (None, 'GROUP BY Connection, DestinationSeq, DestinationName '
+                        'ORDER BY Connection, DestinationSeq, DestinationName')
+    with arcpy.da.SearchCursor(signpost_destinations_table, fields, where_clause, sql_clause=sql_clause) as cursor:
+        return [(row[0], row[1], row[2]) for row in cursor]
+
+
+def _create_destinations_table(rows):
+    columns = list(zip(*rows))
+    fake_arcpy.create_table(DESTINATIONS_TABLE, {
+        'SignpostID': ('TEXT', list(columns[0])),
+        'StreetID': ('TEXT', list(columns[1])),
+        'StreetSeq': ('LONG', list(columns[2])),
+        'Connection': ('LONG', list(columns[3])),
+        'DestinationSeq': ('LONG', list(columns[4])),
+        'DestinationName': ('TEXT', list(columns[5]))
+    })
+
+
+DESTINATION_ROWS = [
+    # SignpostID, StreetID, StreetSeq, Connection, DestinationSeq, DestinationName
+    ('S2', 'B', 2, 2, 1, 'Boston'),
+    ('S1', 'A', 1, 1, 2, 'I-95 N'),
+    ('S2', 'A', 1, 2, 1, 'Boston'),
+    ('S1', 'A', 1, 1, 1, 'I-95 S'),
+    ('S1', 'C', 2, 3, 1, '12A'),
+    ('S1', 'C', 2, 1, 1, 'I-95 S'),
+    ('S3', None, None, None, None, None),
+    ('S3', 'D', None, 2, None, 'Providence'),
+    ('S3', 'D', 1, 2, 1, None),
+    (None, 'E', 1, 2, 1, 'Nowhere'),
+    ('S2', 'B', 2, 1, 1, 'Worcester'),
+    ('S1', 'A', 1, 1, 2, 'I-95 N'),
+]
+
+
+def test_lookup_is_identical_to_the_query_per_signpost():
+    _create_destinations_table(DESTINATION_ROWS)
+
+    lookup = create_signpost_destination_lookup(DESTINATIONS_TABLE)
+
+    for signpost_id in ['S1', 'S2', 'S3']:
+        street_lookup, destination_lookup = lookup[signpost_id]
+        assert street_lookup == _create_street_id_and_sequence_lookup(DESTINATIONS_TABLE, signpost_id)
+        assert destination_lookup == _create_connection_sequence_and_name_lookup(DESTINATIONS_TABLE, signpost_id)
+
+
+def test_null_values_sort_first():
+    _create_destinations_table(DESTINATION_ROWS)
+
+    street_lookup, destination_lookup = create_signpost_destination_lookup(DESTINATIONS_TABLE)['S3']
+
+    assert street_lookup == [(None, None), ('D', None), ('D', 1)]
+    assert destination_lookup == [(None, None, None), (2, None, 'Providence'), (2, 1, None)]
+
+
+def test_null_signpost_id_is_a_group_of_its_own():
+    _create_destinations_table(DESTINATION_ROWS)
+
+    lookup = create_signpost_destination_lookup(DESTINATIONS_TABLE)
+
+    assert lookup[None] == ([('E', 1)], [(2, 1, 'Nowhere')])
+    assert all(street_id != 'E' for signpost_id in ['S1', 'S2', 'S3'] for street_id, _ in lookup[signpost_id][0])
+
+
+def test_group_signpost_destinations_removes_duplicate_rows():
+    rows = [('S1', 'A', 1, 1, 1, 'X'), ('S1', 'A', 1, 1, 1, 'X'), ('S2', 'B', 1, 2, 1, 'Y')]
+
+    assert list(group_signpost_destinations(rows)) == [
+        ('S1', [('A', 1)], [(1, 1, 'X')]),
+        ('S2', [('B', 1)], [(2, 1, 'Y')])
+    ]
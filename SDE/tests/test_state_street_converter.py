@@ -0,0 +1,135 @@
+import importlib
+from types import SimpleNamespace
+
+import fake_arcpy
+import numpy as np
+
+import state_street_converter
+from state_street_converter import StateStreetConverter
+from street_attribute_classifier import NULL_TEXT, calculate_street_attributes
+
+STREET_FEATURE_CLASS = 'C:/scratch/CO.gdb/temp_streets'
+GROUP_FEATURE_CLASS = 'C:/scratch/CO.gdb/streets_Group'
+
+SOURCE_FIELDS = [
+    ('Street', 'TEXT'), ('Fromleft', 'TEXT'), ('Toleft', 'TEXT'), ('Fromright', 'TEXT'), ('Toright', 'TEXT'),
+    ('ROAD_CLASS', 'TEXT'), ('streettype', 'LONG'), ('SPEED', 'LONG'), ('Oneway', 'TEXT'),
+    ('LENGTH_GEO', 'DOUBLE'), ('ROUGHRD', 'LONG'), ('Postcode_Left', 'TEXT'), ('Postcode_Right', 'TEXT')
+]
+CALCULATED_FIELDS = [
+    ('State', 'TEXT'), ('RoadClass', 'LONG'), ('Hierarchy', 'SHORT'), ('Speedleft', 'LONG'),
+    ('Speedright', 'LONG'), ('WALK_TIME', 'DOUBLE'), ('LEFT_TIME', 'DOUBLE'), ('RIGHT_TIME', 'DOUBLE'),
+    ('TraversableByVehicle', 'TEXT'), ('TraversableByWalkers', 'TEXT'), ('ProhibitCrosser', 'SHORT'),
+    ('PostedLeft', 'LONG'), ('PostedRight', 'LONG'), ('LeftPostalCode', 'TEXT'), ('RightPostalCode', 'TEXT'),
+    ('Cfcc', 'TEXT')
+]
+
+STREET_ROWS = [
+    # Street, Fromleft, Toleft, Fromright, Toright, ROAD_CLASS, streettype, SPEED, Oneway, LENGTH_GEO, ROUGHRD,
+    # Postcode_Left, Postcode_Right
+    ('Main St', '1', '99', '2', '98', 'S', 1001, 35, '1', 120.5, 0, '80202-1234', '80202'),
+    ('', '-1', '-1', '-1', '-1', 'M', 2010, 65, '2', 800.0, 0, '80203', '80203-99'),
+    ('', '-1', '5', '-1', '7', 'Z', 26014, 0, '3', 15.25, 0, '', ''),
+    ('Roundabout', '10', '20', '11', '21', 'P', 5004, 25, '4', 60.0, 1, '80204', '80204'),
+    ('Stairs', '0', '0', '0', '0', 'C', 28019, 5, '1', 3.0, 0, '80205', '80205'),
+    ('Ramp', '0', '0', '0', '0', 'F', 3510, 45, '3', 250.0, 0, '80206', '80206'),
+    # NULL values, except the fields the row by row logic cannot compute with
+    (None, None, None, None, None, None, 1010, 30, None, 42.0, None, '80207', '80207'),
+    (None, '-1', None, '-1', None, 'G', 1001, 55, '2', 500.0, None, '80208', '80208'),
+]
+
+
+def _create_street_feature_class(rows):
+    columns = list(zip(*rows))
+    fields = {name: (field_type, list(values)) for (name, field_type), values in zip(SOURCE_FIELDS, columns)}
+    fields.update({name: (field_type, [None] * len(rows)) for name, field_type in CALCULATED_FIELDS})
+    fake_arcpy.create_table(STREET_FEATURE_CLASS, fields, geometry_type='POLYLINE')
+
+
+def _create_street_converter():
+    data_settings = SimpleNamespace(state='co', configuration=None, data={})
+    converter = StateStreetConverter(data_settings, None)
+    converter.data['state_street_feature_class'] = STREET_FEATURE_CLASS
+    return converter
+
+
+def _calculate_street_fields(method_name, rows):
+    _create_street_feature_class(rows)
+    getattr(_create_street_converter(), method_name)()
+    table = fake_arcpy.get_table(STREET_FEATURE_CLASS)
+    field_names = [name for name, _ in SOURCE_FIELDS + CALCULATED_FIELDS]
+    # the geodatabase stores the numbers the cursor writes to the text field Cfcc as text
+    return [{name: str(value) if name == 'Cfcc' else value
+             for name, value in zip(field_names, (table.get_column(name)[position] for name in field_names))}
+            for position in range(len(table))]
+
+
+def test_vectorized_calculation_is_identical_to_the_cursor():
+    expected = _calculate_street_fields('_calculate_street_fields_with_cursor', STREET_ROWS)
+    fake_arcpy.reset()
+    result = _calculate_street_fields('_calculate_street_fields_vectorized', STREET_ROWS)
+
+    assert result == expected
+
+
+def test_vectorized_calculation_keeps_null_texts():
+    result = _calculate_street_fields('_calculate_street_fields_vectorized', STREET_ROWS)
+
+    assert [row['Street'] for row in result[-2:]] == [None, None]
+    assert [row['Fromleft'] for row in result[-2:]] == [None, '0']
+    assert [row['Toleft'] for row in result[-2:]] == [None, None]
+    assert [row['Street'] for row in result[1:3]] == ['Ramp', 'Unnamed']
+
+
+def test_null_postal_codes_stay_null():
+    # the row by row logic cannot slice a NULL postal code, the vectorized calculation keeps it NULL
+    rows = [STREET_ROWS[0][:11] + (None, '80209-1')]
+    result = _calculate_street_fields('_calculate_street_fields_vectorized', rows)
+
+    assert (result[0]['LeftPostalCode'], result[0]['RightPostalCode']) == (None, '80209')
+
+
+def test_calculate_street_attributes_restores_null_text():
+    columns = {
+        'Street': np.array([NULL_TEXT, '', 'Elm St']), 'Fromleft': np.array(['-1', NULL_TEXT, '3']),
+        'Toleft': np.array(['4', '-1', NULL_TEXT]), 'Fromright': np.array(['1', '2', '3']),
+        'Toright': np.array(['1', '2', '3']), 'ROAD_CLASS': np.array(['', 'N', 'T']),
+        'streettype': np.array([1001, 1510, 1001]), 'SPEED': np.array([0, 40, 30]),
+        'Oneway': np.array(['', '1', '1']), 'LENGTH_GEO': np.array([1.0, 2.0, 3.0]),
+        'ROUGHRD': np.array([0, 0, 0]), 'Postcode_Left': np.array([NULL_TEXT, '123456', '']),
+        'Postcode_Right': np.array(['1', NULL_TEXT, '12345'])
+    }
+    results = calculate_street_attributes('CO', columns)
+
+    assert results['Street'].tolist() == [None, 'Ramp', 'Elm St']
+    assert results['Fromleft'].tolist() == ['0', None, '3']
+    assert results['Toleft'].tolist() == ['4', '0', None]
+    assert results['LeftPostalCode'].tolist() == [None, '12345', '']
+    assert results['RightPostalCode'].tolist() == ['1', None, '12345']
+
+
+def _set_buffer_group_ids(state):
+    """
+    :return: GroupID of the streets and of the buffer groups the BUFFER engine numbers for state
+    """
+    fake_arcpy.reset()
+    fake_arcpy.create_table(STREET_FEATURE_CLASS, {'Street': ('TEXT', ['Main St', '', 'Oak St', '']),
+                                                   'GroupID': ('DOUBLE', [None] * 4)}, geometry_type='POLYLINE')
+    fake_arcpy.create_table(GROUP_FEATURE_CLASS, {'Street': ('TEXT', ['Main St', 'Oak St']),
+                                                  'GroupID': ('DOUBLE', [None] * 2)}, geometry_type='POLYGON')
+    next_group_id = state_street_converter.set_empty_street_group_id(
+        STREET_FEATURE_CLASS, state_street_converter.get_state_first_group_id(state))
+    state_street_converter.set_street_group_id(GROUP_FEATURE_CLASS, next_group_id)
+    return fake_arcpy.get_table(STREET_FEATURE_CLASS).get_column('GroupID') + \
+        fake_arcpy.get_table(GROUP_FEATURE_CLASS).get_column('GroupID')
+
+
+def test_buffer_group_ids_do_not_depend_on_the_process():
+    colorado_group_ids = _set_buffer_group_ids('co')
+    # a fresh worker process, or a later run which converts only some states
+    importlib.reload(state_street_converter)
+    wyoming_group_ids = _set_buffer_group_ids('wy')
+
+    assert colorado_group_ids == [None, 400_000_001, None, 400_000_002, 400_000_003, 400_000_004]
+    assert not (set(colorado_group_ids) - {None}) & set(wyoming_group_ids)
+    assert _set_buffer_group_ids('co') == colorado_group_ids
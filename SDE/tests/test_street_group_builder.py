@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from street_group_builder import calculate_street_group_ids, connected_components, create_proximity_edges
+
+BUFFER_METERS = 500
+
+
+def _get_partition(labels):
+    """
+    :return: the groups as a set of frozensets of element indexes, independent of the label values
+    """
+    groups = {}
+    for index, label in enumerate(list(labels)):
+        groups.setdefault(label, set()).add(index)
+    return {frozenset(group) for group in groups.values()}
+
+
+def test_connected_components_labels_the_smallest_index():
+    labels = connected_components(7, [5, 1, 3, 4], [4, 2, 2, 6])
+
+    assert labels.tolist() == [0, 1, 1, 1, 4, 4, 4]
+
+
+def test_connected_components_without_pairs():
+    assert connected_components(3, [], []).tolist() == [0, 1, 2]
+
+
+def test_create_proximity_edges_connects_near_cells_of_the_same_name():
+    name_codes = np.array([0, 0, 1])
+    point_street_indexes = np.array([0, 1, 2])
+    # street 1 is 900 m east of street 0, street 2 is 100 m away but has another name
+    x, y = np.array([0.0, 900.0, 100.0]), np.array([0.0, 0.0, 0.0])
+
+    first, second, cell_count = create_proximity_edges(name_codes, point_street_indexes, x, y, 1000.0)
+    labels = connected_components(3 + cell_count, first, second)
+
+    assert labels[0] == labels[1]
+    assert labels[2] != labels[0]
+
+    first, second, cell_count = create_proximity_edges(name_codes, point_street_indexes, x, y, 800.0)
+    labels = connected_components(3 + cell_count, first, second)
+    assert labels[0] != labels[1]
+
+
+def test_create_proximity_edges_skips_missing_points():
+    first, second, cell_count = create_proximity_edges(np.array([0]), np.array([0]), np.array([np.nan]),
+                                                       np.array([np.nan]), 1000.0)
+
+    assert len(first) == len(second) == cell_count == 0
+
+
+def test_calculate_street_group_ids_numbers_the_state_range():
+    streets = np.array(['', 'Main St', 'Main St', 'Oak St', 'Main St', None], dtype=object)
+    start_nodes = np.array([1, 10, 11, 20, 30, None], dtype=object)
+    end_nodes = np.array([2, 11, 12, 21, 31, None], dtype=object)
+    # Main St 0 and 1 share node 11, Main St 4 is 50 km away
+    first_x = np.array([0.0, 0.0, 100.0, 0.0, 50_000.0, np.nan])
+    last_x = np.array([10.0, 100.0, 200.0, 10.0, 50_100.0, np.nan])
+    first_y = last_y = np.zeros(6)
+
+    group_ids = calculate_street_group_ids(streets, start_nodes, end_nodes, first_x, first_y, last_x, last_y,
+                                           distance=2 * BUFFER_METERS, first_group_id=20_000_001,
+                                           is_geographic=False)
+
+    # the unnamed streets first, one group each, then the named components in the order of their first street
+    assert group_ids.tolist() == [20_000_001, 20_000_003, 20_000_003, 20_000_004, 20_000_005, 20_000_002]
+
+
+def _get_buffer_groups(shapely, streets, lines):
+    """
+    The BUFFER engine: the streets of a name buffered, dissolved and split into parts, a street belongs to the part
+    which contains it.
+    """
+    labels = [None] * len(streets)
+    for name in set(streets):
+        indexes = [index for index, street in enumerate(streets) if street == name]
+        parts = shapely.get_parts(shapely.union_all(shapely.buffer(lines[indexes], BUFFER_METERS)))
+        for index in indexes:
+            labels[index] = (name, int(np.flatnonzero(shapely.within(lines[index], parts))[0]))
+    return labels
+
+
+def test_graph_groups_equal_the_buffer_groups():
+    shapely = pytest.importorskip('shapely')
+    rng = np.random.default_rng(7)
+    streets, coordinates = [], []
+    # streets of at most 100 m, the gaps between their ends are at least 150 m off the 1000 m threshold
+    for name, origin_x in [('Main St', 0.0), ('Oak St', 0.0), ('Elm St', 20_000.0)]:
+        x = origin_x
+        for _ in range(12):
+            length = rng.uniform(20.0, 100.0)
+            coordinates.append((x, 0.0, x + length, rng.uniform(-20.0, 20.0)))
+            streets.append(name)
+            x += length + (rng.choice([0.0, rng.uniform(100.0, 850.0), rng.uniform(1_150.0, 3_000.0)]))
+    coordinates = np.array(coordinates)
+    lines = shapely.linestrings(np.stack([coordinates[:, :2], coordinates[:, 2:]], axis=1))
+    no_nodes = np.full(len(streets), None, dtype=object)
+
+    group_ids = calculate_street_group_ids(np.array(streets, dtype=object), no_nodes, no_nodes,
+                                           coordinates[:, 0], coordinates[:, 1], coordinates[:, 2], coordinates[:, 3],
+                                           distance=2 * BUFFER_METERS, first_group_id=1, is_geographic=False)
+
+    buffer_partition = _get_partition(_get_buffer_groups(shapely, streets, lines))
+    assert _get_partition(group_ids) == buffer_partition
+    assert 3 < len(buffer_partition) < len(streets)
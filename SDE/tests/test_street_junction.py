@@ -0,0 +1,50 @@
+import fake_arcpy
+import numpy as np
+
+from street_junction import EndpointCounter, generate_t_junctions
+
+STREET_FEATURE_CLASS = 'C:/national.gdb/NATIONAL_DATASET/MAP_STREET'
+NODE_FEATURE_CLASS = 'C:/national.gdb/NATIONAL_DATASET/national_street_nodes'
+JUNCTION_FEATURE_CLASS = 'C:/national.gdb/Junctions'
+
+
+def _create_feature_classes(streets, nodes):
+    fake_arcpy.create_table(STREET_FEATURE_CLASS, {
+        'Shape': ('GEOMETRY', [fake_arcpy.Polyline(list(coordinates)) for coordinates in streets])
+    }, geometry_type='POLYLINE')
+    fake_arcpy.create_table(NODE_FEATURE_CLASS, {
+        'Shape': ('GEOMETRY', [fake_arcpy.PointGeometry(fake_arcpy.Point(x, y)) for x, y, _ in nodes]),
+        'ELEVATION': ('LONG', [elevation for _, _, elevation in nodes])
+    }, geometry_type='POINT')
+
+
+def test_endpoint_counter_counts_the_street_ends_per_node():
+    first_points = np.array([[0, 0], [0, 1], [-1, 0], [5, 5], [5, 5]], dtype=np.float64)
+    last_points = np.array([[1, 0], [0, 0.0000001], [0, 0], [5, 5], [6, 5]], dtype=np.float64)
+    endpoint_counter = EndpointCounter(np.array([[0, 0], [1, 0], [5, 5], [9, 9], [0, 0]], dtype=np.float64))
+    endpoint_counter.add_streets(first_points[:2], last_points[:2])
+    endpoint_counter.add_streets(first_points[2:], last_points[2:])
+
+    # a loop street counts once, two nodes on one cell get the same count
+    assert endpoint_counter.get_node_counts().tolist() == [3, 1, 2, 0, 3]
+
+
+def test_junctions_on_a_state_border_count_the_streets_of_both_states():
+    streets = [
+        # state A, two streets end at the border node (100, 0), one at (0, 0)
+        (0, 0, 100, 0), (100, 50, 100, 0), (0, 0, -50, 0),
+        # state B, one street ends at the border node, two at (200, 0)
+        (100, 0, 200, 0), (200, 0, 200, 50),
+        # a node with 4 streets is no junction
+        (300, 0, 310, 0), (300, 0, 290, 0), (300, 0, 300, 10), (300, 0, 300, -10)
+    ]
+    # the border node is imported with both states
+    nodes = [(0, 0, 0), (100, 0, 1), (100, 0, 1), (200, 0, 2), (300, 0, 0)]
+    _create_feature_classes(streets, nodes)
+
+    count = generate_t_junctions(STREET_FEATURE_CLASS, NODE_FEATURE_CLASS, JUNCTION_FEATURE_CLASS)
+
+    junctions = fake_arcpy.get_table(JUNCTION_FEATURE_CLASS)
+    assert count == 2
+    assert [(shape.firstPoint.X, shape.firstPoint.Y) for shape in junctions.get_column('Shape')] == [(100, 0)] * 2
+    assert junctions.get_column('ZELEV') == [1, 1]
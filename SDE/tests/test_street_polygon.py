@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import street_polygon
+from data_access import DataAccess
+from national_map_utility import NationalMapUtility
+
+shapely = pytest.importorskip('shapely')
+pyogrio = pytest.importorskip('pyogrio')
+
+
+class PolygonConfiguration:
+    configuration_file = None
+
+    def get_street_polygon_workers(self):
+        return 1
+
+    def get_street_polygon_worker_memory_mb(self):
+        return 1
+
+
+def _get_ring_and_corner_grid():
+    """
+    :return: streets of a 1000 m ring with a 20 x 20 grid of 10 m blocks in its corner, the outer face and the
+             blocks at the tile edges are larger than the tiles
+    """
+    lines = []
+    for start, end in [((0, 0), (1000, 0)), ((1000, 0), (1000, 1000)), ((1000, 1000), (0, 1000)),
+                       ((0, 1000), (0, 0))]:
+        points = np.linspace(start, end, 11)
+        lines.extend(shapely.linestrings(points[position:position + 2]) for position in range(10))
+    for position in range(21):
+        lines.append(shapely.linestrings([(position * 10, 0), (position * 10, 200)]))
+        lines.append(shapely.linestrings([(0, position * 10), (200, position * 10)]))
+    # a dead end inside the outer face and a street outside of the ring
+    lines.append(shapely.linestrings([(600, 600), (700, 650)]))
+    lines.append(shapely.linestrings([(1100, 0), (1100, 1000)]))
+    return lines
+
+
+def _polygonize(lines):
+    noded_lines = shapely.get_parts(shapely.node(shapely.multilinestrings(lines)))
+    return shapely.normalize(shapely.get_parts(shapely.polygonize(noded_lines)))
+
+
+@pytest.mark.parametrize('bytes_per_street_vertex', [1, 10_000, 50_000, 200_000])
+def test_tiled_polygons_equal_feature_to_polygon(tmp_path, monkeypatch, bytes_per_street_vertex):
+    lines = _get_ring_and_corner_grid()
+    workspace = str(tmp_path / 'national.gpkg')
+    pyogrio.raw.write(workspace, np.array(shapely.to_wkb(lines), dtype=object), [], [], layer='streets',
+                      driver='GPKG', geometry_type='LineString', crs='EPSG:3857')
+    DataAccess.is_gdal = True
+    monkeypatch.setattr(NationalMapUtility, 'get_object_id_where_clauses',
+                        staticmethod(lambda feature_class, chunk_size: [f'fid >= 1 AND fid <= {len(lines)}']))
+    monkeypatch.setattr(street_polygon, 'BYTES_PER_STREET_VERTEX', bytes_per_street_vertex)
+    monkeypatch.setattr(street_polygon, '_create_polygon_feature_class', lambda out_feature_class: None)
+    polygons = []
+    monkeypatch.setattr(street_polygon, '_insert_polygons',
+                        lambda out_feature_class, wkbs: polygons.extend(wkbs) or len(wkbs))
+
+    count = street_polygon.generate_street_polygon(PolygonConfiguration(), f'{workspace}/streets', 'StreetPolygon')
+
+    expected = _polygonize(lines)
+    assert count == len(expected) == 401
+    areas = np.sort(shapely.area(shapely.from_wkb(polygons)))
+    assert np.allclose(areas, np.sort(shapely.area(expected)))
+    assert shapely.equals(shapely.union_all(shapely.from_wkb(polygons)), shapely.union_all(expected))
+
+
+def test_stitch_tasks_pack_the_clusters_under_the_vertex_budget():
+    # three clusters of two pieces each, the pieces of a cluster share the edge x = 10
+    pieces = np.array([shapely.box(0, y, 10, y + 5) for y in (0, 10, 20)] +
+                      [shapely.box(10, y, 20, y + 5) for y in (0, 10, 20)])
+    piece_tiles = np.array([0, 0, 0, 1, 1, 1])
+    labels = street_polygon.cluster_crossing_pieces(pieces, piece_tiles)
+    # one street of 4 vertices around every cluster
+    street_bounds = np.array([(1, y + 1, 19, y + 4) for y in (0, 10, 20)], dtype=np.float32)
+
+    tasks = street_polygon.plan_stitch_tasks(street_bounds, np.array([4, 4, 4]), pieces, labels, 8)
+
+    assert labels.tolist() == [0, 1, 2, 0, 1, 2]
+    assert [(streets.tolist(), positions.tolist()) for streets, positions in tasks] == [
+        ([0, 1], [0, 1, 3, 4]), ([2], [2, 5])]